@@ -0,0 +1,14 @@
+"""Serve CherryPy from the asyncio-based builtin server (Python 3.5+)."""
+
+from cherrypy._cpwsgi_server import CPWSGIServer
+from cherrypy.wsgiserver.wsgiserver3_asyncio import AsyncioWSGIServer
+
+
+class CPAsyncioWSGIServer(CPWSGIServer, AsyncioWSGIServer):
+    """A CPWSGIServer which runs on an asyncio event loop.
+
+    It takes its settings from config -> cherrypy.server just like
+    CPWSGIServer. thread_pool (or thread_pool_max, if larger) sets the
+    number of threads which run the application; see
+    wsgiserver.wsgiserver3_asyncio for the options it ignores.
+    """
@@ -28,7 +28,9 @@ Request
     Early in the request process, this dict is populated by merging global
     config entries, Application entries (whose path equals or is a parent
     of Request.path_info), and any config acquired while looking up the
-    page handler (see next).
+    page handler (see next). The default dispatcher makes it a
+    RequestConfig: a per-request overlay in front of a merged dict which
+    is shared by all requests for the same path.
 
 
 Declaration
@@ -148,6 +150,15 @@ def merge(base, other):
 class Config(reprconf.Config):
     """The 'global' configuration data for the entire CherryPy process."""
 
+    generation = 0
+    """A number which changes whenever this config does, so that copies
+    merged from it (see ConfigLayers) can tell when they are stale."""
+
+    def reset(self):
+        """Reset self to default values."""
+        reprconf.Config.reset(self)
+        self.generation += 1
+
     def update(self, config):
         """Update self from a dict, file or filename."""
         if isinstance(config, basestring):
@@ -164,6 +175,27 @@ class Config(reprconf.Config):
         if 'tools.staticdir.dir' in config:
             config['tools.staticdir.section'] = "global"
         reprconf.Config._apply(self, config)
+        self.generation += 1
+
+    def __setitem__(self, k, v):
+        reprconf.Config.__setitem__(self, k, v)
+        self.generation += 1
+
+    def __delitem__(self, k):
+        reprconf.Config.__delitem__(self, k)
+        self.generation += 1
+
+    def pop(self, *args):
+        try:
+            return reprconf.Config.pop(self, *args)
+        finally:
+            self.generation += 1
+
+    def setdefault(self, k, default=None):
+        try:
+            return reprconf.Config.setdefault(self, k, default)
+        finally:
+            self.generation += 1
 
     def __call__(self, *args, **kwargs):
         """Decorator for page handlers to set _cp_config."""
@@ -180,6 +212,188 @@ class Config(reprconf.Config):
         return tool_decorator
 
 
+def merge_layers(base, layers):
+    """Update base from each (conf, section) pair in layers, in order.
+
+    Each conf is a config dict from a node or an app.config section; if it
+    sets tools.staticdir.dir, base['tools.staticdir.section'] is set to the
+    given section path.
+    """
+    for conf, section in layers:
+        base.update(conf)
+        if 'tools.staticdir.dir' in conf:
+            base['tools.staticdir.section'] = section
+    return base
+
+
+class ConfigLayers(object):
+    """The config for one path: cherrypy.config, then each of layers.
+
+    The layers are (conf, section) pairs, as for merge_layers. The dicts
+    are held by reference, and flatten() merges them (over the global
+    config) into a dict which it keeps until the global config or any
+    layer changes.
+
+    The sections are (config, path, conf) triples: the app config which was
+    searched for each path along the way, and the section dict found there
+    (or None). See stale().
+    """
+
+    def __init__(self, layers, sections=()):
+        self.layers = layers
+        self.sections = sections
+        self._flat = None
+
+    def stale(self):
+        """Return True if a section has been added, replaced or removed.
+
+        Such a change alters which dicts should be layered, so the caller
+        must find them again. Changes within a layer are seen by flatten().
+        """
+        for config, path, conf in self.sections:
+            if config.get(path) is not conf:
+                return True
+        return False
+
+    def _state(self):
+        generation = cherrypy.config.generation
+        state = self._flat
+        if state is not None and state[0] == generation:
+            snapshot = state[1]
+            i = 0
+            for conf, section in self.layers:
+                if conf != snapshot[i]:
+                    break
+                i += 1
+            else:
+                return state
+
+        # Copy each layer first, so any change made meanwhile is seen next time.
+        snapshot = [conf.copy() for conf, section in self.layers]
+        flat = merge_layers(cherrypy.config.copy(), self.layers)
+        state = self._flat = (generation, snapshot, flat, {})
+        return state
+
+    def flatten(self):
+        """Return a dict of the merged config, which must not be modified."""
+        return self._state()[2]
+
+    def request_config(self):
+        """Return a new RequestConfig over flatten(), with its memo."""
+        state = self._state()
+        return RequestConfig(state[2], state[3])
+
+
+_deleted = object()
+
+
+class RequestConfig(object):
+    """A dict-like view of the config for one request.
+
+    Lookups fall through a per-request overlay to the base dict (usually
+    ConfigLayers.flatten(), shared by every request for the same path),
+    so nothing is copied per request. Writes and deletions go to the
+    overlay, and so only affect the current request.
+
+    If given, memo is a dict shared by every RequestConfig over the same
+    base, in which to keep anything derived from the base alone (such as
+    the hooks which Request.apply_config compiles from it).
+    """
+
+    def __init__(self, base, memo=None):
+        self.base = base
+        self.overlay = {}
+        self.memo = memo
+
+    def __getitem__(self, key):
+        overlay = self.overlay
+        if key in overlay:
+            value = overlay[key]
+            if value is _deleted:
+                raise KeyError(key)
+            return value
+        return self.base[key]
+
+    def get(self, key, default=None):
+        overlay = self.overlay
+        if key in overlay:
+            value = overlay[key]
+            if value is _deleted:
+                return default
+            return value
+        return self.base.get(key, default)
+
+    def __contains__(self, key):
+        overlay = self.overlay
+        if key in overlay:
+            return overlay[key] is not _deleted
+        return key in self.base
+    has_key = __contains__
+
+    def keys(self):
+        overlay = self.overlay
+        if not overlay:
+            return list(self.base.keys())
+        keys = [k for k in self.base if k not in overlay]
+        keys.extend([k for k, v in overlay.items() if v is not _deleted])
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def copy(self):
+        """Return a flat dict of the current config."""
+        return dict(self.items())
+
+    def __setitem__(self, key, value):
+        self.overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.overlay[key] = _deleted
+
+    def update(self, other=None, **kwargs):
+        if other is not None:
+            for k in other.keys():
+                self.overlay[k] = other[k]
+        self.overlay.update(kwargs)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.overlay[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            self.overlay[key] = _deleted
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def __eq__(self, other):
+        if isinstance(other, RequestConfig):
+            other = other.copy()
+        return self.copy() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.copy())
+
+
 # Sphinx begin config.environments
 Config.environments = environments = {
     "staging": {
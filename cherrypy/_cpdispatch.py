@@ -9,6 +9,7 @@ The default dispatcher discovers the page handler by matching path_info
 to a hierarchical arrangement of objects, starting at request.app.root.
 """
 
+import logging
 import string
 import sys
 import types
@@ -18,9 +19,21 @@ except AttributeError:
     classtype = type
 
 import cherrypy
+from cherrypy import _cpconfig
 from cherrypy._cpcompat import set
 
 
+if not hasattr(logging, 'statistics'): logging.statistics = {}
+handler_cache_stats = logging.statistics.setdefault('CherryPy Handler Cache', {})
+handler_cache_stats.update({
+    'Hits': 0,
+    'Misses': 0,
+    'Uncacheable': 0,
+    'Hit Ratio': lambda s: (s['Hits'] and
+        (s['Hits'] / float(s['Hits'] + s['Misses'])) or 0.0),
+    })
+
+
 class PageHandler(object):
     """Callable which sets response.body."""
 
@@ -294,18 +307,36 @@ class Dispatcher(object):
         """
         request = cherrypy.serving.request
         app = request.app
+
+        # Static routes are remembered per app (see Application.handler_cache)
+        cache = getattr(app, 'handler_cache', None)
+        if cache is not None:
+            key = (self, path)
+            found = cache.get(key)
+            if (found is not None and found[0] is app.root and
+                not found[3].stale()):
+                handler_cache_stats['Hits'] += 1
+                root, handler, vpath, layers, request.is_index = found
+                request.config = layers.request_config()
+                return handler, list(vpath)
+            handler_cache_stats['Misses'] += 1
+
         root = app.root
         dispatch_name = self.dispatch_method_name
+        dynamic = False
 
-        # Get config for the root object/path.
+        # Get config for the root object/path. Each node's config is a list
+        # of the dicts to merge, so that they can be cached by reference.
         fullpath = [x for x in path.strip('/').split('/') if x] + ['index']
         fullpath_len = len(fullpath)
         segleft = fullpath_len
-        nodeconf = {}
+        nodeconf = []
         if hasattr(root, "_cp_config"):
-            nodeconf.update(root._cp_config)
+            nodeconf.append(root._cp_config)
+        # The app.config sections looked up along the way, found or not.
+        sections = [(app.config, "/", app.config.get("/"))]
         if "/" in app.config:
-            nodeconf.update(app.config["/"])
+            nodeconf.append(app.config["/"])
         object_trail = [['root', root, nodeconf, segleft]]
 
         node = root
@@ -315,7 +346,7 @@ class Dispatcher(object):
             # map to legal Python identifiers (e.g. replace '.' with '_')
             objname = name.translate(self.translate)
 
-            nodeconf = {}
+            nodeconf = []
             subnode = getattr(node, objname, None)
             pre_len = len(iternames)
             if subnode is None:
@@ -329,6 +360,7 @@ class Dispatcher(object):
                     index_name = iternames.pop()
                     subnode = dispatch(vpath=iternames)
                     iternames.append(index_name)
+                    dynamic = True
                 else:
                     #We didn't find a path, but keep processing in case there
                     #is a default() handler.
@@ -355,7 +387,7 @@ class Dispatcher(object):
             if node is not None:
                 # Get _cp_config attached to this node.
                 if hasattr(node, "_cp_config"):
-                    nodeconf.update(node._cp_config)
+                    nodeconf.append(node._cp_config)
 
             # Mix in values from app.config for this path.
             existing_len = fullpath_len - pre_len
@@ -366,21 +398,27 @@ class Dispatcher(object):
             new_segs = fullpath[fullpath_len - pre_len:fullpath_len - segleft]
             for seg in new_segs:
                 curpath += '/' + seg
+                sections.append((app.config, curpath, app.config.get(curpath)))
                 if curpath in app.config:
-                    nodeconf.update(app.config[curpath])
+                    nodeconf.append(app.config[curpath])
 
             object_trail.append([name, node, nodeconf, segleft])
 
-        def set_conf():
-            """Collapse all object_trail config into cherrypy.request.config."""
-            base = cherrypy.config.copy()
+        def get_layers():
+            """Return all object_trail config as (conf, section) pairs."""
             # Note that we merge the config from each node
             # even if that node was None.
-            for name, obj, conf, segleft in object_trail:
-                base.update(conf)
-                if 'tools.staticdir.dir' in conf:
-                    base['tools.staticdir.section'] = '/' + '/'.join(fullpath[0:fullpath_len - segleft])
-            return base
+            layers = []
+            for name, obj, confs, segleft in object_trail:
+                section = '/' + '/'.join(fullpath[0:fullpath_len - segleft])
+                for conf in confs:
+                    layers.append((conf, section))
+            return layers
+
+        def set_conf():
+            """Collapse all object_trail config into cherrypy.request.config."""
+            base = _cpconfig.merge_layers(cherrypy.config.copy(), get_layers())
+            return _cpconfig.RequestConfig(base)
 
         # Try successive objects (reverse order)
         num_candidates = len(object_trail) - 1
@@ -396,10 +434,12 @@ class Dispatcher(object):
                 if getattr(defhandler, 'exposed', False):
                     # Insert any extra _cp_config from the default handler.
                     conf = getattr(defhandler, "_cp_config", {})
-                    object_trail.insert(i+1, ["default", defhandler, conf, segleft])
+                    object_trail.insert(i+1, ["default", defhandler, [conf], segleft])
                     request.config = set_conf()
                     # See https://bitbucket.org/cherrypy/cherrypy/issue/613
                     request.is_index = path.endswith("/")
+                    if cache is not None:
+                        handler_cache_stats['Uncacheable'] += 1
                     return defhandler, fullpath[fullpath_len - segleft:-1]
 
             # Uncomment the next line to restrict positional params to "default".
@@ -407,7 +447,8 @@ class Dispatcher(object):
 
             # Try the current leaf.
             if getattr(candidate, 'exposed', False):
-                request.config = set_conf()
+                layers = _cpconfig.ConfigLayers(get_layers(), sections)
+                request.config = layers.request_config()
                 if i == num_candidates:
                     # We found the extra ".index". Mark request so tools
                     # can redirect if path_info has no trailing slash.
@@ -418,10 +459,21 @@ class Dispatcher(object):
                     # Note that this also includes handlers which take
                     # positional parameters (virtual paths).
                     request.is_index = False
-                return candidate, fullpath[fullpath_len - segleft:-1]
+                vpath = fullpath[fullpath_len - segleft:-1]
+                if cache is not None:
+                    if dynamic or vpath:
+                        # The handler depends on more than the path, or
+                        # would have each of its virtual paths cached.
+                        handler_cache_stats['Uncacheable'] += 1
+                    else:
+                        cache[key] = (root, candidate, vpath, layers,
+                                      request.is_index)
+                return candidate, vpath
 
         # We didn't find anything
         request.config = set_conf()
+        if cache is not None:
+            handler_cache_stats['Uncacheable'] += 1
         return None, []
 
 
@@ -1,13 +1,108 @@
-"""Native adapter for serving CherryPy via its builtin server."""
+"""Native adapter for serving CherryPy via its builtin server.
+
+CPHTTPServer serves CherryPy apps (and nothing else) through NativeGateway,
+which builds each cherrypy.Request straight from the parsed request rather
+than from a WSGI environ. DirectGateway does the same within the builtin
+WSGI server, for those apps which need nothing from WSGI; see the
+server.native_gateway config entry.
+"""
 
 import logging
 import sys
 
 import cherrypy
-from cherrypy._cpcompat import BytesIO
+from cherrypy._cpcompat import BytesIO, basestring, bytestr, ntob, py3k
 from cherrypy._cperror import format_exc, bare_error
-from cherrypy.lib import httputil
-from cherrypy import wsgiserver
+from cherrypy.lib import httputil, file_generator, file_generator_limited
+from cherrypy import wsgiserver, _cpwsgi
+from cherrypy._cptree import Application
+from cherrypy._cpwsgi_server import make_listeners, set_session_options
+
+
+def request_path(req):
+    """Return the (unquoted) path of the given HTTPRequest as a native string."""
+    if py3k:
+        return req.path.decode('ISO-8859-1')
+    return req.path
+
+
+def run_app(app, script_name, req, path, recursive=False):
+    """Run a cherrypy.Request for the given HTTPRequest on app; return the
+    cherrypy.response. Call app.release_serving() once it has been sent.
+
+    Internal redirects are followed as _cpwsgi.InternalRedirector would.
+    """
+    conn = req.conn
+    # The same values as _cpwsgi.AppResponse.run gets from SERVER_NAME,
+    # REMOTE_ADDR and the like.
+    local = conn.bind_addr
+    server_name = req.server.server_name or ''
+    if isinstance(local, basestring):
+        # AF_UNIX socket
+        local = httputil.Host('', -1, server_name)
+    else:
+        local = httputil.Host(local[0], local[1], server_name)
+    remote = httputil.Host(conn.remote_addr or '', conn.remote_port or -1, "")
+
+    scheme = req.scheme
+    method = req.method
+    qs = req.qs or ntob("")
+    rproto = req.request_protocol
+    headers = req.inheaders.items()
+    if py3k:
+        # Decode as the WSGI gateway and _cpwsgi.AppResponse would have.
+        scheme = scheme.decode('ISO-8859-1')
+        method = method.decode('ISO-8859-1')
+        rproto = rproto.decode('ISO-8859-1')
+        headers = [(k.decode('ISO-8859-1'), v.decode('ISO-8859-1'))
+                   for k, v in headers]
+        enc = app.find_config(path[len(script_name):],
+                              "request.uri_encoding", 'utf-8')
+        try:
+            u_path = req.path.decode(enc)
+            u_qs = qs.decode(enc)
+        except UnicodeDecodeError:
+            qs = qs.decode('ISO-8859-1')
+        else:
+            path, qs = u_path, u_qs
+
+    rfile = req.rfile
+    prev = None
+    redirections = []
+    while True:
+        request, response = app.get_serving(local, remote, scheme,
+                                            req.server.protocol)
+        request.multithread = True
+        request.multiprocess = False
+        request.prev = prev
+
+        try:
+            request.run(method, path, qs, rproto, headers, rfile)
+            return response
+        except cherrypy.InternalRedirect:
+            ir = sys.exc_info()[1]
+            app.release_serving()
+            prev = request
+
+            # Add the *previous* path + qs to redirections.
+            if qs:
+                path += "?" + qs
+            redirections.append(path)
+
+            path = httputil.urljoin(script_name, ir.path)
+            qs = ir.query_string
+            if not recursive:
+                new_uri = path
+                if qs:
+                    new_uri += "?" + qs
+                if new_uri in redirections:
+                    raise RuntimeError("InternalRedirector visited the "
+                                       "same URL twice: %r" % new_uri)
+            method = "GET"
+            rfile = BytesIO()
+        except:
+            app.release_serving()
+            raise
 
 
 class NativeGateway(wsgiserver.Gateway):
@@ -17,60 +112,14 @@ class NativeGateway(wsgiserver.Gateway):
     def respond(self):
         req = self.req
         try:
-            # Obtain a Request object from CherryPy
-            local = req.server.bind_addr
-            local = httputil.Host(local[0], local[1], "")
-            remote = req.conn.remote_addr, req.conn.remote_port
-            remote = httputil.Host(remote[0], remote[1], "")
-
-            scheme = req.scheme
-            sn = cherrypy.tree.script_name(req.uri or "/")
+            path = request_path(req)
+            sn = cherrypy.tree.script_name(path or "/")
             if sn is None:
-                self.send_response('404 Not Found', [], [''])
+                self.send_response(ntob('404 Not Found'), [], [ntob('')])
             else:
                 app = cherrypy.tree.apps[sn]
-                method = req.method
-                path = req.path
-                qs = req.qs or ""
-                headers = req.inheaders.items()
-                rfile = req.rfile
-                prev = None
-
+                response = run_app(app, sn, req, path, self.recursive)
                 try:
-                    redirections = []
-                    while True:
-                        request, response = app.get_serving(
-                            local, remote, scheme, "HTTP/1.1")
-                        request.multithread = True
-                        request.multiprocess = False
-                        request.app = app
-                        request.prev = prev
-
-                        # Run the CherryPy Request object and obtain the response
-                        try:
-                            request.run(method, path, qs, req.request_protocol, headers, rfile)
-                            break
-                        except cherrypy.InternalRedirect:
-                            ir = sys.exc_info()[1]
-                            app.release_serving()
-                            prev = request
-
-                            if not self.recursive:
-                                if ir.path in redirections:
-                                    raise RuntimeError("InternalRedirector visited the "
-                                                       "same URL twice: %r" % ir.path)
-                                else:
-                                    # Add the *previous* path_info + qs to redirections.
-                                    if qs:
-                                        qs = "?" + qs
-                                    redirections.append(sn + path + qs)
-
-                            # Munge environment and try again.
-                            method = "GET"
-                            path = ir.path
-                            qs = ir.query_string
-                            rfile = BytesIO()
-
                     self.send_response(
                         response.output_status, response.header_list,
                         response.body)
@@ -87,20 +136,184 @@ class NativeGateway(wsgiserver.Gateway):
         req = self.req
 
         # Set response status
-        req.status = str(status or "500 Server Error")
+        req.status = status or ntob("500 Server Error")
 
         # Set response headers
         for header, value in headers:
             req.outheaders.append((header, value))
+        # Set response body
+        segs = iter(body)
         if (req.ready and not req.sent_headers):
             req.sent_headers = True
-            req.send_headers()
-
-        # Set response body
-        for seg in body:
+            # Send the first segment of the body along with the headers.
+            first = None
+            for first in segs:
+                break
+            req.send_headers(first)
+        for seg in segs:
             req.write(seg)
 
 
+def is_plain(app):
+    """Return True if app is a cherrypy Application with no WSGI middleware
+    (beyond the default pipeline), which DirectGateway may run natively."""
+    if not isinstance(app, Application):
+        return False
+    wsgiapp = app.wsgiapp
+    return (type(wsgiapp) is _cpwsgi.CPWSGIApp and not wsgiapp.config
+            and wsgiapp.response_class is _cpwsgi.AppResponse
+            and wsgiapp.pipeline == _cpwsgi.CPWSGIApp.pipeline)
+
+
+_content_length = ntob('content-length')
+
+
+class DirectGateway(wsgiserver.WSGIGateway_10):
+    """A WSGI gateway which runs plain CherryPy apps without WSGI.
+
+    For an app which passes is_plain, the cherrypy.Request is built from the
+    parsed request line, headers and rfile, and response.header_list is
+    written out as it is, rather than translated to and from a WSGI environ
+    and header list. Such requests have no wsgi_environ attribute. Errors
+    and internal redirects are handled as the default WSGI pipeline would.
+    Anything else, such as a grafted WSGI app, is served through WSGI as
+    usual.
+    """
+
+    def get_environ(self):
+        # Only built (in respond) for the requests which need one.
+        return None
+
+    def respond(self):
+        """Process the current request."""
+        req = self.req
+        tree = cherrypy.tree
+        path = request_path(req)
+        app = None
+        if req.server.wsgi_app is tree:
+            sn = tree.script_name(path or "/")
+            if sn is not None:
+                app = tree.apps[sn]
+        if app is None or not is_plain(app):
+            self.env = wsgiserver.WSGIGateway_10.get_environ(self)
+            wsgiserver.WSGIGateway_10.respond(self)
+            return
+
+        try:
+            response = run_app(app, sn, req, path)
+            try:
+                self.check_response(response)
+            except:
+                app.release_serving()
+                raise
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            # As _cpwsgi.ExceptionTrapper would.
+            tb = format_exc()
+            cherrypy.log(tb, severity=40)
+            if not cherrypy.serving.request.show_tracebacks:
+                tb = ""
+            s, h, b = bare_error(tb)
+            self.start_native(s, h)
+            self.write_response(b)
+            return
+
+        try:
+            self.start_native(response.output_status, response.header_list)
+            body = response.body
+            if isinstance(body, file_generator) and self.send_file_body(body):
+                return
+            self.write_response(_TrappedBody(self, body))
+        finally:
+            app.release_serving()
+
+    def send_file_body(self, body):
+        """Send a file_generator body with sendfile, if the server can."""
+        sendfile = getattr(self, 'sendfile', None)
+        if sendfile is None:
+            return False
+        count = None
+        if isinstance(body, file_generator_limited):
+            # Send no more than the limit.
+            count = body.remaining
+        if not sendfile(body.input, count):
+            return False
+        # The body decides whether the file is closed.
+        body.close()
+        return True
+
+    def check_response(self, response):
+        """Raise TypeError unless the output status and headers are bytes."""
+        if not isinstance(response.output_status, bytestr):
+            raise TypeError("response.output_status is not a byte string.")
+        for k, v in response.header_list:
+            if not isinstance(k, bytestr):
+                raise TypeError("response.header_list key %r is not a byte string." % k)
+            if not isinstance(v, bytestr):
+                raise TypeError("response.header_list value %r is not a byte string." % v)
+
+    def start_native(self, status, headers):
+        """Begin the response with the given (byte string) status and headers."""
+        req = self.req
+        req.status = status
+        for k, v in headers:
+            if k.lower() == _content_length:
+                self.remaining_bytes_out = int(v)
+        req.outheaders.extend(headers)
+        self.started_response = True
+
+
+class _TrappedBody(object):
+    """A response body iterator which handles errors as ExceptionTrapper does.
+
+    An error before the headers are sent replaces the response with a 500;
+    after that, it is logged and raised, and the server drops the connection.
+    """
+
+    def __init__(self, gateway, body):
+        self.gateway = gateway
+        self.body = body
+        self.iter_body = iter(body)
+
+    def __iter__(self):
+        return self
+
+    if py3k:
+        def __next__(self):
+            return self.trap(next, self.iter_body)
+    else:
+        def next(self):
+            return self.trap(self.iter_body.next)
+
+    def close(self):
+        if hasattr(self.body, 'close'):
+            self.body.close()
+
+    def trap(self, func, *args):
+        try:
+            return func(*args)
+        except (KeyboardInterrupt, SystemExit, StopIteration):
+            raise
+        except:
+            gateway = self.gateway
+            if gateway.req.sent_headers:
+                # The server will log it.
+                raise
+            tb = format_exc()
+            cherrypy.log(tb, severity=40)
+            if not cherrypy.serving.request.show_tracebacks:
+                tb = ""
+            s, h, b = bare_error(tb)
+            self.iter_body = iter([])
+            gateway.pending = []
+            gateway.pending_len = 0
+            gateway.remaining_bytes_out = None
+            gateway.req.outheaders = []
+            gateway.start_native(s, h)
+            return ntob("").join(b)
+
+
 class CPHTTPServer(wsgiserver.HTTPServer):
     """Wrapper for wsgiserver.HTTPServer.
 
@@ -130,6 +343,23 @@ class CPHTTPServer(wsgiserver.HTTPServer):
         self.shutdown_timeout = self.server_adapter.shutdown_timeout
         self.protocol = self.server_adapter.protocol_version
         self.nodelay = self.server_adapter.nodelay
+        self.reuse_port = self.server_adapter.socket_reuse_port
+        self.keepalive_polling = self.server_adapter.keepalive_polling
+        self.keepalive_timeout = self.server_adapter.keepalive_timeout
+        self.keepalive_requests = self.server_adapter.keepalive_requests
+        self.keepalive_saturation_close = (
+            self.server_adapter.keepalive_saturation_close)
+        self.autoscale = self.server_adapter.thread_pool_autoscale
+        self.autoscale_interval = self.server_adapter.thread_pool_interval
+        self.autoscale_cooldown = self.server_adapter.thread_pool_cooldown
+        self.accepted_queue_size = self.server_adapter.accepted_queue_size
+        self.accepted_queue_timeout = self.server_adapter.accepted_queue_timeout
+        self.overload_retry_after = self.server_adapter.overload_retry_after
+        self.accept_batch_size = self.server_adapter.accept_batch_size
+        self.accept_threads = self.server_adapter.accept_threads
+        self.header_timeout = self.server_adapter.header_timeout
+        self.min_body_rate = self.server_adapter.min_body_rate
+        self.timing_hook = self.server_adapter.timing_hook
 
         ssl_module = self.server_adapter.ssl_module or 'pyopenssl'
         if self.server_adapter.ssl_context:
@@ -145,5 +375,8 @@ class CPHTTPServer(wsgiserver.HTTPServer):
                 self.server_adapter.ssl_certificate,
                 self.server_adapter.ssl_private_key,
                 self.server_adapter.ssl_certificate_chain)
+        if self.ssl_adapter is not None:
+            set_session_options(self.ssl_adapter, self.server_adapter)
+        self.listeners = make_listeners(self.server_adapter, ssl_module)
 
 
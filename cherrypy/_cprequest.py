@@ -71,7 +71,15 @@ class Hook(object):
 
 
 class HookMap(dict):
-    """A map of call points to lists of callbacks (Hook objects)."""
+    """A map of call points to lists of callbacks (Hook objects).
+
+    Each list is kept sorted by priority as hooks are added with attach or
+    add. Copies share their chains with the original as sorted tuples; the
+    first time either side looks up such a point (with [] or get) or adds a
+    hook to it, that side gets a list of its own. So a hook appended to a
+    list in place still only reaches the one map, and run() sorts lists
+    (which may have been changed in place) but not the shared tuples.
+    """
 
     def __new__(cls, points=None):
         d = dict.__new__(cls)
@@ -82,15 +90,59 @@ class HookMap(dict):
     def __init__(self, *a, **kw):
         pass
 
+    def __getitem__(self, point):
+        hooks = dict.__getitem__(self, point)
+        if isinstance(hooks, tuple):
+            hooks = list(hooks)
+            dict.__setitem__(self, point, hooks)
+        return hooks
+
+    def get(self, point, default=None):
+        if point in self:
+            return self[point]
+        return default
+
     def attach(self, point, callback, failsafe=None, priority=None, **kwargs):
-        """Append a new Hook made from the supplied arguments."""
-        self[point].append(Hook(callback, failsafe, priority, **kwargs))
+        """Add a new Hook made from the supplied arguments."""
+        self.add(point, Hook(callback, failsafe, priority, **kwargs))
+
+    def add(self, point, hook):
+        """Insert the given Hook after any others of the same priority."""
+        hooks = self.get(point)
+        if hooks is None:
+            hooks = self[point] = []
+        i = len(hooks)
+        while i and hook.priority < hooks[i - 1].priority:
+            i -= 1
+        hooks.insert(i, hook)
+
+    def extend(self, other):
+        """Add all the hooks in another HookMap, sharing its lists if we can."""
+        for point, theirs in other.items():
+            if not theirs:
+                continue
+            mine = dict.get(self, point)
+            if mine:
+                # The sort is stable, so our hooks stay ahead of theirs
+                # at the same priority, as if theirs had been added last.
+                mine = list(mine) + list(theirs)
+                mine.sort()
+                self[point] = mine
+            else:
+                if not isinstance(theirs, tuple):
+                    theirs = tuple(sorted(theirs))
+                    dict.__setitem__(other, point, theirs)
+                self[point] = theirs
 
     def run(self, point):
         """Execute all registered Hooks (callbacks) for the given point."""
         exc = None
-        hooks = self[point]
-        hooks.sort()
+        # Not self[point], which would copy a shared chain.
+        hooks = dict.__getitem__(self, point)
+        if not isinstance(hooks, tuple):
+            # Hooks may have been appended to the list directly. The sort
+            # is stable, and quick for a list which is already sorted.
+            hooks.sort()
         for hook in hooks:
             # Some hooks are guaranteed to run even if others at
             # the same hookpoint fail. We will still log the failure,
@@ -113,10 +165,12 @@ class HookMap(dict):
 
     def __copy__(self):
         newmap = self.__class__()
-        # We can't just use 'update' because we want copies of the
-        # mutable values (each is a list) as well.
-        for k, v in self.items():
-            newmap[k] = v[:]
+        # The chains are shared, as tuples, until either map asks for a list.
+        for point, hooks in self.items():
+            if not isinstance(hooks, tuple):
+                hooks = tuple(sorted(hooks))
+                dict.__setitem__(self, point, hooks)
+            dict.__setitem__(newmap, point, hooks)
         return newmap
     copy = __copy__
 
@@ -137,7 +191,7 @@ def hooks_namespace(k, v):
         v = cherrypy.lib.attributes(v)
     if not isinstance(v, Hook):
         v = Hook(v)
-    cherrypy.serving.request.hooks[hookpoint].append(v)
+    cherrypy.serving.request.hooks.add(hookpoint, v)
 
 def request_namespace(k, v):
     """Attach request attributes declared in config."""
@@ -163,6 +217,62 @@ def error_page_namespace(k, v):
     cherrypy.serving.request.error_page[k] = v
 
 
+class CompiledConfig(object):
+    """The hooks and tool arguments which one (shared) config dict yields.
+
+    Compiling applies the 'hooks' namespace, and sets up every Tool whose
+    _setup has a true 'compiles' attribute, into a HookMap of our own;
+    requests then share its lists (already sorted) and the toolmaps. The
+    other tools, and the other namespaces, are still applied per request.
+    """
+
+    def __init__(self, namespaces, config):
+        self.namespaces = namespaces.copy()
+        self.hooks = HookMap()
+        self.toolmaps = {}
+        self.setups = []
+        self.rest = _cpconfig.NamespaceSet()
+        self.ns_confs = ns_confs = namespaces.separate(config)
+
+        # Tools and hooks attach themselves to the current request,
+        # so point it at our own hooks and toolmaps meanwhile.
+        request = cherrypy.serving.request
+        saved = request.hooks, request.toolmaps
+        request.hooks, request.toolmaps = self.hooks, self.toolmaps
+        try:
+            for ns, handler in namespaces.items():
+                conf = ns_confs.get(ns, {})
+                if handler is hooks_namespace:
+                    for k, v in conf.items():
+                        handler(k, v)
+                elif isinstance(handler, cherrypy._cptools.Toolbox):
+                    # As Toolbox.__enter__ and __exit__ would, but keep
+                    # the setups we can't run now for apply().
+                    populate = handler.__enter__()
+                    for k, v in conf.items():
+                        populate(k, v)
+                    toolmap = self.toolmaps[handler.namespace]
+                    for name, settings in toolmap.items():
+                        if settings.get("on", False):
+                            setup = getattr(handler, name)._setup
+                            if getattr(setup, "compiles", False):
+                                setup()
+                            else:
+                                self.setups.append(setup)
+                else:
+                    self.rest[ns] = handler
+        finally:
+            request.hooks, request.toolmaps = saved
+
+    def apply(self, request):
+        """Apply the compiled config to the given request."""
+        request.toolmaps = self.toolmaps.copy()
+        request.hooks.extend(self.hooks)
+        for setup in self.setups:
+            setup()
+        self.rest.apply(self.ns_confs)
+
+
 hookpoints = ['on_start_resource', 'before_request_body',
               'before_handler', 'before_finalize',
               'on_end_resource', 'on_end_request',
@@ -633,7 +743,7 @@ class Request(object):
                     self.body = _cpreqbody.RequestBody(
                         self.rfile, self.headers, request_params=self.params)
 
-                    self.namespaces(self.config)
+                    self.apply_config()
 
                     self.stage = 'on_start_resource'
                     self.hooks.run('on_start_resource')
@@ -678,6 +788,25 @@ class Request(object):
                 raise
             self.handle_error()
 
+    def apply_config(self):
+        """Pass self.config to self.namespaces (tools, hooks, etc). (Core)
+
+        When the dispatcher has given self.config a memo, and it has not been
+        changed for this request, this reuses (or makes) the CompiledConfig
+        for it, rather than setting up every tool again.
+        """
+        config = self.config
+        memo = getattr(config, 'memo', None)
+        if memo is None or config.overlay:
+            self.namespaces(config)
+            return
+
+        compiled = memo.get('hooks')
+        if compiled is None or compiled.namespaces != self.namespaces:
+            compiled = memo['hooks'] = CompiledConfig(self.namespaces,
+                                                      config.base)
+        compiled.apply(self)
+
     def process_query_string(self):
         """Parse the query string into Python structures. (Core)"""
         try:
@@ -868,6 +997,9 @@ class Response(object):
     stream = False
     """If False, buffer the response body."""
 
+    server_header = "CherryPy/" + cherrypy.__version__
+    """The default value of the 'Server' response header."""
+
     def __init__(self):
         self.status = None
         self.header_list = None
@@ -879,8 +1011,8 @@ class Response(object):
         # bypass HeaderMap.update and get a big speed boost.
         dict.update(self.headers, {
             "Content-Type": 'text/html',
-            "Server": "CherryPy/" + cherrypy.__version__,
-            "Date": httputil.HTTPDate(self.time),
+            "Server": self.server_header,
+            "Date": httputil.http_date(self.time),
         })
         self.cookie = SimpleCookie()
 
@@ -57,6 +57,11 @@ class Server(ServerAdapter):
     socket_timeout = 10
     """The timeout in seconds for accepted connections (default 10)."""
 
+    socket_reuse_port = False
+    """If True, sets the SO_REUSEPORT option on the listening socket, so that
+    several processes may serve the same host and port (see
+    :class:`Prefork<cherrypy.process.plugins.Prefork>`)."""
+
     shutdown_timeout = 5
     """The time to wait for HTTP worker threads to clean up."""
 
@@ -71,6 +76,19 @@ class Server(ServerAdapter):
     thread_pool_max = -1
     """The maximum size of the worker-thread pool. Use -1 to indicate no limit."""
 
+    thread_pool_autoscale = False
+    """If True, the worker-thread pool grows toward thread_pool_max while
+    requests are queueing and shrinks back toward thread_pool once workers
+    have been idle for thread_pool_cooldown seconds (builtin server only)."""
+
+    thread_pool_interval = 1
+    """The number of seconds between samples of the request queue when
+    thread_pool_autoscale is True."""
+
+    thread_pool_cooldown = 30
+    """The number of seconds the worker-thread pool must be over-provisioned
+    before it is shrunk when thread_pool_autoscale is True."""
+
     max_request_header_size = 500 * 1024
     """The maximum number of bytes allowable in the request headers. If exceeded,
     the HTTP server should return "413 Request Entity Too Large"."""
@@ -79,6 +97,19 @@ class Server(ServerAdapter):
     """The maximum number of bytes allowable in the request body. If exceeded,
     the HTTP server should return "413 Request Entity Too Large"."""
 
+    accepted_queue_size = -1
+    """The maximum number of accepted connections which may wait for a
+    worker thread; further connections get a quick "503 Service Unavailable".
+    Use -1 to indicate no limit."""
+
+    accepted_queue_timeout = None
+    """The maximum number of seconds a queued connection may wait for a
+    worker thread before new connections get a quick "503 Service
+    Unavailable". Use None to indicate no limit."""
+
+    overload_retry_after = 5
+    """The Retry-After value, in seconds, to send with those 503 responses."""
+
     instance = None
     """If not None, this should be an HTTP server instance (such as
     CPWSGIServer) which cherrypy.server will control. Use this when you need
@@ -98,6 +129,22 @@ class Server(ServerAdapter):
     ssl_private_key = None
     """The filename of the private key to use with SSL."""
 
+    ssl_session_cache = True
+    """If True (the default), let returning clients resume their TLS session
+    instead of paying for a full handshake."""
+
+    ssl_session_timeout = None
+    """The number of seconds a cached TLS session may be resumed for. If None,
+    the SSL library's default is used. Only the 'pyopenssl' module can change
+    this; the 'builtin' one is stuck with OpenSSL's default of 300."""
+
+    ssl_session_tickets = True
+    """If True (the default), also offer stateless TLS session tickets."""
+
+    ssl_ticket_key_lifetime = None
+    """If not None, rotate the TLS session ticket key every this many seconds.
+    Sessions issued under the old key will need a full handshake."""
+
     if py3k:
         ssl_module = 'builtin'
         """The name of a registered SSL adaptation module to use with the builtin
@@ -112,12 +159,81 @@ class Server(ServerAdapter):
         project, which you must install separately). You may also register your
         own classes in the wsgiserver.ssl_adapters dict."""
 
+    listeners = []
+    """A list of extra addresses for the builtin server to accept connections
+    on, all served by its one thread pool. Each entry is a dict with a
+    'bind_addr' (a (host, port) tuple or a UNIX socket path) and optionally
+    'ssl_certificate', 'ssl_private_key', 'ssl_certificate_chain' and
+    'ssl_module'. The ssl_* attributes above only apply to bind_addr; the
+    ssl_session_* ones apply to every listener."""
+
+    accept_batch_size = 1
+    """The maximum number of connections the builtin server accepts at once
+    from a ready listening socket (default 1). Raise this to cut the
+    per-connection overhead of bursts of short-lived connections."""
+
+    accept_threads = 1
+    """The number of threads accepting connections for the builtin server."""
+
+    header_timeout = None
+    """The maximum number of seconds the builtin server allows for receiving
+    a request line and headers, from their first byte (default None = no
+    limit). Slower clients get a 408 and are disconnected."""
+
+    min_body_rate = 0
+    """The minimum rate, in bytes per second, at which the builtin server
+    must receive request bodies (default 0 = no limit). Slower clients are
+    disconnected. Time the application spends between reads does not
+    count."""
+
     statistics = False
     """Turns statistics-gathering on or off for aware HTTP servers."""
 
+    timing_hook = None
+    """A callable to pass each request's timestamps to (builtin server only).
+    See wsgiserver.HTTPServer.timing_hook."""
+
     nodelay = True
     """If True (the default since 3.1), sets the TCP_NODELAY socket option."""
 
+    keepalive_polling = False
+    """If True, idle keep-alive connections are parked in a poller between
+    requests instead of each holding a worker thread (builtin server only)."""
+
+    asyncio = False
+    """If True, use the builtin server's asyncio-based variant (Python 3.5+),
+    in which idle and slow connections cost a coroutine rather than a worker
+    thread; only the application runs in the thread pool. See
+    wsgiserver.wsgiserver3_asyncio.
+
+    That server has no accept thread or connection queue, so it ignores
+    keepalive_polling, keepalive_saturation_close, accept_batch_size,
+    accept_threads, thread_pool_autoscale and load shedding
+    (accepted_queue_size, accepted_queue_timeout and
+    overload_retry_after)."""
+
+    keepalive_timeout = None
+    """The number of seconds the builtin server keeps an idle persistent
+    connection open between requests (default None = socket_timeout)."""
+
+    keepalive_requests = 0
+    """The maximum number of requests the builtin server answers on one
+    connection before closing it (default 0 = no limit)."""
+
+    keepalive_saturation_close = True
+    """If True (the default), the builtin server closes persistent
+    connections after the current response while other connections are
+    waiting for a worker thread."""
+
+    min_chunk_size = 0
+    """Streamed body chunks smaller than this many bytes are gathered and
+    sent together when the response has no Content-Length (default 0 = off;
+    builtin WSGI server only). Yield an empty string to send what has been
+    gathered so far. See wsgiserver.CherryPyWSGIServer.min_chunk_size."""
+
+    chunk_flush_size = 8192
+    """The number of gathered bytes at which they are sent (see min_chunk_size)."""
+
     wsgi_version = (1, 0)
     """The WSGI version tuple to use with the builtin WSGI server.
     The provided options are (1, 0) [which includes support for PEP 3333,
@@ -126,6 +242,14 @@ class Server(ServerAdapter):
     You may create and register your own experimental versions of the WSGI
     protocol by adding custom classes to the wsgiserver.wsgi_gateways dict."""
 
+    native_gateway = False
+    """If True, the builtin WSGI server (with wsgi_version (1, 0)) runs
+    requests for CherryPy Applications without WSGI middleware straight
+    from the parsed request, skipping the WSGI environ and back. Grafted
+    WSGI apps, and Applications with a wsgi pipeline or config, are still
+    served through WSGI. Natively served requests have no wsgi_environ.
+    See _cpnative_server.DirectGateway."""
+
     def __init__(self):
         self.bus = cherrypy.engine
         self.httpserver = None
@@ -137,8 +261,12 @@ class Server(ServerAdapter):
         if httpserver is None:
             httpserver = self.instance
         if httpserver is None:
-            from cherrypy import _cpwsgi_server
-            httpserver = _cpwsgi_server.CPWSGIServer(self)
+            if self.asyncio:
+                from cherrypy import _cpasyncio_server
+                httpserver = _cpasyncio_server.CPAsyncioWSGIServer(self)
+            else:
+                from cherrypy import _cpwsgi_server
+                httpserver = _cpwsgi_server.CPWSGIServer(self)
         if isinstance(httpserver, basestring):
             # Is anyone using this? Can I add an arg?
             httpserver = attributes(httpserver)(self)
@@ -139,6 +139,10 @@ class Tool(object):
             p = getattr(self.callable, "priority", self._priority)
         cherrypy.serving.request.hooks.attach(self._point, self.callable,
                                               priority=p, **conf)
+    # This _setup only attaches hooks, using nothing but config, so the
+    # request may run it once per config section (see CompiledConfig).
+    # Subclasses which override _setup must set this again to allow that.
+    _setup.compiles = True
 
 
 class HandlerTool(Tool):
@@ -188,6 +192,7 @@ class HandlerTool(Tool):
             p = getattr(self.callable, "priority", self._priority)
         cherrypy.serving.request.hooks.attach(self._point, self._wrapper,
                                               priority=p, **conf)
+    _setup.compiles = True
 
 
 class HandlerWrapperTool(Tool):
@@ -301,6 +306,7 @@ class SessionTool(Tool):
 
         hooks.attach('before_finalize', _sessions.save)
         hooks.attach('on_end_request', _sessions.close)
+    _setup.compiles = True
 
     def regenerate(self):
         """Drop the current session and make a new one (with a new id)."""
@@ -407,6 +413,7 @@ class CachingTool(Tool):
         p = conf.pop("priority", None)
         cherrypy.serving.request.hooks.attach('before_handler', self._wrapper,
                                               priority=p, **conf)
+    _setup.compiles = True
 
 
 
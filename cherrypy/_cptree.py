@@ -7,6 +7,7 @@ import cherrypy
 from cherrypy._cpcompat import ntou, py3k
 from cherrypy import _cpconfig, _cplogging, _cprequest, _cpwsgi, tools
 from cherrypy.lib import httputil
+from cherrypy.wsgiserver.lrucache import LRUCache
 
 
 class Application(object):
@@ -44,8 +45,21 @@ class Application(object):
 
     relative_urls = False
 
+    handler_cache_size = 1000
+    """The number of paths whose page handler the default dispatcher
+    remembers for this app (0 to remember none)."""
+
+    handler_cache = None
+    """An LRUCache of the page handlers (and the config dicts along the way)
+    found by the default dispatcher for static paths: those which it
+    resolved without a _cp_dispatch method, a default handler or virtual
+    path segments. It is cleared by merge(), and an entry is found again
+    once a section of self.config along its path is added, replaced or
+    removed; if you replace objects in the tree, clear it yourself."""
+
     def __init__(self, root, script_name="", config=None):
         self.log = _cplogging.LogManager(id(self), cherrypy.log.logger_root)
+        self.handler_cache = LRUCache(self.handler_cache_size)
         self.root = root
         self.script_name = script_name
         self.wsgiapp = _cpwsgi.CPWSGIApp(self)
@@ -92,6 +106,7 @@ class Application(object):
     def merge(self, config):
         """Merge the given config into self.config."""
         _cpconfig.merge(self.config, config)
+        self.handler_cache.clear()
 
         # Handle namespaces specified in config.
         self.namespaces(self.config.get("/", {}))
@@ -147,6 +162,100 @@ class Application(object):
         return self.wsgiapp(environ, start_response)
 
 
+_missing = object()
+
+
+class AppMap(dict):
+    """A dict of {script name: application} which finds the longest mount
+    point for a path in one pass.
+
+    The script names are kept in a trie, keyed by path segment, so a lookup
+    costs one dict access per segment of the path rather than one per
+    mounted app. Results for recent paths are memoized in an LRUCache of
+    cache_size entries. Both are rebuilt when the dict is changed.
+    """
+
+    cache_size = 1000
+    """The maximum number of paths whose script_name is remembered."""
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.changed()
+
+    def changed(self):
+        """Discard the trie and memoized lookups (after a mount changes)."""
+        self._trie = None
+        self._cache = LRUCache(self.cache_size)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.changed()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.changed()
+
+    def clear(self):
+        dict.clear(self)
+        self.changed()
+
+    def pop(self, *args):
+        try:
+            return dict.pop(self, *args)
+        finally:
+            self.changed()
+
+    def popitem(self):
+        try:
+            return dict.popitem(self)
+        finally:
+            self.changed()
+
+    def setdefault(self, key, default=None):
+        try:
+            return dict.setdefault(self, key, default)
+        finally:
+            self.changed()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self.changed()
+
+    def _build_trie(self):
+        # Each node is a dict of {segment: node}; the script name mounted
+        # at a node (if any) is stored under the None key.
+        trie = {}
+        for script_name in self.keys():
+            node = trie
+            for segment in script_name.split("/"):
+                node = node.setdefault(segment, {})
+            node[None] = script_name
+        return trie
+
+    def script_name(self, path):
+        """Return the longest script name which is a prefix of path (on a
+        segment boundary), or None."""
+        cache = self._cache
+        script_name = cache.get(path, _missing)
+        if script_name is not _missing:
+            return script_name
+
+        node = self._trie
+        if node is None:
+            node = self._trie = self._build_trie()
+        script_name = None
+        for segment in path.split("/"):
+            node = node.get(segment)
+            if node is None:
+                break
+            script_name = node.get(None, script_name)
+        if script_name is None and "" in self:
+            # A path without a leading slash still belongs to the root app.
+            script_name = ""
+        cache[path] = script_name
+        return script_name
+
+
 class Tree(object):
     """A registry of CherryPy applications, mounted at diverse points.
 
@@ -155,12 +264,20 @@ class Tree(object):
     mounted apps.
     """
 
-    apps = {}
-    """
+    def _get_apps(self):
+        return self._apps
+    def _set_apps(self, apps):
+        if not isinstance(apps, AppMap):
+            apps = AppMap(apps)
+        self._apps = apps
+    apps = property(_get_apps, _set_apps, doc="""
     A dict of the form {script name: application}, where "script name"
     is a string declaring the URI mount point (no trailing slash), and
     "application" is an instance of cherrypy.Application (or an arbitrary
-    WSGI callable if you happen to be using a WSGI server)."""
+    WSGI callable if you happen to be using a WSGI server).
+
+    Any dict set here is copied into an AppMap, which indexes the script
+    names for script_name().""")
 
     def __init__(self):
         self.apps = {}
@@ -240,15 +357,7 @@ class Tree(object):
             except AttributeError:
                 return None
 
-        while True:
-            if path in self.apps:
-                return path
-
-            if path == "":
-                return None
-
-            # Move one node up the tree and try again.
-            path = path[:path.rfind("/")]
+        return self.apps.script_name(path)
 
     def __call__(self, environ, start_response):
         # If you're calling this, then you're probably setting SCRIPT_NAME
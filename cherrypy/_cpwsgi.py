@@ -11,8 +11,8 @@ import sys as _sys
 
 import cherrypy as _cherrypy
 from cherrypy._cpcompat import BytesIO, bytestr, ntob, ntou, py3k, unicodestr
-from cherrypy import _cperror
-from cherrypy.lib import httputil
+from cherrypy import _cperror, wsgiserver
+from cherrypy.lib import httputil, file_generator, file_generator_limited
 
 
 def downgrade_wsgi_ux_to_1x(environ):
@@ -133,7 +133,14 @@ class ExceptionTrapper(object):
         self.throws = throws
 
     def __call__(self, environ, start_response):
-        return _TrappedResponse(self.nextapp, environ, start_response, self.throws)
+        response = _TrappedResponse(self.nextapp, environ, start_response,
+                                    self.throws)
+        file_body = getattr(response.response, 'file_body', None)
+        if file_body is not None:
+            # Hand the server its own file wrapper (see AppResponse), so it
+            # can send the file with sendfile; wrapping it would hide it.
+            return file_body
+        return response
 
 
 class _TrappedResponse(object):
@@ -212,6 +219,13 @@ class _TrappedResponse(object):
 class AppResponse(object):
     """WSGI response iterable for CherryPy applications."""
 
+    body = None
+    """The response body, which close() closes if it is a file body."""
+
+    file_body = None
+    """A FileWrapper from the server's wsgi.file_wrapper over the body, if
+    the server may send it as a file (see get_file_body)."""
+
     def __init__(self, environ, start_response, cpapp):
         self.cpapp = cpapp
         try:
@@ -244,12 +258,39 @@ class AppResponse(object):
                 outheaders = [(k.decode('ISO-8859-1'), v.decode('ISO-8859-1'))
                               for k, v in outheaders]
 
-            self.iter_response = iter(r.body)
+            self.body = r.body
+            self.file_body = self.get_file_body(self.body)
+            self.iter_response = iter(self.body)
             self.write = start_response(outstatus, outheaders)
         except:
             self.close()
             raise
 
+    def get_file_body(self, body):
+        """Return a FileWrapper over the given file body, or None.
+
+        Only a file_generator qualifies, when served by CherryPy's own
+        wsgiserver to an app with no WSGI middleware beyond the default
+        pipeline, which passes the file through untouched. The wrapper sends
+        from the file's current position, up to the limit of a
+        file_generator_limited, and closing it closes this AppResponse.
+        """
+        if not isinstance(body, file_generator):
+            return None
+        if self.cpapp.wsgiapp.pipeline != CPWSGIApp.pipeline:
+            return None
+        file_wrapper = self.environ.get('wsgi.file_wrapper')
+        if file_wrapper is None:
+            return None
+        wrapper = file_wrapper(body.input, body.chunkSize)
+        if not isinstance(wrapper, wsgiserver.FileWrapper):
+            return None
+        if isinstance(body, file_generator_limited):
+            wrapper.count = body.remaining
+        # Leave closing the file to the body, and release the request.
+        wrapper.close = self.close
+        return wrapper
+
     def __iter__(self):
         return self
 
@@ -262,13 +303,19 @@ class AppResponse(object):
 
     def close(self):
         """Close and de-reference the current request and response. (Core)"""
-        self.cpapp.release_serving()
+        try:
+            # Dropping file_body also breaks its cycle back to our close.
+            file_body, self.file_body = self.file_body, None
+            if file_body is not None:
+                self.body.close()
+        finally:
+            self.cpapp.release_serving()
 
     def run(self):
         """Create a Request object using environ."""
         env = self.environ.get
 
-        local = httputil.Host('', int(env('SERVER_PORT', 80)),
+        local = httputil.Host('', int(env('SERVER_PORT', 80) or -1),
                            env('SERVER_NAME', ''))
         remote = httputil.Host(env('REMOTE_ADDR', ''),
                                int(env('REMOTE_PORT', -1) or -1),
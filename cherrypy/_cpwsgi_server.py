@@ -7,6 +7,30 @@ import cherrypy
 from cherrypy import wsgiserver
 
 
+def set_session_options(ssl_adapter, server_adapter):
+    """Copy the ssl_session_* settings of server_adapter to ssl_adapter."""
+    ssl_adapter.session_cache = server_adapter.ssl_session_cache
+    ssl_adapter.session_timeout = server_adapter.ssl_session_timeout
+    ssl_adapter.session_tickets = server_adapter.ssl_session_tickets
+    ssl_adapter.ticket_key_lifetime = server_adapter.ssl_ticket_key_lifetime
+
+
+def make_listeners(server_adapter, ssl_module):
+    """Return wsgiserver.Listener objects for server_adapter.listeners."""
+    listeners = []
+    for conf in server_adapter.listeners or ():
+        ssl_adapter = None
+        if conf.get('ssl_certificate'):
+            adapter_class = wsgiserver.get_ssl_adapter_class(
+                conf.get('ssl_module') or ssl_module)
+            ssl_adapter = adapter_class(conf['ssl_certificate'],
+                                        conf.get('ssl_private_key'),
+                                        conf.get('ssl_certificate_chain'))
+            set_session_options(ssl_adapter, server_adapter)
+        listeners.append(wsgiserver.Listener(conf['bind_addr'], ssl_adapter))
+    return listeners
+
+
 class CPWSGIServer(wsgiserver.CherryPyWSGIServer):
     """Wrapper for wsgiserver.CherryPyWSGIServer.
 
@@ -35,8 +59,30 @@ class CPWSGIServer(wsgiserver.CherryPyWSGIServer):
                    timeout = self.server_adapter.socket_timeout,
                    shutdown_timeout = self.server_adapter.shutdown_timeout,
                    )
+        if self.server_adapter.native_gateway and self.wsgi_version == (1, 0):
+            from cherrypy._cpnative_server import DirectGateway
+            self.gateway = DirectGateway
         self.protocol = self.server_adapter.protocol_version
         self.nodelay = self.server_adapter.nodelay
+        self.reuse_port = self.server_adapter.socket_reuse_port
+        self.keepalive_polling = self.server_adapter.keepalive_polling
+        self.keepalive_timeout = self.server_adapter.keepalive_timeout
+        self.keepalive_requests = self.server_adapter.keepalive_requests
+        self.keepalive_saturation_close = (
+            self.server_adapter.keepalive_saturation_close)
+        self.autoscale = self.server_adapter.thread_pool_autoscale
+        self.autoscale_interval = self.server_adapter.thread_pool_interval
+        self.autoscale_cooldown = self.server_adapter.thread_pool_cooldown
+        self.accepted_queue_size = self.server_adapter.accepted_queue_size
+        self.accepted_queue_timeout = self.server_adapter.accepted_queue_timeout
+        self.overload_retry_after = self.server_adapter.overload_retry_after
+        self.accept_batch_size = self.server_adapter.accept_batch_size
+        self.accept_threads = self.server_adapter.accept_threads
+        self.header_timeout = self.server_adapter.header_timeout
+        self.min_body_rate = self.server_adapter.min_body_rate
+        self.timing_hook = self.server_adapter.timing_hook
+        self.min_chunk_size = self.server_adapter.min_chunk_size
+        self.chunk_flush_size = self.server_adapter.chunk_flush_size
 
         if sys.version_info >= (3, 0):
             ssl_module = self.server_adapter.ssl_module or 'builtin'
@@ -55,6 +101,9 @@ class CPWSGIServer(wsgiserver.CherryPyWSGIServer):
                 self.server_adapter.ssl_certificate,
                 self.server_adapter.ssl_private_key,
                 self.server_adapter.ssl_certificate_chain)
+        if self.ssl_adapter is not None:
+            set_session_options(self.ssl_adapter, self.server_adapter)
+        self.listeners = make_listeners(self.server_adapter, ssl_module)
 
         self.stats['Enabled'] = getattr(self.server_adapter, 'statistics', False)
 
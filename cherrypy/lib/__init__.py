@@ -23,18 +23,35 @@ class file_generator(object):
             raise StopIteration()
     next = __next__
 
-def file_generator_limited(fileobj, count, chunk_size=65536):
+    def close(self):
+        """Close the input file (for when the body is not read to the end)."""
+        if hasattr(self.input, 'close'):
+            self.input.close()
+
+class file_generator_limited(file_generator):
     """Yield the given file object in chunks, stopping after `count`
     bytes has been emitted.  Default chunk size is 64kB. (Core)
+
+    Unlike file_generator, this does not close the file when done.
     """
-    remaining = count
-    while remaining > 0:
-        chunk = fileobj.read(min(chunk_size, remaining))
-        chunklen = len(chunk)
-        if chunklen == 0:
-            return
-        remaining -= chunklen
-        yield chunk
+
+    def __init__(self, fileobj, count, chunk_size=65536):
+        file_generator.__init__(self, fileobj, chunk_size)
+        self.remaining = count
+
+    def __next__(self):
+        if self.remaining <= 0:
+            raise StopIteration()
+        chunk = self.input.read(min(self.chunkSize, self.remaining))
+        if not chunk:
+            raise StopIteration()
+        self.remaining -= len(chunk)
+        return chunk
+    next = __next__
+
+    def close(self):
+        """Leave the file open, as iterating to the end does."""
+        pass
 
 def set_vary_header(response, header_name):
     "Add a Vary header to a response"
@@ -445,6 +445,9 @@ class StatsPage(object):
                 'Start Time': None,
                 },
         },
+        'CherryPy Handler Cache': {
+            'Hit Ratio': '%.3f',
+        },
         'CherryPy WSGIServer': {
             'Enabled': pause_resume('CherryPy WSGIServer'),
             'Connections/second': '%.3f',
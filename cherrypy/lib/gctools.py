@@ -135,8 +135,9 @@ class GCRoot(object):
                 "Should be 1 in this request thread and 1 in the main thread."),
                (_cprequest.Response, 2, 2,
                 "Should be 1 in this request thread and 1 in the main thread."),
-               (_cpwsgi.AppResponse, 1, 1,
-                "Should be 1 in this request thread only."),
+               (_cpwsgi.AppResponse, 0, 1,
+                "Should be 1 in this request thread only (or 0, if it "
+                "was served without WSGI)."),
                ]
 
     def index(self):
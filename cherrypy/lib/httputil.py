@@ -24,6 +24,7 @@ response_codes[503] = ('Service Unavailable',
 import re
 import urllib
 
+from cherrypy.wsgiserver import http_date
 
 
 def urljoin(*atoms):
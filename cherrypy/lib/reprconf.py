@@ -78,14 +78,20 @@ class NamespaceSet(dict):
         namespace handler. For example, a config entry of {'tools.gzip.on': v}
         will call the 'tools' namespace handler with the args: ('gzip.on', v)
         """
-        # Separate the given config into namespaces
+        self.apply(self.separate(config))
+
+    def separate(self, config):
+        """Return the given config as a dict of {namespace: {name: value}}."""
         ns_confs = {}
         for k in config:
             if "." in k:
                 ns, name = k.split(".", 1)
                 bucket = ns_confs.setdefault(ns, {})
                 bucket[name] = config[k]
+        return ns_confs
 
+    def apply(self, ns_confs):
+        """Pass each entry of ns_confs (see separate) to its handler."""
         # I chose __enter__ and __exit__ so someday this could be
         # rewritten using Python 2.5's 'with' statement:
         # for ns, handler in self.iteritems():
@@ -400,6 +400,7 @@ class PIDFile(SimplePlugin):
         SimplePlugin.__init__(self, bus)
         self.pidfile = pidfile
         self.finalized = False
+        self.pid = None
 
     def start(self):
         pid = os.getpid()
@@ -409,9 +410,13 @@ class PIDFile(SimplePlugin):
             open(self.pidfile, "wb").write(ntob("%s\n" % pid, 'utf8'))
             self.bus.log('PID %r written to %r.' % (pid, self.pidfile))
             self.finalized = True
+            self.pid = pid
     start.priority = 70
 
     def exit(self):
+        if self.pid is not None and self.pid != os.getpid():
+            # We're a forked child (see Prefork); the file isn't ours.
+            return
         try:
             os.remove(self.pidfile)
             self.bus.log('PID file removed: %r.' % self.pidfile)
@@ -421,6 +426,198 @@ class PIDFile(SimplePlugin):
             pass
 
 
+class Prefork(SimplePlugin):
+    """Fork a number of worker processes which each run the site.
+
+    Use this with a Web Site Process Bus via::
+
+        Prefork(bus, workers=4).subscribe()
+
+    Each worker runs its own HTTP server(s) on the same address, so the
+    servers must be able to share it; for the builtin server, set
+    ``server.socket_reuse_port`` to True (this needs SO_REUSEPORT, which
+    Linux 3.9+ and the BSDs provide). The kernel then spreads incoming
+    connections over the workers, and each worker gets its own GIL.
+
+    The original process serves no requests itself. It becomes a supervisor
+    which forks a replacement (after `respawn_delay` seconds) whenever a
+    worker dies, passes 'graceful' on to the workers as SIGUSR1, and sends
+    them SIGTERM (then SIGKILL after `kill_timeout` seconds) when its bus
+    stops. A SIGHUP restart of the supervisor re-executes it as usual.
+
+    Since fork() only copies the calling thread, this plugin starts at
+    priority 68: after Daemonizer, but before PIDFile, the Monitors and
+    the servers, which all run in each worker. To record the supervisor's
+    PID instead, subscribe the PIDFile with a lower priority::
+
+        pidfile = PIDFile(bus, path)
+        pidfile.subscribe()
+        bus.subscribe('start', pidfile.start, priority=66)
+    """
+
+    workers = 2
+    """The number of worker processes to fork."""
+
+    respawn_delay = 1
+    """The number of seconds to wait before replacing a dead worker."""
+
+    kill_timeout = 5
+    """The number of seconds stopping workers get before they are killed."""
+
+    interval = 0.5
+    """The number of seconds between checks on the workers."""
+
+    worker = None
+    """The number of this worker (0 to workers - 1), or None in the supervisor."""
+
+    def __init__(self, bus, workers=2, respawn_delay=1, kill_timeout=5):
+        SimplePlugin.__init__(self, bus)
+        self.workers = workers
+        self.respawn_delay = respawn_delay
+        self.kill_timeout = kill_timeout
+        self.children = {}
+        self._stopping = False
+
+    def start(self):
+        if self.worker is not None:
+            # We are a worker; there's nothing to fork.
+            return
+        if self.children:
+            self.bus.log('Already forked %d workers.' % len(self.children))
+            return
+
+        # See the note about threads in Daemonizer.start.
+        if threading.activeCount() != 1:
+            self.bus.log('There are %r active threads. '
+                         'Forking now may cause strange failures.' %
+                         threading.enumerate(), level=30)
+
+        self._stopping = False
+        for worker in range(self.workers):
+            if self._spawn(worker):
+                return
+
+        # Only the supervisor gets here. Since it never finishes starting,
+        # mark the bus STARTED; otherwise stopping it from a signal handler
+        # would make bus.exit() call os._exit(70).
+        self.bus.state = self.bus.states.STARTED
+        if self._supervise():
+            return
+
+        # Don't let the supervisor go on to start any servers.
+        if self.bus.state != self.bus.states.EXITING:
+            self.bus.exit()
+        self.bus.block()
+        raise SystemExit(0)
+    start.priority = 68
+
+    def _spawn(self, worker):
+        """Fork a worker. Return True in the child, False in the parent."""
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            pid = os.fork()
+        except OSError:
+            exc = sys.exc_info()[1]
+            self.bus.log('Forking worker %d failed: (%d) %s' %
+                         (worker, exc.errno, exc.strerror), level=40)
+            return False
+
+        if pid == 0:
+            # This is the worker. Continue starting the bus.
+            self.worker = worker
+            self.children = {}
+            self.bus.state = self.bus.states.STARTING
+            return True
+
+        self.children[pid] = worker
+        self.bus.log('Forked worker %d (PID %d).' % (worker, pid))
+        return False
+
+    def _reap(self):
+        """Return a list of (pid, worker, status) for exited workers."""
+        reaped = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError:
+                # ECHILD (no children left) or EINTR.
+                break
+            if not pid:
+                break
+            worker = self.children.pop(pid, None)
+            if worker is not None:
+                reaped.append((pid, worker, status))
+        return reaped
+
+    def _supervise(self):
+        """Replace dead workers until stopped. Return True in a new worker."""
+        respawn = {}
+        while not self._stopping:
+            try:
+                for pid, worker, status in self._reap():
+                    if self._stopping:
+                        break
+                    self.bus.log('Worker %d (PID %d) exited with status %d. '
+                                 'Replacing it in %s seconds.' %
+                                 (worker, pid, status, self.respawn_delay),
+                                 level=30)
+                    respawn[worker] = time.time() + self.respawn_delay
+
+                now = time.time()
+                for worker, when in list(respawn.items()):
+                    if when <= now and not self._stopping:
+                        del respawn[worker]
+                        if self._spawn(worker):
+                            return True
+
+                time.sleep(self.interval)
+            except KeyboardInterrupt:
+                self.bus.log('Keyboard Interrupt: shutting down bus')
+                self.bus.exit()
+        return False
+
+    def _signal_children(self, signum):
+        for pid in list(self.children.keys()):
+            try:
+                os.kill(pid, signum)
+            except OSError:
+                pass
+
+    def graceful(self):
+        """Pass a graceful restart on to all workers."""
+        if self.worker is None:
+            self._signal_children(_signal.SIGUSR1)
+
+    def stop(self):
+        """Stop all workers (in the supervisor)."""
+        if self.worker is not None:
+            return
+        self._stopping = True
+        if not self.children:
+            return
+
+        self.bus.log('Stopping %d workers.' % len(self.children))
+        self._signal_children(_signal.SIGTERM)
+        endtime = time.time() + self.kill_timeout
+        while self.children and time.time() < endtime:
+            self._reap()
+            if self.children:
+                time.sleep(0.1)
+
+        if self.children:
+            self.bus.log('Killing %d workers which did not stop within '
+                         '%s seconds.' % (len(self.children), self.kill_timeout),
+                         level=30)
+            self._signal_children(_signal.SIGKILL)
+            for pid in list(self.children.keys()):
+                try:
+                    os.waitpid(pid, 0)
+                except OSError:
+                    pass
+            self.children.clear()
+
+
 class PerpetualTimer(Timer):
     """A responsive subclass of threading.Timer whose run() method repeats.
 
@@ -162,8 +162,10 @@ class ServerAdapter(object):
         if not self.httpserver:
             raise ValueError("No HTTP server has been created.")
 
-        # Start the httpserver in a new thread.
-        if isinstance(self.bind_addr, tuple):
+        # Start the httpserver in a new thread. If the port is shared with
+        # other processes (see plugins.Prefork), it needn't be free.
+        if (isinstance(self.bind_addr, tuple) and
+            not getattr(self.httpserver, 'reuse_port', False)):
             wait_for_free_port(*self.bind_addr)
 
         import threading
@@ -234,7 +236,8 @@ class ServerAdapter(object):
             # stop() MUST block until the server is *truly* stopped.
             self.httpserver.stop()
             # Wait for the socket to be truly freed.
-            if isinstance(self.bind_addr, tuple):
+            if (isinstance(self.bind_addr, tuple) and
+                not getattr(self.httpserver, 'reuse_port', False)):
                 wait_for_free_port(*self.bind_addr)
             self.running = False
             self.bus.log("HTTP Server %s shut down" % self.httpserver)
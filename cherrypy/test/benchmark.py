@@ -1,11 +1,13 @@
 """CherryPy Benchmark Tool
 
     Usage:
-        benchmark.py --null --notests --help --cpmodpy --modpython --ab=path --apache=path
+        benchmark.py --null --notests --parser --upload --help --cpmodpy --modpython --ab=path --apache=path
 
     --null:        use a null Request object (to bench the HTTP server only)
     --notests:     start the server but do not run the tests; this allows
                    you to check the tested pages with a browser
+    --parser:      time the request header parser alone (no server) and exit
+    --upload:      run only the chunked upload report
     --help:        show this help message
     --cpmodpy:     run tests via apache on 54583 (with the builtin _cpmodpy)
     --modpython:   run tests via apache on 54583 (with modpython_gateway)
@@ -22,6 +24,7 @@
 """
 
 import getopt
+import io
 import os
 curdir = os.path.join(os.getcwd(), os.path.dirname(__file__))
 
@@ -31,8 +34,8 @@ import time
 import traceback
 
 import cherrypy
-from cherrypy._cpcompat import ntob
-from cherrypy import _cperror, _cpmodpy
+from cherrypy._cpcompat import ntob, py3k
+from cherrypy import _cperror, _cpmodpy, wsgiserver
 from cherrypy.lib import httputil
 
 
@@ -40,9 +43,9 @@ AB_PATH = ""
 APACHE_PATH = "apache"
 SCRIPT_NAME = "/cpbench/users/rdelon/apps/blog"
 
-__all__ = ['ABSession', 'Root', 'print_report',
-           'run_standard_benchmarks', 'safe_threads',
-           'size_report', 'startup', 'thread_report',
+__all__ = ['ABSession', 'Root', 'coalesce_report', 'parse_report',
+           'print_report', 'run_standard_benchmarks', 'safe_threads',
+           'size_report', 'startup', 'thread_report', 'upload_report',
            ]
 
 size_cache = {}
@@ -57,7 +60,9 @@ class Root:
 <body>
     <ul>
         <li><a href="hello">Hello, world! (14 byte dynamic)</a></li>
+        <li><a href="json">Small JSON document (27 byte dynamic)</a></li>
         <li><a href="static/index.html">Static file (14 bytes static)</a></li>
+        <li>upload: POST a request body; returns its length</li>
         <li><form action="sizer">Response of length:
             <input type='text' name='size' value='10' /></form>
         </li>
@@ -70,6 +75,23 @@ class Root:
         return "Hello, world\r\n"
     hello.exposed = True
 
+    def json(self):
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        return ntob('{"id": 1, "name": "Alice"}\n')
+    json.exposed = True
+
+    def upload(self):
+        rfile = cherrypy.request.rfile
+        size = 0
+        while True:
+            data = rfile.read(65536)
+            if not data:
+                break
+            size += len(data)
+        return str(size)
+    upload.exposed = True
+    upload._cp_config = {'request.process_request_body': False}
+
     def sizer(self, size):
         resp = size_cache.get(size, None)
         if resp is None:
@@ -271,6 +293,213 @@ def size_report(sizes=(10, 100, 1000, 10000, 100000, 100000000),
         sess.run()
         yield [sz] + [getattr(sess, attr) for attr in attrs]
 
+def coalesce_report(path=SCRIPT_NAME + "/json", concurrency=10):
+    """Compare sending headers and body in one write vs. two."""
+    sess = ABSession(path, concurrency=concurrency)
+    attrs, names, patterns = list(zip(*sess.parse_patterns))
+    yield ('coalesce',) + names
+    old = wsgiserver.HTTPRequest.coalesce_writes
+    try:
+        for coalesce in (False, True):
+            wsgiserver.HTTPRequest.coalesce_writes = coalesce
+            sess.run()
+            yield [coalesce] + [getattr(sess, attr) for attr in attrs]
+    finally:
+        wsgiserver.HTTPRequest.coalesce_writes = old
+
+
+PARSE_REQUEST = ntob(
+    "GET /cpbench/users/rdelon/apps/blog/hello?page=2 HTTP/1.1\r\n"
+    "Host: www.example.com\r\n"
+    "User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:45.0) Gecko/20100101\r\n"
+    "Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n"
+    "Accept-Language: en-US,en;q=0.5\r\n"
+    "Accept-Encoding: gzip, deflate\r\n"
+    "Referer: http://www.example.com/blog/\r\n"
+    "Cookie: session_id=6a4f1c9b2e8d7f30a5b1c2d3e4f5a6b7\r\n"
+    "Connection: keep-alive\r\n"
+    "Cache-Control: max-age=0\r\n"
+    "\r\n")
+
+class _LineReader(object):
+    """Hide an rfile's peek() and find(), forcing the line-by-line header parser."""
+
+    def __init__(self, rfile):
+        self.readline = rfile.readline
+        self.read = rfile.read
+
+
+# The header parser as it was in CherryPy 3.2.4 (wsgiserver2), unchanged,
+# so that parse_report has a fixed baseline to compare against.
+
+_CRLF = ntob('\r\n')
+_LF = ntob('\n')
+_TAB = ntob('\t')
+_SPACE = ntob(' ')
+_COLON = ntob(':')
+_EMPTY = ntob('')
+_comma_separated_headers = [ntob(h) for h in
+    ['Accept', 'Accept-Charset', 'Accept-Encoding',
+     'Accept-Language', 'Accept-Ranges', 'Allow', 'Cache-Control',
+     'Connection', 'Content-Encoding', 'Content-Language', 'Expect',
+     'If-Match', 'If-None-Match', 'Pragma', 'Proxy-Authenticate', 'TE',
+     'Trailer', 'Transfer-Encoding', 'Upgrade', 'Vary', 'Via', 'Warning',
+     'WWW-Authenticate']]
+
+def _original_read_headers(rfile, hdict=None):
+    if hdict is None:
+        hdict = {}
+
+    while True:
+        line = rfile.readline()
+        if not line:
+            # No more data--illegal end of headers
+            raise ValueError("Illegal end of headers.")
+
+        if line == _CRLF:
+            # Normal end of headers
+            break
+        if not line.endswith(_CRLF):
+            raise ValueError("HTTP requires CRLF terminators")
+
+        if line[0] in (_SPACE, _TAB):
+            # It's a continuation line.
+            v = line.strip()
+        else:
+            try:
+                k, v = line.split(_COLON, 1)
+            except ValueError:
+                raise ValueError("Illegal header line.")
+            # TODO: what about TE and WWW-Authenticate?
+            k = k.strip().title()
+            v = v.strip()
+            hname = k
+
+        if k in _comma_separated_headers:
+            existing = hdict.get(hname)
+            if existing:
+                v = ntob(", ").join((existing, v))
+        hdict[hname] = v
+
+    return hdict
+
+class _OriginalSizeCheckWrapper(object):
+    """SizeCheckWrapper's read and readline as they were in CherryPy 3.2.4."""
+
+    def __init__(self, rfile, maxlen):
+        self.rfile = rfile
+        self.maxlen = maxlen
+        self.bytes_read = 0
+
+    def _check_length(self):
+        if self.maxlen and self.bytes_read > self.maxlen:
+            raise wsgiserver.MaxSizeExceeded()
+
+    def read(self, size=None):
+        data = self.rfile.read(size)
+        self.bytes_read += len(data)
+        self._check_length()
+        return data
+
+    def readline(self, size=None):
+        if size is not None:
+            data = self.rfile.readline(size)
+            self.bytes_read += len(data)
+            self._check_length()
+            return data
+
+        # User didn't specify a size ...
+        # We read the line in chunks to make sure it's not a 100MB line !
+        res = []
+        while True:
+            data = self.rfile.readline(256)
+            self.bytes_read += len(data)
+            self._check_length()
+            res.append(data)
+            # See https://bitbucket.org/cherrypy/cherrypy/issue/421
+            if len(data) < 256 or data[-1:] == _LF:
+                return _EMPTY.join(res)
+
+def parse_report(number=20000, request=PARSE_REQUEST):
+    """Time reading a request line and headers three ways.
+
+    'original' is CherryPy 3.2.4's read_headers and SizeCheckWrapper
+    (copied above), 'readline' is the current read_headers with peek()
+    hidden, so it reads line by line, and 'buffered' is the current one
+    as the server uses it. Requests are fed through a socketpair into the
+    server's own socket file, as on a keep-alive connection.
+    """
+    import socket
+    import timeit
+    # read_headers isn't exported; take it from whichever module is in use.
+    mod = sys.modules[wsgiserver.HTTPRequest.__module__]
+    if py3k:
+        makefile = mod.CP_makefile
+    else:
+        makefile = mod.CP_fileobject
+    yield ('reader', 'usec/req')
+    for name in ('original', 'readline', 'buffered'):
+        client, server = socket.socketpair()
+        try:
+            rfile = makefile(server, 'rb', mod.DEFAULT_BUFFER_SIZE)
+            if name == 'original':
+                rfile = _OriginalSizeCheckWrapper(rfile, 0)
+                read_headers = _original_read_headers
+            else:
+                if name == 'readline':
+                    rfile = _LineReader(rfile)
+                rfile = mod.SizeCheckWrapper(rfile, 0)
+                read_headers = mod.read_headers
+            def parse():
+                client.sendall(request)
+                rfile.readline()
+                read_headers(rfile, {})
+            best = min(timeit.repeat(parse, repeat=3, number=number))
+            yield [name, "%.2f" % (best * 1e6 / number)]
+        finally:
+            client.close()
+            server.close()
+
+def upload_report(path=SCRIPT_NAME + "/upload", total=100 * 1024 * 1024,
+                  chunksizes=(1024, 65536)):
+    """Time uploading 'total' bytes with Transfer-Encoding: chunked."""
+    import socket
+    yield ('chunk size', 'MB', 'seconds', 'MB/s')
+    for chunksize in chunksizes:
+        chunk = ntob("%x\r\n" % chunksize) + ntob("x") * chunksize + ntob("\r\n")
+        # Send many chunks per sendall, so the client isn't the bottleneck.
+        per_block = max(1, 65536 // chunksize)
+        block = chunk * per_block
+        blocks = total // (chunksize * per_block)
+
+        sock = socket.create_connection(
+            ("127.0.0.1", cherrypy.server.socket_port))
+        try:
+            start = time.time()
+            sock.sendall(ntob("POST %s HTTP/1.1\r\n"
+                              "Host: 127.0.0.1\r\n"
+                              "Transfer-Encoding: chunked\r\n"
+                              "Connection: close\r\n\r\n" % path))
+            for i in range(blocks):
+                sock.sendall(block)
+            sock.sendall(ntob("0\r\n\r\n"))
+            response = []
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                response.append(data)
+            elapsed = time.time() - start
+        finally:
+            sock.close()
+
+        sent = blocks * per_block * chunksize
+        received = ntob('').join(response).split(ntob("\r\n\r\n"), 1)[-1]
+        if int(received) != sent:
+            raise AssertionError("Server read %r bytes of %r" % (received, sent))
+        mb = sent / (1024.0 * 1024)
+        yield [chunksize, "%.0f" % mb, "%.2f" % elapsed, "%.1f" % (mb / elapsed)]
+
 def print_report(rows):
     for row in rows:
         print("")
@@ -295,6 +524,16 @@ def run_standard_benchmarks():
            "%s server threads):" % cherrypy.server.thread_pool)
     print_report(size_report())
 
+    print("")
+    print("Write Coalescing Report (1000 requests, 27 byte JSON body, "
+           "10 client threads, %s server threads):" % cherrypy.server.thread_pool)
+    print_report(coalesce_report())
+
+    print("")
+    print("Chunked Upload Report (100 MB request body, %s server threads):"
+          % cherrypy.server.thread_pool)
+    print_report(upload_report())
+
 
 #                         modpython and other WSGI                         #
 
@@ -345,7 +584,7 @@ def run_modpython(use_wsgi=False):
 
 
 if __name__ == '__main__':
-    longopts = ['cpmodpy', 'modpython', 'null', 'notests',
+    longopts = ['cpmodpy', 'modpython', 'null', 'notests', 'parser', 'upload',
                 'help', 'ab=', 'apache=']
     try:
         switches, args = getopt.getopt(sys.argv[1:], "", longopts)
@@ -358,6 +597,13 @@ if __name__ == '__main__':
         print(__doc__)
         sys.exit(0)
 
+    if "--parser" in opts:
+        print("Header Parser Report (%d headers; 'original' is the "
+              "CherryPy 3.2.4 parser, the others are current):" %
+              (PARSE_REQUEST.count(ntob("\r\n")) - 2))
+        print_report(parse_report())
+        sys.exit(0)
+
     if "--ab" in opts:
         AB_PATH = opts['--ab']
 
@@ -379,7 +625,11 @@ if __name__ == '__main__':
                 print("\nUsing null Request object")
             try:
                 try:
-                    run_standard_benchmarks()
+                    if "--upload" in opts:
+                        print("Chunked Upload Report (100 MB request body):")
+                        print_report(upload_report())
+                    else:
+                        run_standard_benchmarks()
                 except:
                     print(_cperror.format_exc())
                     raise
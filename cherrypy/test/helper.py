@@ -198,6 +198,14 @@ def get_wsgi_u_supervisor(**options):
     cherrypy.server.wsgi_version = ('u', 0)
     return LocalWSGISupervisor(**options)
 
+def get_asyncio_supervisor(**options):
+    cherrypy.server.asyncio = True
+    return LocalWSGISupervisor(**options)
+
+def get_direct_supervisor(**options):
+    cherrypy.server.native_gateway = True
+    return LocalWSGISupervisor(**options)
+
 
 class CPWebCase(webtest.WebCase):
 
@@ -206,6 +214,8 @@ class CPWebCase(webtest.WebCase):
 
     available_servers = {'wsgi': LocalWSGISupervisor,
                          'wsgi_u': get_wsgi_u_supervisor,
+                         'asyncio': get_asyncio_supervisor,
+                         'direct': get_direct_supervisor,
                          'native': NativeServerSupervisor,
                          'cpmodpy': get_cpmodpy_supervisor,
                          'modpygw': get_modpygw_supervisor,
@@ -378,6 +388,55 @@ class CPWebCase(webtest.WebCase):
                                  (dt1, dt2, seconds))
 
 
+class ServerConfigCase(CPWebCase):
+    """A CPWebCase whose setup_server may change cherrypy.server settings.
+
+    The server's attributes are saved before setup_server runs and put
+    back once the class is done, so later test classes start from the
+    same settings whatever this one changed.
+    """
+
+    # Set on cherrypy.server while it runs, rather than by config.
+    runtime_attributes = ('bus', 'httpserver', 'interrupt', 'running')
+
+    def setup_class(cls):
+        ''
+        cls._saved_server_attrs = dict(vars(cherrypy.server))
+        super(ServerConfigCase, cls).setup_class()
+    setup_class = classmethod(setup_class)
+
+    def teardown_class(cls):
+        ''
+        super(ServerConfigCase, cls).teardown_class()
+        saved = cls._saved_server_attrs
+        current = vars(cherrypy.server)
+        for key in list(current.keys()):
+            if key in cls.runtime_attributes:
+                continue
+            if key in saved:
+                current[key] = saved[key]
+            else:
+                # Fall back to the class default.
+                del current[key]
+        for key, value in saved.items():
+            if key not in current:
+                current[key] = value
+    teardown_class = classmethod(teardown_class)
+
+
+def wait_for(condition, timeout=5, interval=0.05):
+    """Call condition() until it returns a true value or timeout passes.
+
+    Return the last value returned, so callers can assert on it.
+    """
+    deadline = time.time() + timeout
+    while True:
+        result = condition()
+        if result or time.time() >= deadline:
+            return result
+        time.sleep(interval)
+
+
 def setup_client():
     """Set up the WebCase classes to match the server's socket settings."""
     webtest.WebCase.PORT = cherrypy.server.socket_port
@@ -405,9 +464,11 @@ log.access_file: r'%(access_log)s'
     error_log = os.path.join(thisdir, 'test.error.log')
     access_log = os.path.join(thisdir, 'test.access.log')
 
-    def __init__(self, wait=False, daemonize=False, ssl=False, socket_host=None, socket_port=None):
+    def __init__(self, wait=False, daemonize=False, ssl=False, socket_host=None, socket_port=None,
+                 workers=None):
         self.wait = wait
         self.daemonize = daemonize
+        self.workers = workers
         self.ssl = ssl
         self.host = socket_host or cherrypy.server.socket_host
         self.port = socket_port or cherrypy.server.socket_port
@@ -454,6 +515,10 @@ server.ssl_private_key: r'%s'
         if self.daemonize:
             args.append('-d')
 
+        if self.workers:
+            args.append('-w')
+            args.append(str(self.workers))
+
         env = os.environ.copy()
         # Make sure we import the cherrypy package in which this module is defined.
         grandparentdir = os.path.abspath(os.path.join(thisdir, '..', '..'))
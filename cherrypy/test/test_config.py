@@ -35,6 +35,14 @@ def setup_server():
             return self.db
         dbscheme.exposed = True
 
+        def scribble(self, key):
+            before = cherrypy.request.config.get(key, None)
+            cherrypy.request.config[key] = 'scribbled'
+            del cherrypy.request.config['bar']
+            return repr((before, cherrypy.request.config.get(key),
+                         'bar' in cherrypy.request.config))
+        scribble.exposed = True
+
         def plain(self, x):
             return x
         plain.exposed = True
@@ -229,6 +237,60 @@ class ConfigTests(helper.CPWebCase):
             body=ntob('\xff\xfex\x00=\xff\xfea\x00b\x00c\x00'))
         self.assertBody("abc")
 
+    def test_request_config_layers(self):
+        # Writes to request.config only last for the current request.
+        for i in range(2):
+            self.getPage("/scribble?key=foo")
+            self.assertBody(repr(('this', 'scribbled', False)))
+        self.getPage("/?key=bar")
+        self.assertBody("that")
+
+        # Changes to global and node config show up at once.
+        cherrypy.config.update({'luxuryyacht': 'ffffort'})
+        conf = cherrypy.tree.apps[''].root._cp_config
+        conf['bar'] = 'the other'
+        try:
+            self.getPage("/?key=luxuryyacht")
+            self.assertBody("ffffort")
+            self.getPage("/?key=bar")
+            self.assertBody("the other")
+        finally:
+            cherrypy.config.update({'luxuryyacht': 'throatwobblermangrove'})
+            conf['bar'] = 'that'
+
+    def test_request_config_sections(self):
+        # Changes to app.config between requests show up at once, even
+        # when they are made in place rather than through app.merge().
+        app = cherrypy.tree.apps['']
+        root_section = app.config['/']
+        self.getPage("/foo/bar?key=nested")
+        self.assertBody("None")
+        try:
+            # A value set in an existing section...
+            root_section['nested'] = ['root']
+            self.getPage("/foo/bar?key=nested")
+            self.assertBody("['root']")
+            # ...a value changed in place...
+            root_section['nested'].append('more')
+            self.getPage("/foo/bar?key=nested")
+            self.assertBody("['root', 'more']")
+            # ...a section added for a path already visited...
+            app.config['/foo'] = {'nested': 'foo'}
+            self.getPage("/foo/bar?key=nested")
+            self.assertBody("'foo'")
+            # ...and a section replaced.
+            app.config['/'] = dict(root_section, foo='replaced')
+            self.getPage("/?key=foo")
+            self.assertBody("replaced")
+        finally:
+            app.config['/'] = root_section
+            root_section.pop('nested', None)
+            app.config.pop('/foo', None)
+        self.getPage("/foo/bar?key=nested")
+        self.assertBody("None")
+        self.getPage("/?key=foo")
+        self.assertBody("this")
+
 
 class VariableSubstitutionTests(unittest.TestCase):
     setup_server = staticmethod(setup_server)
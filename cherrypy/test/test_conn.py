@@ -1,7 +1,10 @@
 """Tests for TCP connection handling, including proper and timely close."""
 
+import os
 import socket
 import sys
+import tempfile
+import threading
 import time
 timeout = 1
 
@@ -60,6 +63,18 @@ def setup_server():
             return "thanks for '%s'" % cherrypy.request.body.read()
         upload.exposed = True
 
+        def upload_lines(self):
+            rfile = cherrypy.request.rfile
+            lines = []
+            while True:
+                line = rfile.readline()
+                if not line:
+                    break
+                lines.append(repr(line))
+            return ", ".join(lines)
+        upload_lines.exposed = True
+        upload_lines._cp_config = {'request.process_request_body': False}
+
         def custom(self, response_code):
             cherrypy.response.status = response_code
             return "Code = %s" % response_code
@@ -625,6 +640,20 @@ class ConnectionTests(helper.CPWebCase):
         self.assertStatus('200 OK')
         self.assertBody("thanks for '%s'" % ntob('xx\r\nxxxxyyyyy'))
 
+        # Read lines which span many small chunks.
+        body = ntob("3\r\nab\n\r\n1\r\nc\r\n4\r\nd\nef\r\n2\r\ng\n\r\n"
+                    "1\r\nh\r\n0\r\n\r\n")
+        conn.putrequest("POST", "/upload_lines", skip_host=True)
+        conn.putheader("Host", self.HOST)
+        conn.putheader("Transfer-Encoding", "chunked")
+        conn.endheaders()
+        conn.send(body)
+        response = conn.getresponse()
+        self.status, self.headers, self.body = webtest.shb(response)
+        self.assertStatus('200 OK')
+        self.assertBody(", ".join([repr(ntob(x)) for x in
+                                   ("ab\n", "cd\n", "efg\n", "h")]))
+
         # Try a chunked request that exceeds server.max_request_body_size.
         # Note that the delimiters and trailer are included.
         body = ntob("3e3\r\n" + ("x" * 995) + "\r\n0\r\n\r\n")
@@ -732,3 +761,718 @@ class BadRequestTests(helper.CPWebCase):
         self.assertBody("HTTP requires CRLF terminators")
         conn.close()
 
+
+
+def setup_polling_server():
+    setup_server()
+    cherrypy.config.update({
+        'server.keepalive_polling': True,
+        'server.thread_pool': 1,
+        })
+
+
+class KeepAlivePollingTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_polling_server)
+
+    def _get(self, conn, url):
+        conn.request("GET", url)
+        response = conn.getresponse()
+        body = response.read()
+        self.assertEqual(response.status, 200)
+        return body
+
+    def test_idle_connections_do_not_hold_workers(self):
+        if cherrypy.server.protocol_version != "HTTP/1.1":
+            return self.skip()
+
+        # With a single worker thread, a second persistent connection
+        # would have to wait for the first one to time out unless the
+        # idle connection is parked between requests.
+        conn1 = self.get_conn()
+        conn2 = self.get_conn()
+        try:
+            start = time.time()
+            self.assertEqual(self._get(conn1, "/hello"), ntob("Hello, world!"))
+            self.assertEqual(self._get(conn2, "/hello"), ntob("Hello, world!"))
+            self.assertEqual(self._get(conn1, "/page1"), ntob(pov))
+            self.assertEqual(self._get(conn2, "/page2"), ntob(pov))
+            self.assertTrue(time.time() - start < timeout)
+        finally:
+            conn1.close()
+            conn2.close()
+
+    def test_parked_connection_timeout(self):
+        if cherrypy.server.protocol_version != "HTTP/1.1":
+            return self.skip()
+
+        conn = self.get_conn()
+        try:
+            self.assertEqual(self._get(conn, "/hello"), ntob("Hello, world!"))
+
+            # Once our socket timeout (plus a poll interval) has passed,
+            # the server should close the parked connection without a
+            # response. Allow it plenty of time to do so.
+            conn.sock.settimeout(timeout * 10)
+            self.assertEqual(conn.sock.recv(1), ntob(''))
+        finally:
+            conn.close()
+
+
+def setup_keepalive_policy_server():
+    setup_server()
+    cherrypy.config.update({
+        'server.thread_pool': 1,
+        'server.keepalive_timeout': 0.3,
+        'server.keepalive_requests': 3,
+        # Far longer than keepalive_timeout, so the two can't be confused.
+        'server.socket_timeout': 10,
+        })
+
+
+class KeepAlivePolicyTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_keepalive_policy_server)
+
+    def _get(self, conn, url):
+        conn.request("GET", url)
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        response.read()
+        return response.getheader("Connection")
+
+    def test_max_requests(self):
+        if cherrypy.server.protocol_version != "HTTP/1.1":
+            return self.skip()
+
+        httpserver = cherrypy.server.httpserver
+        httpserver.stats['Enabled'] = True
+        conn = self.get_conn()
+        try:
+            self.assertEqual(self._get(conn, "/hello"), None)
+            self.assertEqual(self._get(conn, "/hello"), None)
+            self.assertEqual(self._get(conn, "/hello"), "close")
+            self.assertEqual(httpserver.stats['Keep-Alive Limits Reached'], 1)
+        finally:
+            httpserver.stats['Enabled'] = False
+            conn.close()
+
+    def test_idle_timeout(self):
+        if cherrypy.server.protocol_version != "HTTP/1.1":
+            return self.skip()
+
+        conn = self.get_conn()
+        try:
+            self._get(conn, "/hello")
+            # The server should close the idle connection once
+            # keepalive_timeout has passed, well before the socket timeout.
+            conn.sock.settimeout(5)
+            self.assertEqual(conn.sock.recv(1), ntob(''))
+        finally:
+            conn.close()
+
+    def test_close_when_saturated(self):
+        if cherrypy.server.protocol_version != "HTTP/1.1":
+            return self.skip()
+        if cherrypy.server.asyncio:
+            return self.skip("skipped (the asyncio server does not queue) ")
+
+        conn1 = self.get_conn()
+        conn2 = None
+        try:
+            self.assertEqual(self._get(conn1, "/hello"), None)
+            # The only worker is waiting for conn1's next request, so conn2
+            # has to queue; conn1's next response should then close it.
+            conn2 = self.get_conn()
+            conn2.request("GET", "/hello")
+            pool = cherrypy.server.httpserver.requests
+            self.assertTrue(helper.wait_for(lambda: pool.qsize))
+            self.assertEqual(self._get(conn1, "/hello"), "close")
+            response = conn2.getresponse()
+            self.assertEqual(response.status, 200)
+            response.read()
+        finally:
+            conn1.close()
+            if conn2 is not None:
+                conn2.close()
+
+
+def setup_coalescing_server():
+    setup_server()
+
+    class Tiny:
+
+        def index(self):
+            def content():
+                for x in range(70):
+                    yield ntob(str(x % 10))
+                # An empty chunk pushes out what has been gathered.
+                yield ntob('')
+                yield ntob('end')
+            return content()
+        index.exposed = True
+        index._cp_config = {'response.stream': True}
+
+    cherrypy.tree.mount(Tiny(), '/tiny')
+    cherrypy.config.update({
+        'server.min_chunk_size': 64,
+        'server.chunk_flush_size': 30,
+        })
+
+
+class ChunkCoalescingTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_coalescing_server)
+
+    def test_small_chunks_are_gathered(self):
+        if cherrypy.server.protocol_version != "HTTP/1.1":
+            return self.skip()
+        if not getattr(cherrypy.server.httpserver, 'min_chunk_size', 0):
+            return self.skip("skipped (not using the builtin WSGI server) ")
+
+        conn = self.get_conn()
+        try:
+            conn.putrequest("GET", "/tiny/", skip_host=True)
+            conn.putheader("Host", self.HOST)
+            conn.putheader("Connection", "close")
+            conn.endheaders()
+            data = []
+            while True:
+                chunk = conn.sock.recv(65536)
+                if not chunk:
+                    break
+                data.append(chunk)
+        finally:
+            conn.close()
+
+        head, body = ntob('').join(data).split(ntob("\r\n\r\n"), 1)
+        self.assertTrue(ntob("Transfer-Encoding: chunked") in head)
+        sizes = []
+        while True:
+            size, body = body.split(ntob("\r\n"), 1)
+            size = int(size, 16)
+            if not size:
+                break
+            sizes.append(size)
+            body = body[size + 2:]
+        # 70 one-byte chunks, sent whenever 30 bytes have been gathered
+        # and at the empty chunk; then 'end', sent at the end.
+        self.assertEqual(sizes, [30, 30, 10, 3])
+
+
+listener_socket_file = os.path.join(tempfile.gettempdir(),
+                                    'cp_test_listener.sock')
+
+def setup_listener_server():
+    setup_server()
+    cherrypy.config.update({
+        'server.listeners': [{'bind_addr': listener_socket_file}],
+        })
+
+
+class ListenerTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_listener_server)
+
+    def teardown_class(cls):
+        super(ListenerTests, cls).teardown_class()
+        try:
+            os.unlink(listener_socket_file)
+        except OSError:
+            pass
+    teardown_class = classmethod(teardown_class)
+
+    def test_unix_listener(self):
+        if not hasattr(socket, 'AF_UNIX'):
+            return self.skip("skipped (no UNIX sockets) ")
+        if not getattr(cherrypy.server.httpserver, 'listeners', None):
+            return self.skip("skipped (not using the builtin server) ")
+
+        # The main address still works...
+        self.getPage("/hello")
+        self.assertStatus(200)
+        self.assertBody("Hello, world!")
+
+        # ...and the extra listener is served by the same pool.
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.connect(listener_socket_file)
+            s.sendall(ntob("GET /hello HTTP/1.0\r\nHost: localhost\r\n\r\n"))
+            data = []
+            while True:
+                chunk = s.recv(65536)
+                if not chunk:
+                    break
+                data.append(chunk)
+        finally:
+            s.close()
+        response = ntob('').join(data)
+        self.assertTrue(response.startswith(ntob("HTTP/1.")))
+        self.assertTrue(ntob(" 200 OK\r\n") in response)
+        self.assertTrue(response.endswith(ntob("\r\n\r\nHello, world!")))
+
+
+def setup_batch_accept_server():
+    setup_server()
+    cherrypy.config.update({
+        'server.accept_batch_size': 16,
+        'server.accept_threads': 2,
+        # Room in the backlog for the whole burst.
+        'server.socket_queue_size': 32,
+        })
+
+
+class BatchAcceptTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_batch_accept_server)
+
+    def test_burst_of_connections(self):
+        if getattr(cherrypy.server.httpserver, 'accept_batch_size', 1) < 2:
+            return self.skip("skipped (not using the builtin server) ")
+
+        # Open a burst of connections before sending anything, so several
+        # are waiting in the backlog when the server wakes up.
+        conns = []
+        for i in range(20):
+            conns.append(self.get_conn())
+        try:
+            for conn in conns:
+                conn.putrequest("GET", "/hello", skip_host=True)
+                conn.putheader("Host", self.HOST)
+                conn.putheader("Connection", "close")
+                conn.endheaders()
+            for conn in conns:
+                response = conn.response_class(conn.sock, method="GET")
+                response.begin()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.read(), ntob("Hello, world!"))
+        finally:
+            for conn in conns:
+                conn.close()
+
+        self.getPage("/hello")
+        self.assertStatus(200)
+
+
+def setup_deadline_server():
+    setup_server()
+
+    class Worker(object):
+        def read_slowly(self):
+            # Read the body a piece at a time, working in between.
+            rfile = cherrypy.request.rfile
+            size = 0
+            while True:
+                data = rfile.read(32768)
+                if not data:
+                    break
+                size += len(data)
+                time.sleep(0.4)
+            return str(size)
+        read_slowly.exposed = True
+        read_slowly._cp_config = {'request.process_request_body': False}
+
+    cherrypy.tree.mount(Worker(), '/worker')
+    cherrypy.config.update({
+        'server.header_timeout': 1,
+        'server.min_body_rate': 100,
+        })
+
+
+class ReadDeadlineTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_deadline_server)
+
+    def trickle(self, head, byte):
+        """Send head, then the given byte every 0.25s; return the reply.
+
+        Each byte comes well within the socket timeout (1 second). Give up
+        after 10 seconds if the server doesn't.
+        """
+        if self.scheme == 'https':
+            return self.skip("skipped (raw socket test) ")
+        stats = cherrypy.server.httpserver.stats
+        stats['Enabled'] = True
+        slow_clients = stats['Slow Clients']
+        s = socket.create_connection((self.interface(), self.PORT))
+        try:
+            s.settimeout(0.25)
+            s.sendall(ntob(head))
+            start = time.time()
+            data = ntob('')
+            while time.time() - start < 10:
+                try:
+                    s.sendall(ntob(byte))
+                except socket.error:
+                    break
+                try:
+                    chunk = s.recv(4096)
+                except socket.timeout:
+                    continue
+                except socket.error:
+                    break
+                if not chunk:
+                    break
+                data += chunk
+            elapsed = time.time() - start
+            # The stat may be counted just after the connection closes.
+            counted = helper.wait_for(
+                lambda: stats['Slow Clients'] == slow_clients + 1)
+        finally:
+            s.close()
+            stats['Enabled'] = False
+        # Given up on after about 1 second, not after 10.
+        self.assertTrue(elapsed < 5)
+        self.assertTrue(counted)
+        return data
+
+    def test_slow_headers(self):
+        if not hasattr(cherrypy.server.httpserver, 'header_timeout'):
+            return self.skip("skipped (not using the builtin server) ")
+        data = self.trickle("GET /hello HTTP/1.1\r\nHost: %s\r\n"
+                            "X-Slow: " % self.HOST, "x")
+        self.assertTrue(ntob(" 408 Request Timeout\r\n") in data)
+
+        # Prompt clients are unaffected.
+        self.getPage("/hello")
+        self.assertStatus(200)
+
+    def test_slow_body(self):
+        if not hasattr(cherrypy.server.httpserver, 'min_body_rate'):
+            return self.skip("skipped (not using the builtin server) ")
+        self.trickle("POST /upload_lines HTTP/1.1\r\nHost: %s\r\n"
+                     "Content-Type: text/plain\r\n"
+                     "Content-Length: 1000\r\n\r\n" % self.HOST, "x\n")
+
+        body = "x\n" * 100
+        self.getPage("/upload_lines", method="POST", body=body,
+                     headers=[("Content-Type", "text/plain"),
+                              ("Content-Length", str(len(body)))])
+        self.assertStatus(200)
+
+    def test_slow_handler(self):
+        httpserver = cherrypy.server.httpserver
+        if not hasattr(httpserver, 'min_body_rate'):
+            return self.skip("skipped (not using the builtin server) ")
+        # The client sends promptly, and has some 2 seconds (the socket
+        # timeout plus 1 second at min_body_rate) to do so. The application
+        # takes over 3 seconds to read the body, but only the time spent
+        # waiting for the client should count.
+        old = httpserver.min_body_rate, httpserver.max_request_body_size
+        httpserver.min_body_rate = 262144
+        httpserver.max_request_body_size = 0
+        try:
+            body = "x" * 262144
+            self.getPage("/worker/read_slowly", method="POST", body=body,
+                         headers=[("Content-Type", "application/octet-stream"),
+                                  ("Content-Length", str(len(body)))])
+        finally:
+            httpserver.min_body_rate, httpserver.max_request_body_size = old
+        self.assertStatus(200)
+        self.assertBody(str(len(body)))
+
+
+timing_samples = []
+
+def setup_timing_server():
+    setup_server()
+    cherrypy.config.update({'server.timing_hook': timing_samples.append})
+
+
+class TimingTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_timing_server)
+
+    def test_timing(self):
+        httpserver = cherrypy.server.httpserver
+        if getattr(httpserver, 'timing_hook', None) is None:
+            return self.skip("skipped (not using the builtin server) ")
+
+        del timing_samples[:]
+        httpserver.stats['Enabled'] = True
+        try:
+            self.getPage("/hello")
+            self.assertStatus(200)
+            self.getPage("/stream?set_cl=Yes")
+            self.assertStatus(200)
+
+            # The hook is called once the response is complete, which may
+            # be just after the client has read it (so a sample from the
+            # previous test may turn up too).
+            helper.wait_for(lambda: len(timing_samples) >= 2)
+        finally:
+            httpserver.stats['Enabled'] = False
+        self.assertTrue(len(timing_samples) >= 2)
+        for t in timing_samples:
+            self.assertTrue(t['accepted'] <= t['queued'] <= t['dequeued']
+                            <= t['started'] <= t['headers']
+                            <= t['first_byte'] <= t['completed'])
+
+        response = httpserver.stats['Latency']['Response']
+        self.assertTrue(response['Count'](response) >= 2)
+        self.assertTrue(response['p50 (ms)'](response) <=
+                        response['Max (ms)'](response))
+        queue = httpserver.stats['Latency']['Queue Wait']
+        self.assertTrue(queue['Count'](queue) >= 1)
+
+    def test_histogram(self):
+        from cherrypy import wsgiserver
+        h = wsgiserver.LatencyHistogram()
+
+        def record():
+            for i in range(2000):
+                h.record(0.002)
+        threads = [threading.Thread(target=record) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(h.count, 8000)
+        self.assertEqual(sum(h.counts), 8000)
+        # The bucket bound (2.5ms), but no more than the slowest sample.
+        self.assertEqual(h.percentile(50), 0.002)
+
+        # Past the last bucket, a percentile is the slowest sample.
+        for i in range(8001):
+            h.record(90)
+        self.assertEqual(h.percentile(50), 90)
+
+
+def setup_autoscale_server():
+    setup_server()
+
+    class Slow:
+
+        def index(self, t='1'):
+            time.sleep(float(t))
+            return "slept"
+        index.exposed = True
+
+    cherrypy.tree.mount(Slow(), '/slow')
+    cherrypy.config.update({
+        'server.thread_pool': 1,
+        'server.thread_pool_max': 3,
+        'server.thread_pool_autoscale': True,
+        'server.thread_pool_interval': 0.1,
+        'server.thread_pool_cooldown': 1,
+        })
+
+
+class ThreadPoolAutoscaleTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_autoscale_server)
+
+    def test_grow_and_shrink(self):
+        httpserver = cherrypy.server.httpserver
+        if not getattr(httpserver, 'scaler', None):
+            return self.skip("skipped (not using the builtin server) ")
+
+        pool = httpserver.requests
+
+        def alive():
+            return len([t for t in pool._threads if t.isAlive()])
+
+        results = []
+        def slow_request():
+            conn = self.get_conn()
+            try:
+                conn.request("GET", "/slow/?t=1", headers={"Connection": "close"})
+                results.append(conn.getresponse().read())
+            finally:
+                conn.close()
+
+        clients = [threading.Thread(target=slow_request) for i in range(3)]
+        for c in clients:
+            c.start()
+        # The queued requests should make the pool grow to its max...
+        grown = helper.wait_for(lambda: alive() == 3)
+        for c in clients:
+            c.join()
+        self.assertEqual(results, [ntob("slept")] * 3)
+        self.assertTrue(grown, "The pool did not grow to its maximum.")
+        self.assertTrue(httpserver.stats['Pool Grows'] >= 1)
+
+        # ...and once idle for the cooldown, shrink back toward its min.
+        shrunk = helper.wait_for(lambda: alive() == 1, timeout=10)
+        self.assertTrue(shrunk, "The pool did not shrink back to its minimum.")
+        self.assertTrue(httpserver.stats['Pool Shrinks'] >= 1)
+
+    def test_tick_after_shrink(self):
+        from cherrypy import wsgiserver
+
+        class Worker(object):
+            conn = None
+            def isAlive(self):
+                return True
+
+        class Server(object):
+            stats = {'Pool Grows': 0, 'Pool Shrinks': 0}
+
+        # Four workers, two of them busy, and one connection waiting.
+        server = Server()
+        pool = server.requests = wsgiserver.ThreadPool(server, min=1, max=8)
+        pool._threads = [Worker() for i in range(4)]
+        pool._threads[0].conn = pool._threads[1].conn = object()
+        self.assertEqual(pool.shrink(2), 2)
+        pool._queue.put(object())
+
+        # The queued shutdown requests are not waiting connections, so the
+        # pool doesn't grow again...
+        scaler = wsgiserver.ThreadPoolScaler(server, interval=1, cooldown=0)
+        scaler.tick()
+        self.assertEqual(server.stats['Pool Grows'], 0)
+        # ...and the workers taking them count toward shrinking to its min.
+        self.assertEqual(pool.shrink(5), 1)
+        self.assertEqual(pool.pending_shutdowns, 3)
+
+
+def setup_shedding_server():
+    setup_autoscale_server()
+    cherrypy.config.update({
+        'server.thread_pool_max': 1,
+        'server.thread_pool_autoscale': False,
+        'server.accepted_queue_size': 1,
+        'server.overload_retry_after': 7,
+        })
+
+
+class LoadSheddingTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_shedding_server)
+
+    def test_full_queue_sheds_with_503(self):
+        if not hasattr(cherrypy.server.httpserver, 'accepted_queue_size'):
+            return self.skip("skipped (not using the builtin server) ")
+        if cherrypy.server.asyncio:
+            return self.skip("skipped (the asyncio server does not queue) ")
+
+        # Let the server finish with any connections from startup checks
+        # (which may still be waiting to be accepted, and so may make it
+        # shed our first requests).
+        def answered():
+            conn = self.get_conn()
+            try:
+                conn.request("GET", "/hello", headers={"Connection": "close"})
+                response = conn.getresponse()
+                response.read()
+                return response.status == 200
+            finally:
+                conn.close()
+        self.assertTrue(helper.wait_for(answered))
+        pool = cherrypy.server.httpserver.requests
+        self.assertTrue(helper.wait_for(
+            lambda: not pool.qsize and pool.idle))
+
+        # Occupy the only worker thread...
+        busy = self.get_conn()
+        busy.request("GET", "/slow/?t=2", headers={"Connection": "close"})
+        self.assertTrue(helper.wait_for(lambda: not pool.idle))
+        # ...and fill the queue.
+        queued = self.get_conn()
+        queued.request("GET", "/hello", headers={"Connection": "close"})
+        self.assertTrue(helper.wait_for(lambda: pool.qsize))
+
+        shed = self.get_conn()
+        try:
+            shed.request("GET", "/hello")
+            response = shed.getresponse()
+            self.assertEqual(response.status, 503)
+            self.assertEqual(response.getheader("Retry-After"), "7")
+            response.read()
+        finally:
+            shed.close()
+
+        # The accepted requests are still answered.
+        response = busy.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), ntob("slept"))
+        busy.close()
+        response = queued.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), ntob("Hello, world!"))
+        queued.close()
+
+
+def setup_asyncio_server():
+    setup_server()
+    if sys.version_info >= (3, 5):
+        cherrypy.config.update({
+            'server.asyncio': True,
+            'server.thread_pool': 1,
+            })
+
+
+class AsyncioServerTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_asyncio_server)
+
+    def test_idle_connections_hold_no_thread(self):
+        if not cherrypy.server.asyncio:
+            return self.skip("skipped (no asyncio) ")
+        if cherrypy.server.protocol_version != "HTTP/1.1":
+            return self.skip()
+
+        # With a single thread, the threaded server would leave the second
+        # client waiting until the first one's keep-alive times out.
+        conn1 = self.get_conn()
+        conn2 = self.get_conn()
+        try:
+            for conn in (conn1, conn2, conn1, conn2):
+                conn.sock.settimeout(timeout / 2.0)
+                conn.request("GET", "/hello")
+                response = conn.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.read(), ntob("Hello, world!"))
+        finally:
+            conn1.close()
+            conn2.close()
+
+
+def setup_tls_server():
+    setup_server()
+    cherrypy.config.update({
+        # Long enough that a handshake stalled in the accept thread would
+        # hold up the next client far longer than the tests allow.
+        'server.socket_timeout': 10,
+        'server.ssl_session_cache': True,
+        })
+
+
+class TLSTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_tls_server)
+
+    def test_stalled_handshake(self):
+        if self.scheme != 'https':
+            return self.skip("skipped (no SSL adapter) ")
+
+        # A client which connects but never starts its handshake...
+        stalled = socket.create_connection((self.interface(), self.PORT))
+        try:
+            # ...should not keep the next one from being served.
+            start = time.time()
+            self.getPage("/hello")
+            self.assertStatus(200)
+            self.assertTrue(time.time() - start < 5)
+        finally:
+            stalled.close()
+
+    def test_session_resumed(self):
+        if self.scheme != 'https':
+            return self.skip("skipped (no SSL adapter) ")
+        import ssl
+        if not hasattr(getattr(ssl, 'SSLSocket', None), 'session'):
+            return self.skip("skipped (no client TLS sessions) ")
+
+        context = ssl.SSLContext(getattr(ssl, 'PROTOCOL_TLSv1_2',
+                                         ssl.PROTOCOL_SSLv23))
+        session = None
+        reused = []
+        for i in range(2):
+            s = context.wrap_socket(
+                socket.create_connection((self.interface(), self.PORT)),
+                session=session)
+            try:
+                s.sendall(ntob("GET /hello HTTP/1.1\r\nHost: %s\r\n"
+                               "Connection: close\r\n\r\n" % self.HOST))
+                try:
+                    while s.recv(65536):
+                        pass
+                except ssl.SSLError:
+                    # Closed without a close_notify.
+                    pass
+                session = s.session
+                reused.append(s.session_reused)
+            finally:
+                s.close()
+        # The second connection resumes the first one's session.
+        self.assertEqual(reused, [False, True])
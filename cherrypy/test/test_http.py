@@ -177,6 +177,23 @@ class HTTPTests(helper.CPWebCase):
         self.body = response.fp.read(20)
         self.assertBody("Illegal header line.")
 
+    def test_bare_lf_in_header_block(self):
+        # The whole header block arrives at once, so it is parsed in bulk;
+        # a bare LF must still be rejected there.
+        if self.scheme == 'https':
+            c = HTTPSConnection('%s:%s' % (self.interface(), self.PORT))
+        else:
+            c = HTTPConnection('%s:%s' % (self.interface(), self.PORT))
+        c._output(ntob('GET / HTTP/1.1\r\nHost: %s\nX-Foo: bar\r\n' %
+                       self.HOST))
+        c._send_output()
+        response = c.response_class(c.sock, method='GET')
+        response.begin()
+        self.assertEqual(response.status, 400)
+        self.assertEqual(response.fp.read(30),
+                         ntob("HTTP requires CRLF terminators"))
+        c.close()
+
     def test_http_over_https(self):
         if self.scheme != 'https':
             return self.skip("skipped (not running HTTPS)... ")
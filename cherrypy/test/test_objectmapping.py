@@ -402,3 +402,51 @@ class ObjectMappingTest(helper.CPWebCase):
         # However, this does not apply to tree.mount
         self.assertRaises(TypeError, cherrypy.tree.mount, a, None)
 
+
+    def testTreeScriptName(self):
+        tree = cherrypy._cptree.Tree()
+        tree.graft(None, "")
+        tree.graft(None, "/a")
+        tree.graft(None, "/a/b/")
+        for path, script_name in [("/", ""), ("/a", "/a"), ("/a/", "/a"),
+                                  ("/ab", ""), ("/a/bc", "/a"),
+                                  ("/a/b", "/a/b"), ("/a/b/c/d", "/a/b")]:
+            # Twice, to hit the memoized lookup too.
+            self.assertEqual(tree.script_name(path), script_name)
+            self.assertEqual(tree.script_name(path), script_name)
+
+        # Changes to the mounts take effect at once.
+        del tree.apps["/a/b"]
+        self.assertEqual(tree.script_name("/a/b/c/d"), "/a")
+        tree.apps = {"/x": None}
+        self.assertEqual(tree.script_name("/a/b/c/d"), None)
+        self.assertEqual(tree.script_name("/x/y"), "/x")
+
+    def testHandlerCache(self):
+        from cherrypy._cpdispatch import handler_cache_stats as stats
+        self.script_name = "/users/fred/blog"
+
+        hits = stats['Hits']
+        for i in range(2):
+            self.getPage("/confvalue")
+            self.assertBody("fred")
+        self.assertEqual(stats['Hits'], hits + 1)
+
+        # Merging config into the app forgets its cached handlers.
+        app = cherrypy.tree.apps["/users/fred/blog"]
+        app.merge({'/confvalue': {'user': 'barney'}})
+        try:
+            self.getPage("/confvalue")
+            self.assertBody("barney")
+        finally:
+            del app.config['/confvalue']
+            app.handler_cache.clear()
+
+        # Handlers which take part of the path as arguments aren't cached.
+        uncacheable = stats['Uncacheable']
+        for i in range(2):
+            self.getPage("/extra/too/much")
+            self.assertBody("('too', 'much')")
+            self.getPage("/this/method/does/not/exist")
+            self.assertBody("default:('this', 'method', 'does', 'not', 'exist')")
+        self.assertEqual(stats['Uncacheable'], uncacheable + 4)
@@ -321,6 +321,55 @@ class PluginTests(helper.CPWebCase):
         if p.exit_code != 0:
             self.fail("Daemonized parent process failed to exit cleanly.")
 
+    def test_prefork(self):
+        if os.name not in ['posix']:
+            return self.skip("skipped (not on posix) ")
+        if not (hasattr(socket, 'SO_REUSEPORT') or
+                sys.platform.startswith('linux')):
+            return self.skip("skipped (no SO_REUSEPORT) ")
+        self.HOST = '127.0.0.1'
+        self.PORT = 8082
+        p = helper.CPProcess(ssl=(self.scheme.lower()=='https'),
+                             socket_host='127.0.0.1',
+                             socket_port=8082, workers=2)
+        p.write_conf(
+             extra='test_case_name: "test_prefork"')
+        p.start(imports='cherrypy.test._test_states_demo')
+
+        def worker_pids(count, exclude=()):
+            pids = set()
+            for trial in range(100):
+                self.getPage("/pid")
+                self.assertStatus(200)
+                pid = int(self.body)
+                if pid not in exclude:
+                    pids.add(pid)
+                if len(pids) == count:
+                    break
+            return pids
+
+        try:
+            # The kernel should spread new connections over both workers.
+            pids = worker_pids(2)
+            self.assertEqual(len(pids), 2)
+            self.assertTrue(p.get_pid() not in pids)
+
+            # A dead worker should be replaced (after respawn_delay).
+            dead = pids.pop()
+            os.kill(dead, signal.SIGKILL)
+            new_pids = helper.wait_for(
+                lambda: worker_pids(1, exclude=pids), timeout=10)
+            self.assertEqual(len(new_pids), 1)
+            self.assertTrue(dead not in new_pids)
+            pids.update(new_pids)
+        finally:
+            # Stopping the supervisor should stop its workers.
+            os.kill(p.get_pid(), signal.SIGTERM)
+            p.join()
+
+        for pid in pids:
+            self.assertRaises(OSError, os.kill, pid, 0)
+
 
 class SignalHandlingTests(helper.CPWebCase):
     def test_SIGHUP_tty(self):
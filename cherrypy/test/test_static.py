@@ -40,6 +40,12 @@ class StaticTest(helper.CPWebCase):
                 return static.serve_fileobj(f, content_type='text/css')
             fileobj.exposed = True
 
+            def binfile(self):
+                # Not text/*, so the encode tool leaves the file body alone.
+                return static.serve_file(os.path.join(curdir, 'style.css'),
+                                         'application/octet-stream')
+            binfile.exposed = True
+
             def bytesio(self):
                 f = BytesIO(ntob('Fee\nfie\nfo\nfum'))
                 return static.serve_fileobj(f, content_type='text/plain')
@@ -201,6 +207,50 @@ class StaticTest(helper.CPWebCase):
         self.assertHeader('Content-Type', 'text/css;charset=utf-8')
         self.assertMatchesBody('^Dummy stylesheet')
 
+    def test_serve_file_range(self):
+        # A single range of a real file can go out via wsgi.file_wrapper,
+        # which must start at the range, not the start of the file.
+        css = open(os.path.join(curdir, 'style.css'), 'rb').read()
+        self.getPage("/binfile", headers=[('Range', 'bytes=3-12')])
+        self.assertStatus('206 Partial Content')
+        self.assertHeader('Content-Length', 10)
+        self.assertBody(css[3:13])
+
+        self.getPage("/binfile")
+        self.assertStatus('200 OK')
+        self.assertBody(css)
+
+    def test_sendfile(self):
+        import socket
+        if (not cherrypy.server.using_wsgi or cherrypy.server.asyncio
+            or self.scheme == 'https' or not hasattr(os, 'sendfile')
+            or not hasattr(socket.socket, 'sendfile')):
+            return self.skip("skipped (no sendfile)... ")
+
+        jpg = open(os.path.join(curdir, 'static', 'dirback.jpg'), 'rb').read()
+        # Recorded before the bytes go out, so the client can't beat it.
+        calls = []
+        real_sendfile = os.sendfile
+        def sendfile(out_fd, in_fd, offset, count):
+            calls.append((offset, count))
+            return real_sendfile(out_fd, in_fd, offset, count)
+        os.sendfile = sendfile
+        try:
+            self.getPage("/static/dirback.jpg")
+            self.assertStatus('200 OK')
+            self.assertBody(jpg)
+            self.assertEqual(calls[0], (0, len(jpg)))
+
+            # A single range is sent from its offset, up to its length.
+            del calls[:]
+            self.getPage("/static/dirback.jpg",
+                         headers=[('Range', 'bytes=100-1099')])
+            self.assertStatus('206 Partial Content')
+            self.assertBody(jpg[100:1100])
+            self.assertEqual(calls[0], (100, 1000))
+        finally:
+            os.sendfile = real_sendfile
+
     def test_serve_bytesio(self):
         self.getPage("/bytesio")
         self.assertStatus('200 OK')
@@ -91,6 +91,9 @@ class ToolTests(helper.CPWebCase):
             clen = int(cherrypy.request.headers['Content-Length'])
             cherrypy.request.body = cherrypy.request.rfile.read(clen)
 
+        def noop():
+            pass
+
         # Assert that we can use a callable object instead of a function.
         class Rotator(object):
             def __call__(self, scale):
@@ -141,6 +144,43 @@ class ToolTests(helper.CPWebCase):
             pipe.exposed = True
             pipe._cp_config = {'hooks.before_request_body': pipe_body}
 
+            # Hooks compiled once for their config section
+            def hookchain(self):
+                hookmap = cherrypy.request.hooks
+                shared = isinstance(dict.get(hookmap, 'on_start_resource'),
+                                    tuple)
+                hooks = hookmap['on_start_resource']
+                names = [h.callback.__name__ for h in hooks]
+                # Changing the list in place must not reach other requests.
+                hooks.append(cherrypy._cprequest.Hook(len))
+                hookmap.attach('on_start_resource', len)
+                after = len(hookmap['on_start_resource'])
+                return repr((shared, names, after))
+            hookchain.exposed = True
+            hookchain._cp_config = {
+                'hooks.on_start_resource': cherrypy._cprequest.Hook(
+                    noop, priority=10),
+                'tools.response_headers.on': True,
+                'tools.response_headers.headers': [('X-Chain', 'on')],
+                }
+
+            # Hooks appended to a chain directly, out of order
+            def hookorder(self):
+                def record(name):
+                    headers = cherrypy.response.headers
+                    headers['X-Order'] = headers.get('X-Order', '') + name
+                hooks = cherrypy.request.hooks['before_finalize']
+                hooks.append(cherrypy._cprequest.Hook(
+                    record, priority=70, name='late'))
+                hooks.append(cherrypy._cprequest.Hook(
+                    record, priority=30, name='early,'))
+                return "ok"
+            hookorder.exposed = True
+            hookorder._cp_config = {
+                'tools.response_headers.on': True,
+                'tools.response_headers.headers': [('X-Chain', 'on')],
+                }
+
             # Multiple decorators; include kwargs just for fun.
             # Note that rotator must run before gzip.
             def decorated_euro(self, *vpath):
@@ -369,6 +409,29 @@ class ToolTests(helper.CPWebCase):
                      method="POST", body=content)
         self.assertBody(content)
 
+    def testCompiledHooks(self):
+        self.getPage("/hookchain")
+        self.assertHeader("X-Chain", "on")
+        shared, names, after = eval(self.body)
+        self.assertTrue(shared)
+        self.assertEqual(names, ['noop', 'response_headers'])
+        self.assertEqual(after, 4)
+
+        # The next request shares the same (sorted) chain of hooks, which
+        # the hooks added by the first request did not change.
+        self.getPage("/hookchain")
+        self.assertHeader("X-Chain", "on")
+        self.assertEqual(eval(self.body), (True, names, 4))
+
+    def testAppendedHooksRunInOrder(self):
+        # The compiled chain is shared, so the appends go to a copy, which
+        # must still be run in priority order.
+        for trial in range(2):
+            self.getPage("/hookorder")
+            self.assertBody("ok")
+            self.assertHeader("X-Chain", "on")
+            self.assertHeader("X-Order", "early,late")
+
     def testHandlerWrapperTool(self):
         self.getPage("/tarfile")
         self.assertBody("I am a tarfile")
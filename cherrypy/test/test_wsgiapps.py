@@ -1,3 +1,6 @@
+import os
+curdir = os.path.join(os.getcwd(), os.path.dirname(__file__))
+
 from cherrypy._cpcompat import ntob
 from cherrypy.test import helper
 
@@ -28,6 +31,27 @@ class WSGIGraftTests(helper.CPWebCase):
             start_response(status, response_headers)
             return [ntob('Hello'), ntob(''), ntob(' '), ntob(''), ntob('world')]
 
+        def test_environ_app(environ, start_response):
+            # Scribble on the environ; the next request must not see it.
+            seen = environ.get('test.seen', 'no')
+            environ['test.seen'] = 'yes'
+            environ['REMOTE_PORT'] = '0'
+            start_response('200 OK', [('Content-type', 'text/plain')])
+            return [ntob('%s %s' % (environ['QUERY_STRING'], seen))]
+
+        def test_file_app(environ, start_response):
+            path = os.path.join(curdir, 'style.css')
+            start_response('200 OK', [
+                ('Content-type', 'text/css'),
+                ('Content-Length', str(os.path.getsize(path)))])
+            return environ['wsgi.file_wrapper'](open(path, 'rb'), 4)
+
+        def upper_middleware(nextapp):
+            # Transforms each chunk, so it must see the whole file body.
+            def app(environ, start_response):
+                return [chunk.upper()
+                        for chunk in nextapp(environ, start_response)]
+            return app
 
         class WSGIResponse(object):
 
@@ -76,6 +100,9 @@ class WSGIGraftTests(helper.CPWebCase):
 
         cherrypy.tree.graft(test_app, '/hosted/app1')
         cherrypy.tree.graft(test_empty_string_app, '/hosted/app3')
+        cherrypy.tree.graft(test_environ_app, '/hosted/app4')
+        cherrypy.tree.graft(test_file_app, '/hosted/file')
+        cherrypy.tree.graft(upper_middleware(test_file_app), '/hosted/upper')
 
         # Set script_name explicitly to None to signal CP that it should
         # be pulled from the WSGI environ each time.
@@ -116,3 +143,194 @@ This is a wsgi app running within CherryPy!'''
         self.assertHeader("Content-Type", "text/plain")
         self.assertInBody('Hello world')
 
+    def test_07_environ_per_request(self):
+        import cherrypy
+        if not cherrypy.server.using_wsgi:
+            return self.skip("skipped (not using WSGI)... ")
+        self.PROTOCOL = "HTTP/1.1"
+        self.persistent = True
+        try:
+            # Both requests go over one connection, whose environ template
+            # the first request must not have changed.
+            self.getPage("/hosted/app4?a")
+            self.assertBody("a no")
+            self.getPage("/hosted/app4?b")
+            self.assertBody("b no")
+        finally:
+            self.persistent = False
+
+    def test_08_path_info_dispatcher(self):
+        from cherrypy import wsgiserver
+
+        def dispatched_app(name):
+            def app(environ, start_response):
+                return (name, environ['SCRIPT_NAME'], environ['PATH_INFO'])
+            return app
+
+        dispatcher = wsgiserver.WSGIPathInfoDispatcher(
+            {'/': dispatched_app('root'), '/a': dispatched_app('a'),
+             '/a/b/': dispatched_app('ab')})
+        for path, result in [("/a", ("a", "/s/a", "")),
+                             ("/a/b/c", ("ab", "/s/a/b", "/c")),
+                             ("/a/bc", ("a", "/s/a", "/bc")),
+                             ("/ab", ("root", "/s", "/ab")),
+                             ("", ("root", "/s", "/"))]:
+            # Twice, to hit the memoized lookup too.
+            for i in range(2):
+                environ = {'SCRIPT_NAME': '/s', 'PATH_INFO': path}
+                self.assertEqual(dispatcher(environ, None), result)
+
+    def test_09_file_wrapper(self):
+        import cherrypy
+        if not cherrypy.server.using_wsgi:
+            return self.skip("skipped (not using WSGI)... ")
+        css = open(os.path.join(curdir, 'style.css'), 'rb').read()
+        self.getPage("/hosted/file")
+        self.assertStatus('200 OK')
+        self.assertBody(css)
+
+        self.getPage("/hosted/upper")
+        self.assertStatus('200 OK')
+        self.assertBody(css.upper())
+
+    def test_10_date_cache(self):
+        import sys
+        import cherrypy
+        from cherrypy import wsgiserver
+        from cherrypy.lib import httputil
+        if not cherrypy.server.using_wsgi:
+            return self.skip("skipped (not using WSGI)... ")
+        server_mod = sys.modules[wsgiserver.HTTPRequest.__module__]
+
+        # Calls within one second share a value, until the next second.
+        first = wsgiserver.http_date(1000000000.1)
+        self.assertEqual(first, 'Sun, 09 Sep 2001 01:46:40 GMT')
+        self.assertTrue(wsgiserver.http_date(1000000000.9) is first)
+        second = wsgiserver.http_date(1000000001.0)
+        self.assertEqual(second, 'Sun, 09 Sep 2001 01:46:41 GMT')
+        self.assertTrue(wsgiserver.http_date(1000000001.5) is second)
+        if hasattr(server_mod, 'http_date_bytes'):
+            first = server_mod.http_date_bytes(1000000000.2)
+            self.assertEqual(first, ntob('Sun, 09 Sep 2001 01:46:40 GMT'))
+            self.assertTrue(server_mod.http_date_bytes(1000000000.8) is first)
+        self.assertTrue(httputil.http_date is wsgiserver.http_date)
+
+        # Both Response (for CherryPy pages) and send_headers (for WSGI
+        # apps which set no Date) must take their Date from the cache.
+        stamp = 'Thu, 01 Jan 1970 00:00:00 GMT'
+        def fixed_date(timeval=None):
+            return stamp
+        def fixed_date_bytes(timeval=None):
+            return ntob(stamp)
+        saved = (httputil.http_date, server_mod.http_date,
+                 getattr(server_mod, 'http_date_bytes', None))
+        httputil.http_date = server_mod.http_date = fixed_date
+        if saved[2] is not None:
+            server_mod.http_date_bytes = fixed_date_bytes
+        try:
+            self.getPage("/")
+            self.assertHeader("Date", stamp)
+            self.getPage("/hosted/app3")
+            self.assertHeader("Date", stamp)
+        finally:
+            httputil.http_date, server_mod.http_date = saved[:2]
+            if saved[2] is not None:
+                server_mod.http_date_bytes = saved[2]
+
+def setup_direct_server():
+    import cherrypy
+
+    class Passthrough(object):
+
+        def __init__(self, nextapp):
+            self.nextapp = nextapp
+
+        def __call__(self, environ, start_response):
+            return self.nextapp(environ, start_response)
+
+    class Root:
+        def index(self, q=None):
+            request = cherrypy.request
+            return "%s %s %s" % (hasattr(request, 'wsgi_environ'), q,
+                                 request.headers.get('X-Test'))
+        index.exposed = True
+
+        def redirect(self):
+            raise cherrypy.InternalRedirect('/', 'q=redirected')
+        redirect.exposed = True
+
+        def echo(self, *args):
+            return "/".join(args)
+        echo.exposed = True
+
+        def local(self):
+            request = cherrypy.request
+            return "%s %s %s %s" % (hasattr(request, 'wsgi_environ'),
+                                    request.local.name, request.base,
+                                    request.remote.ip)
+        local.exposed = True
+
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [('Content-type', 'text/plain')])
+        return [ntob('WSGI app')]
+
+    cherrypy.tree.mount(Root())
+    app = cherrypy.tree.mount(Root(), '/piped')
+    app.wsgiapp.pipeline.append(('passthrough', Passthrough))
+    cherrypy.tree.graft(wsgi_app, '/hosted')
+    cherrypy.config.update({'server.native_gateway': True})
+
+
+class DirectGatewayTests(helper.ServerConfigCase):
+    setup_server = staticmethod(setup_direct_server)
+
+    def test_plain_apps_bypass_wsgi(self):
+        import cherrypy
+        if not cherrypy.server.using_wsgi or cherrypy.server.wsgi_version != (1, 0):
+            return self.skip("skipped (not using the builtin WSGI 1.0 server)... ")
+
+        self.getPage("/?q=1", headers=[("X-Test", "yes")])
+        self.assertBody("False 1 yes")
+        self.getPage("/redirect")
+        self.assertBody("False redirected None")
+        self.getPage("/echo/caf%C3%A9/x")
+        self.assertBody(ntob("caf\xc3\xa9/x"))
+
+        # Apps with WSGI middleware, and WSGI apps, still go through WSGI.
+        self.getPage("/piped/?q=1", headers=[("X-Test", "yes")])
+        self.assertBody("True 1 yes")
+        self.getPage("/hosted")
+        self.assertBody("WSGI app")
+
+    def test_local_and_remote(self):
+        import socket
+        import cherrypy
+        if not cherrypy.server.using_wsgi or cherrypy.server.wsgi_version != (1, 0):
+            return self.skip("skipped (not using the builtin WSGI 1.0 server)... ")
+        if self.scheme == 'https':
+            return self.skip("skipped (raw socket test)... ")
+
+        def fetch(path):
+            # HTTP/1.0 without a Host header, so request.base comes from
+            # request.local.
+            s = socket.create_connection((self.interface(), self.PORT))
+            try:
+                s.sendall(ntob("GET %s HTTP/1.0\r\n\r\n" % path))
+                data = ntob('')
+                while True:
+                    chunk = s.recv(65536)
+                    if not chunk:
+                        break
+                    data += chunk
+            finally:
+                s.close()
+            return data.split(ntob("\r\n\r\n"), 1)[1].decode().split()
+
+        direct = fetch("/local")
+        wsgi = fetch("/piped/local")
+        self.assertEqual(direct[0], "False")
+        self.assertEqual(wsgi[0], "True")
+        # The native gateway fills in the same values as WSGI does.
+        self.assertEqual(direct[1:], wsgi[1:])
+        self.assertEqual(direct[1], cherrypy.server.socket_host)
+        self.assertEqual(direct[2], "http://%s" % cherrypy.server.socket_host)
@@ -1,9 +1,11 @@
-__all__ = ['HTTPRequest', 'HTTPConnection', 'HTTPServer',
+__all__ = ['HTTPRequest', 'HTTPConnection', 'HTTPServer', 'Listener',
            'SizeCheckWrapper', 'KnownLengthRFile', 'ChunkedRFile',
-           'MaxSizeExceeded', 'NoSSLError', 'FatalSSLAlert',
-           'WorkerThread', 'ThreadPool', 'SSLAdapter',
+           'MaxSizeExceeded', 'NoSSLError', 'FatalSSLAlert', 'SlowClientError',
+           'WorkerThread', 'ThreadPool', 'ThreadPoolScaler', 'KeepAlivePoller',
+           'LatencyHistogram', 'SSLAdapter',
            'CherryPyWSGIServer',
            'Gateway', 'WSGIGateway', 'WSGIGateway_10', 'WSGIGateway_u0',
+           'FileWrapper', 'http_date',
            'WSGIPathInfoDispatcher', 'get_ssl_adapter_class']
 
 import sys
@@ -0,0 +1,74 @@
+"""A small, thread-safe least-recently-used cache for memoizing lookups.
+
+Reads take no lock: each hit just stamps the entry with a new tick. When
+the cache outgrows maxsize, the least recently used quarter of it is
+dropped in one go, so the cost of eviction is spread over many inserts.
+
+It lives in the wsgiserver package, which imports nothing from the rest
+of CherryPy, so that WSGIPathInfoDispatcher and cherrypy.tree can share it.
+"""
+
+import threading
+
+
+class LRUCache(object):
+    """A mapping of at most maxsize items, dropping those least recently used.
+
+    Lookups and stores from several threads may interleave; the worst that
+    can happen is that an entry's recency is slightly off, or a value is
+    computed twice.
+    """
+
+    maxsize = 1000
+    """The maximum number of items to keep."""
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.data = {}
+        self.tick = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """Return the value for key (marking it as used), or default."""
+        try:
+            entry = self.data[key]
+        except KeyError:
+            return default
+        self.tick += 1
+        entry[1] = self.tick
+        return entry[0]
+
+    def __setitem__(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.tick += 1
+        self.data[key] = [value, self.tick]
+        if len(self.data) > self.maxsize:
+            self._evict()
+
+    def _evict(self):
+        self.lock.acquire()
+        try:
+            data = self.data
+            if len(data) <= self.maxsize:
+                # Another thread already made room.
+                return
+            excess = len(data) - (self.maxsize * 3) // 4
+            # The index breaks ties, so that keys are never compared.
+            oldest = [(entry[1], i, key)
+                      for i, (key, entry) in enumerate(list(data.items()))]
+            oldest.sort()
+            for tick, i, key in oldest[:excess]:
+                data.pop(key, None)
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        """Remove all items."""
+        self.data.clear()
@@ -20,6 +20,8 @@ except ImportError:
         DEFAULT_BUFFER_SIZE = -1
 
 import sys
+import threading
+import time
 
 from cherrypy import wsgiserver
 
@@ -39,6 +41,49 @@ class BuiltinSSLAdapter(wsgiserver.SSLAdapter):
         self.certificate = certificate
         self.private_key = private_key
         self.certificate_chain = certificate_chain
+        self._context = None
+        self._context_born = None
+        self._context_lock = threading.Lock()
+        self._retired_stats = {'full': 0, 'resumed': 0}
+
+    def get_context(self):
+        """Return the shared SSLContext, replacing it if its key is too old.
+
+        OpenSSL keeps its session cache and ticket key on the context, so
+        wrapping every socket with one long-lived context is what lets
+        clients resume their sessions. Returns None if this version of
+        Python can't share contexts, or the session cache is turned off.
+        """
+        if not self.session_cache or not hasattr(ssl, 'SSLContext'):
+            return None
+        self._context_lock.acquire()
+        try:
+            lifetime = self.ticket_key_lifetime
+            if self._context is not None and lifetime is not None:
+                if time.time() - self._context_born >= lifetime:
+                    # A new context gets a new random ticket key.
+                    self._retired_stats = self.session_stats()
+                    self._context = None
+            if self._context is None:
+                c = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+                c.load_cert_chain(self.certificate, self.private_key)
+                if not self.session_tickets:
+                    c.options |= getattr(ssl, 'OP_NO_TICKET', 0x4000)
+                self._context = c
+                self._context_born = time.time()
+            return self._context
+        finally:
+            self._context_lock.release()
+
+    def session_stats(self):
+        """Return a dict of 'full' and 'resumed' handshake counts."""
+        stats = self._retired_stats.copy()
+        c = self._context
+        if c is not None:
+            cs = c.session_stats()
+            stats['full'] += cs['accept_good'] - cs['hits']
+            stats['resumed'] += cs['hits']
+        return stats
 
     def bind(self, sock):
         """Wrap and return the given socket."""
@@ -46,10 +91,16 @@ class BuiltinSSLAdapter(wsgiserver.SSLAdapter):
 
     def wrap(self, sock):
         """Wrap and return the given socket, plus WSGI environ entries."""
+        context = self.get_context()
         try:
-            s = ssl.wrap_socket(sock, do_handshake_on_connect=True,
-                    server_side=True, certfile=self.certificate,
-                    keyfile=self.private_key, ssl_version=ssl.PROTOCOL_SSLv23)
+            if context is None:
+                s = ssl.wrap_socket(sock, do_handshake_on_connect=True,
+                        server_side=True, certfile=self.certificate,
+                        keyfile=self.private_key,
+                        ssl_version=ssl.PROTOCOL_SSLv23)
+            else:
+                s = context.wrap_socket(sock, do_handshake_on_connect=True,
+                                        server_side=True)
         except ssl.SSLError:
             e = sys.exc_info()[1]
             if e.errno == ssl.SSL_ERROR_EOF:
@@ -170,6 +170,8 @@ class pyOpenSSLAdapter(wsgiserver.SSLAdapter):
         self.private_key = private_key
         self.certificate_chain = certificate_chain
         self._environ = None
+        self._context_born = None
+        self._context_lock = threading.Lock()
 
     def bind(self, sock):
         """Wrap and return the given socket."""
@@ -181,8 +183,22 @@ class pyOpenSSLAdapter(wsgiserver.SSLAdapter):
 
     def wrap(self, sock):
         """Wrap and return the given socket, plus WSGI environ entries."""
+        if self._context_born is not None and self.ticket_key_lifetime is not None:
+            # The handshake hasn't happened yet, so we can still move the
+            # connection to a context with a fresh ticket key.
+            sock.set_context(self._rotate_context())
         return sock, self._environ.copy()
 
+    def _rotate_context(self):
+        """Return self.context, replacing it first if its key is too old."""
+        self._context_lock.acquire()
+        try:
+            if time.time() - self._context_born >= self.ticket_key_lifetime:
+                self.context = self.get_context()
+            return self.context
+        finally:
+            self._context_lock.release()
+
     def get_context(self):
         """Return an SSL.Context from self attributes."""
         # See http://aspn.activestate.com/ASPN/Cookbook/Python/Recipe/442473
@@ -191,6 +207,15 @@ class pyOpenSSLAdapter(wsgiserver.SSLAdapter):
         if self.certificate_chain:
             c.load_verify_locations(self.certificate_chain)
         c.use_certificate_file(self.certificate)
+        if self.session_cache:
+            c.set_session_id("CherryPy")
+            if self.session_timeout is not None:
+                c.set_timeout(self.session_timeout)
+        else:
+            c.set_session_cache_mode(SSL.SESS_CACHE_OFF)
+        if not self.session_tickets:
+            c.set_options(getattr(SSL, 'OP_NO_TICKET', 0x4000))
+        self._context_born = time.time()
         return c
 
     def get_environ(self):
@@ -68,21 +68,26 @@ number of requests and their responses, so we run a nested loop::
                     return
 """
 
-__all__ = ['HTTPRequest', 'HTTPConnection', 'HTTPServer',
+__all__ = ['HTTPRequest', 'HTTPConnection', 'HTTPServer', 'Listener',
            'SizeCheckWrapper', 'KnownLengthRFile', 'ChunkedRFile',
            'CP_makefile',
-           'MaxSizeExceeded', 'NoSSLError', 'FatalSSLAlert',
-           'WorkerThread', 'ThreadPool', 'SSLAdapter',
+           'MaxSizeExceeded', 'NoSSLError', 'FatalSSLAlert', 'SlowClientError',
+           'WorkerThread', 'ThreadPool', 'ThreadPoolScaler', 'KeepAlivePoller',
+           'LatencyHistogram', 'SSLAdapter',
            'CherryPyWSGIServer',
            'Gateway', 'WSGIGateway', 'WSGIGateway_10', 'WSGIGateway_u0',
+           'FileWrapper', 'http_date',
            'WSGIPathInfoDispatcher', 'get_ssl_adapter_class']
 
+import bisect
 import os
 try:
     import queue
 except:
     import Queue as queue
 import re
+import select
+import stat
 import email.utils
 import socket
 import sys
@@ -166,6 +171,11 @@ socket_errors_to_ignore.append("The read operation timed out")
 socket_errors_nonblocking = plat_specific_errors(
     'EAGAIN', 'EWOULDBLOCK', 'WSAEWOULDBLOCK')
 
+SO_REUSEPORT = getattr(socket, 'SO_REUSEPORT', None)
+if SO_REUSEPORT is None and sys.platform.startswith('linux'):
+    # Older Pythons don't define it, but Linux has had it since 3.9.
+    SO_REUSEPORT = 15
+
 comma_separated_headers = [ntob(h) for h in
     ['Accept', 'Accept-Charset', 'Accept-Encoding',
      'Accept-Language', 'Accept-Ranges', 'Allow', 'Cache-Control',
@@ -174,10 +184,60 @@ comma_separated_headers = [ntob(h) for h in
      'Trailer', 'Transfer-Encoding', 'Upgrade', 'Vary', 'Via', 'Warning',
      'WWW-Authenticate']]
 
+# Common request headers: title-cased names, keyed by the spellings clients
+# usually send, so read_headers can mostly skip strip() and title(); and
+# their WSGI environ keys, so get_environ can skip upper() and replace().
+header_names = {}
+header_environ_keys = {}
+for _name in [
+    'Accept', 'Accept-Charset', 'Accept-Encoding', 'Accept-Language',
+    'Authorization', 'Cache-Control', 'Connection', 'Content-Length',
+    'Content-Type', 'Cookie', 'Dnt', 'Expect', 'Host', 'If-Match',
+    'If-Modified-Since', 'If-None-Match', 'If-Range', 'If-Unmodified-Since',
+    'Keep-Alive', 'Origin', 'Pragma', 'Range', 'Referer', 'Te',
+    'Transfer-Encoding', 'Upgrade', 'Upgrade-Insecure-Requests',
+    'User-Agent', 'Via', 'X-Forwarded-For', 'X-Forwarded-Host',
+    'X-Forwarded-Proto', 'X-Real-Ip', 'X-Requested-With']:
+    _title = ntob(_name)
+    for _spelling in (_name, _name.lower(), _name.upper()):
+        header_names[ntob(_spelling)] = _title
+    header_environ_keys[_title] = "HTTP_" + _name.upper().replace("-", "_")
+del _name, _title, _spelling
+
 
 import logging
 if not hasattr(logging, 'statistics'): logging.statistics = {}
 
+_date_cache = (None, None, None)
+
+def _cached_date(timeval):
+    """Return a (second, str, bytes) tuple for timeval, formatting at most once a second.
+
+    The tuple is swapped in whole, so concurrent readers need no lock;
+    at worst two threads format the same second.
+    """
+    global _date_cache
+    if timeval is None:
+        timeval = time.time()
+    second = int(timeval)
+    cache = _date_cache
+    if cache[0] != second:
+        value = email.utils.formatdate(second, usegmt=True)
+        cache = _date_cache = (second, value, value.encode('ISO-8859-1'))
+    return cache
+
+def http_date(timeval=None):
+    """Return timeval (default now) as an RFC 1123 HTTP-date string.
+
+    Responses in the same second share one cached string, so this is
+    much cheaper than calling formatdate for every response.
+    """
+    return _cached_date(timeval)[1]
+
+def http_date_bytes(timeval=None):
+    """Return timeval (default now) as an RFC 1123 HTTP-date byte string."""
+    return _cached_date(timeval)[2]
+
 
 def read_headers(rfile, hdict=None):
     """Read headers from the given stream into the given header dict.
@@ -194,20 +254,43 @@ def read_headers(rfile, hdict=None):
     if hdict is None:
         hdict = {}
 
-    while True:
-        line = rfile.readline()
-        if not line:
-            # No more data--illegal end of headers
-            raise ValueError("Illegal end of headers.")
+    # If the whole header block is already buffered, take it in one read
+    # rather than a readline() per header.
+    lines = None
+    peek = getattr(rfile, 'peek', None)
+    if peek is not None:
+        buf = peek()
+        if buf[:2] == CRLF:
+            rfile.read(2)
+            return hdict
+        end = buf.find(CRLF + CRLF)
+        if end != -1:
+            block = rfile.read(end + 4)[:end]
+            if block.count(LF) != block.count(CRLF):
+                raise ValueError("HTTP requires CRLF terminators")
+            lines = block.split(CRLF)
 
-        if line == CRLF:
-            # Normal end of headers
-            break
-        if not line.endswith(CRLF):
-            raise ValueError("HTTP requires CRLF terminators")
+    if lines is None:
+        lines = []
+        while True:
+            line = rfile.readline()
+            if not line:
+                # No more data--illegal end of headers
+                raise ValueError("Illegal end of headers.")
+
+            if line == CRLF:
+                # Normal end of headers
+                break
+            if not line.endswith(CRLF):
+                raise ValueError("HTTP requires CRLF terminators")
+            lines.append(line[:-2])
 
-        if line[0] in (SPACE, TAB):
+    hname = None
+    for line in lines:
+        if line[:1] in (SPACE, TAB):
             # It's a continuation line.
+            if hname is None:
+                raise ValueError("Illegal continuation line.")
             v = line.strip()
         else:
             try:
@@ -215,11 +298,12 @@ def read_headers(rfile, hdict=None):
             except ValueError:
                 raise ValueError("Illegal header line.")
             # TODO: what about TE and WWW-Authenticate?
-            k = k.strip().title()
+            hname = header_names.get(k)
+            if hname is None:
+                hname = k.strip().title()
             v = v.strip()
-            hname = k
 
-        if k in comma_separated_headers:
+        if hname in comma_separated_headers:
             existing = hdict.get(hname)
             if existing:
                 v = b", ".join((existing, v))
@@ -243,6 +327,13 @@ class SizeCheckWrapper(object):
         if self.maxlen and self.bytes_read > self.maxlen:
             raise MaxSizeExceeded()
 
+    def peek(self):
+        """Return (without consuming) the data buffered by our rfile."""
+        peek = getattr(self.rfile, 'peek', None)
+        if peek is None:
+            return EMPTY
+        return peek()
+
     def read(self, size=None):
         data = self.rfile.read(size)
         self.bytes_read += len(data)
@@ -256,6 +347,13 @@ class SizeCheckWrapper(object):
             self._check_length()
             return data
 
+        # If the whole line is already buffered, take it in one read.
+        peek = getattr(self.rfile, 'peek', None)
+        if peek is not None:
+            nl = peek().find(LF)
+            if nl != -1:
+                return self.read(nl + 1)
+
         # User didn't specify a size ...
         # We read the line in chunks to make sure it's not a 100MB line !
         res = []
@@ -368,11 +466,15 @@ class ChunkedRFile(object):
         self.rfile = rfile
         self.maxlen = maxlen
         self.bytes_read = 0
-        self.buffer = EMPTY
         self.bufsize = bufsize
         self.closed = False
+        # Chunk data is read straight from rfile (which does the buffering)
+        # rather than gathered into a buffer of our own, which callers then
+        # had to slice; that copied the unread remainder on every read.
+        self.chunk_remaining = 0
 
     def _fetch(self):
+        """Read the next chunk-size line; set closed after the last chunk."""
         if self.closed:
             return
 
@@ -399,63 +501,64 @@ class ChunkedRFile(object):
         if self.maxlen and self.bytes_read + chunk_size > self.maxlen:
             raise IOError("Request Entity Too Large")
 
-        chunk = self.rfile.read(chunk_size)
-        self.bytes_read += len(chunk)
-        self.buffer += chunk
+        self.chunk_remaining = chunk_size
 
-        crlf = self.rfile.read(2)
-        if crlf != CRLF:
-            raise ValueError(
-                 "Bad chunked transfer coding (expected '\\r\\n', "
-                 "got " + repr(crlf) + ")")
+    def _read_chunk(self, size, readline=False):
+        """Return up to 'size' bytes (or up to a newline) of the current chunk."""
+        if size is None or size < 0 or size > self.chunk_remaining:
+            size = self.chunk_remaining
+        if readline:
+            data = self.rfile.readline(size)
+        else:
+            data = self.rfile.read(size)
+        self.bytes_read += len(data)
+        self.chunk_remaining -= len(data)
 
-    def read(self, size=None):
-        data = EMPTY
-        while True:
-            if size and len(data) >= size:
-                return data
+        if not data or not self.chunk_remaining:
+            crlf = self.rfile.read(2)
+            if crlf != CRLF:
+                raise ValueError(
+                     "Bad chunked transfer coding (expected '\\r\\n', "
+                     "got " + repr(crlf) + ")")
+        return data
 
-            if not self.buffer:
+    def read(self, size=None):
+        chunks = []
+        while size is None or size < 0 or size > 0:
+            if not self.chunk_remaining:
                 self._fetch()
-                if not self.buffer:
+                if self.closed:
                     # EOF
-                    return data
+                    break
 
-            if size:
-                remaining = size - len(data)
-                data += self.buffer[:remaining]
-                self.buffer = self.buffer[remaining:]
-            else:
-                data += self.buffer
+            data = self._read_chunk(size)
+            chunks.append(data)
+            if size is not None and size > 0:
+                size -= len(data)
 
-    def readline(self, size=None):
-        data = EMPTY
-        while True:
-            if size and len(data) >= size:
-                return data
+        if len(chunks) == 1:
+            return chunks[0]
+        return EMPTY.join(chunks)
 
-            if not self.buffer:
+    def readline(self, size=None):
+        chunks = []
+        while size is None or size < 0 or size > 0:
+            if not self.chunk_remaining:
                 self._fetch()
-                if not self.buffer:
+                if self.closed:
                     # EOF
-                    return data
-
-            newline_pos = self.buffer.find(LF)
-            if size:
-                if newline_pos == -1:
-                    remaining = size - len(data)
-                    data += self.buffer[:remaining]
-                    self.buffer = self.buffer[remaining:]
-                else:
-                    remaining = min(size - len(data), newline_pos)
-                    data += self.buffer[:remaining]
-                    self.buffer = self.buffer[remaining:]
-            else:
-                if newline_pos == -1:
-                    data += self.buffer
-                else:
-                    data += self.buffer[:newline_pos]
-                    self.buffer = self.buffer[newline_pos:]
+                    break
+
+            data = self._read_chunk(size, readline=True)
+            chunks.append(data)
+            if data[-1:] == LF:
+                break
+            if size is not None and size > 0:
+                size -= len(data)
+
+        if len(chunks) == 1:
+            return chunks[0]
+        return EMPTY.join(chunks)
 
     def readlines(self, sizehint=0):
         # Shamelessly stolen from StringIO
@@ -541,6 +644,25 @@ class HTTPRequest(object):
 
     This value is set automatically inside send_headers."""
 
+    coalesce_writes = True
+    """If True (the default), send_headers sends the first chunk of the body
+    along with the headers, in one system call and usually one TCP segment.
+    Small responses then cost a single write."""
+
+    coalesce_limit = 16384
+    """The largest first chunk which coalesce_writes sends along with the
+    headers. A larger one is sent after them, rather than copied to join
+    the two; the extra write is cheap next to a body that size."""
+
+    started_at = None
+    """When the request line was read (if timed; see HTTPServer.timing_hook)."""
+
+    headers_at = None
+    """When the request headers had been parsed (if timed)."""
+
+    first_byte_at = None
+    """When the response started to be written (if timed)."""
+
     def __init__(self, server, conn):
         self.server= server
         self.conn = conn
@@ -548,7 +670,7 @@ class HTTPRequest(object):
         self.ready = False
         self.started_request = False
         self.scheme = ntob("http")
-        if self.server.ssl_adapter is not None:
+        if conn.ssl_adapter is not None:
             self.scheme = ntob("https")
         # Use the lowest-common protocol in case read_request_line errors.
         self.response_protocol = 'HTTP/1.0'
@@ -560,34 +682,44 @@ class HTTPRequest(object):
         self.close_connection = self.__class__.close_connection
         self.chunked_read = False
         self.chunked_write = self.__class__.chunked_write
+        self.timed = server.stats['Enabled'] or server.timing_hook is not None
 
     def parse_request(self):
         """Parse the next HTTP request start-line and message-headers."""
-        self.rfile = SizeCheckWrapper(self.conn.rfile,
-                                      self.server.max_request_header_size)
+        header_timeout = self.server.header_timeout
+        if header_timeout:
+            self.conn.set_read_deadline(header_timeout)
         try:
-            success = self.read_request_line()
-        except MaxSizeExceeded:
-            self.simple_response("414 Request-URI Too Long",
-                "The Request-URI sent with the request exceeds the maximum "
-                "allowed bytes.")
-            return
-        else:
-            if not success:
+            self.rfile = SizeCheckWrapper(self.conn.rfile,
+                                          self.server.max_request_header_size)
+            try:
+                success = self.read_request_line()
+            except MaxSizeExceeded:
+                self.simple_response("414 Request-URI Too Long",
+                    "The Request-URI sent with the request exceeds the maximum "
+                    "allowed bytes.")
                 return
+            else:
+                if not success:
+                    return
 
-        try:
-            success = self.read_request_headers()
-        except MaxSizeExceeded:
-            self.simple_response("413 Request Entity Too Large",
-                "The headers sent with the request exceed the maximum "
-                "allowed bytes.")
-            return
-        else:
-            if not success:
+            try:
+                success = self.read_request_headers()
+            except MaxSizeExceeded:
+                self.simple_response("413 Request Entity Too Large",
+                    "The headers sent with the request exceed the maximum "
+                    "allowed bytes.")
                 return
+            else:
+                if not success:
+                    return
 
-        self.ready = True
+            self.ready = True
+            if self.timed:
+                self.headers_at = time.time()
+        finally:
+            if header_timeout:
+                self.conn.set_read_deadline(None)
 
     def read_request_line(self):
         # HTTP/1.1 connections are persistent by default. If a client
@@ -604,6 +736,8 @@ class HTTPRequest(object):
         self.started_request = True
         if not request_line:
             return False
+        if self.timed:
+            self.started_at = time.time()
 
         if request_line == CRLF:
             # RFC 2616 sec 4.1: "...if the server is reading the protocol
@@ -620,8 +754,11 @@ class HTTPRequest(object):
 
         try:
             method, uri, req_protocol = request_line.strip().split(SPACE, 2)
-            # The [x:y] slicing is necessary for byte strings to avoid getting ord's
-            rp = int(req_protocol[5:6]), int(req_protocol[7:8])
+            if req_protocol == b"HTTP/1.1":
+                rp = (1, 1)
+            else:
+                # The [x:y] slicing is necessary for byte strings to avoid getting ord's
+                rp = int(req_protocol[5:6]), int(req_protocol[7:8])
         except ValueError:
             self.simple_response("400 Bad Request", "Malformed Request-Line")
             return False
@@ -650,13 +787,14 @@ class HTTPRequest(object):
         # before the escaped characters within those components can be
         # safely decoded." http://www.ietf.org/rfc/rfc2396.txt, sec 2.4.2
         # Therefore, "/this%2Fpath" becomes "/this%2Fpath", not "/this/path".
-        try:
-            atoms = [self.unquote_bytes(x) for x in quoted_slash.split(path)]
-        except ValueError:
-            ex = sys.exc_info()[1]
-            self.simple_response("400 Bad Request", ex.args[0])
-            return False
-        path = b"%2F".join(atoms)
+        if b"%" in path:
+            try:
+                atoms = [self.unquote_bytes(x) for x in quoted_slash.split(path)]
+            except ValueError:
+                ex = sys.exc_info()[1]
+                self.simple_response("400 Bad Request", ex.args[0])
+                return False
+            path = b"%2F".join(atoms)
         self.path = path
 
         # Note that, like wsgiref and most other HTTP servers,
@@ -783,6 +921,9 @@ class HTTPRequest(object):
             segment       = *pchar *( ";" param )
             param         = *pchar
         """
+        if uri[:1] == FORWARD_SLASH:
+            # An abs_path; by far the most common case.
+            return None, None, uri
         if uri == ASTERISK:
             return None, None, uri
 
@@ -828,7 +969,15 @@ class HTTPRequest(object):
                 return
             self.rfile = KnownLengthRFile(self.conn.rfile, cl)
 
-        self.server.gateway(self).respond()
+        min_rate = self.server.min_body_rate
+        if min_rate:
+            # Allow the usual timeout for the start of the body.
+            self.conn.set_read_deadline(self.server.timeout, min_rate)
+        try:
+            self.server.gateway(self).respond()
+        finally:
+            if min_rate:
+                self.conn.set_read_deadline(None)
 
         if (self.ready and not self.sent_headers):
             self.sent_headers = True
@@ -838,6 +987,8 @@ class HTTPRequest(object):
 
     def simple_response(self, status, msg=""):
         """Write a simple response back to the client."""
+        if self.timed and self.first_byte_at is None:
+            self.first_byte_at = time.time()
         status = str(status)
         buf = [bytes(self.server.protocol, "ascii") + SPACE +
                bytes(status, "ISO-8859-1") + CRLF,
@@ -870,18 +1021,50 @@ class HTTPRequest(object):
             if x.args[0] not in socket_errors_to_ignore:
                 raise
 
-    def write(self, chunk):
-        """Write unbuffered data to the client."""
+    def write(self, chunk, headers=None):
+        """Write unbuffered data to the client.
+
+        If given, the headers (bytes) are written ahead of the chunk.
+        """
         if self.chunked_write and chunk:
             buf = [bytes(hex(len(chunk)), 'ASCII')[2:], CRLF, chunk, CRLF]
-            self.conn.wfile.write(EMPTY.join(buf))
         else:
+            buf = [chunk]
+        if headers:
+            buf.insert(0, headers)
+        if len(buf) == 1:
             self.conn.wfile.write(chunk)
+        else:
+            self.writev(buf)
 
-    def send_headers(self):
+    def writev(self, buffers):
+        """Write the given byte strings to the client, in one go if possible."""
+        sock = self.conn.socket
+        if self.conn.ssl_env or not hasattr(sock, 'sendmsg'):
+            self.conn.wfile.write(EMPTY.join(buffers))
+            return
+
+        # Plain sockets can gather the buffers themselves, without our
+        # having to copy the (possibly large) body chunk to join them.
+        buffers = list(buffers)
+        while buffers:
+            sent = sock.sendmsg(buffers)
+            # This bypasses wfile, so count what it would have.
+            self.conn.wfile.bytes_written += sent
+            while sent:
+                size = len(buffers[0])
+                if sent < size:
+                    buffers[0] = memoryview(buffers[0])[sent:]
+                    break
+                sent -= size
+                del buffers[0]
+
+    def send_headers(self, chunk=None):
         """Assert, process, and send the HTTP response message-headers.
 
         You must set self.status, and self.outheaders before calling this.
+        If given, the first chunk of the body is sent along with them (see
+        coalesce_writes).
         """
         hkeys = [key.lower() for key, value in self.outheaders]
         status = int(self.status[:3])
@@ -933,18 +1116,24 @@ class HTTPRequest(object):
                 self.rfile.read(remaining)
 
         if b"date" not in hkeys:
-            self.outheaders.append(
-                (b"Date", email.utils.formatdate(usegmt=True).encode('ISO-8859-1')))
+            self.outheaders.append((b"Date", http_date_bytes()))
 
         if b"server" not in hkeys:
-            self.outheaders.append(
-                (b"Server", self.server.server_name.encode('ISO-8859-1')))
+            self.outheaders.append((b"Server", self.server._server_name_bytes))
 
+        if self.timed:
+            self.first_byte_at = time.time()
         buf = [self.server.protocol.encode('ascii') + SPACE + self.status + CRLF]
         for k, v in self.outheaders:
             buf.append(k + COLON + SPACE + v + CRLF)
         buf.append(CRLF)
-        self.conn.wfile.write(EMPTY.join(buf))
+        if (chunk and self.coalesce_writes
+            and len(chunk) <= self.coalesce_limit):
+            self.write(chunk, EMPTY.join(buf))
+        else:
+            self.conn.wfile.write(EMPTY.join(buf))
+            if chunk:
+                self.write(chunk)
 
 
 class NoSSLError(Exception):
@@ -957,9 +1146,32 @@ class FatalSSLAlert(Exception):
     pass
 
 
+class SlowClientError(socket.timeout):
+    """Exception raised when a client sends its request too slowly.
+
+    See HTTPServer.header_timeout and HTTPServer.min_body_rate."""
+    pass
+
+
+class CP_BufferedReader(io.BufferedReader):
+    """Faux file object attached to a socket object."""
+
+    def _get_bytes_read(self):
+        return self.raw.bytes_read
+    def _set_bytes_read(self, value):
+        self.raw.bytes_read = value
+    bytes_read = property(_get_bytes_read, _set_bytes_read)
+
+
 class CP_BufferedWriter(io.BufferedWriter):
     """Faux file object attached to a socket object."""
 
+    def _get_bytes_written(self):
+        return self.raw.bytes_written
+    def _set_bytes_written(self, value):
+        self.raw.bytes_written = value
+    bytes_written = property(_get_bytes_written, _set_bytes_written)
+
     def write(self, b):
         self._checkClosed()
         if isinstance(b, str):
@@ -982,11 +1194,104 @@ class CP_BufferedWriter(io.BufferedWriter):
             del self._write_buf[:n]
 
 
+class CP_SocketIO(socket.SocketIO):
+    """A SocketIO which counts bytes, and whose reads can be held to a deadline."""
+
+    bytes_read = 0
+    bytes_written = 0
+
+    allowance = None
+    """The seconds which reads may yet spend waiting for data, counted once
+    the first byte has arrived (None until then). Time spent between reads
+    does not count."""
+
+    expired = False
+    """Set to True when a read runs past its allowance."""
+
+    _limit = None
+    _min_rate = 0
+    _timeout = None
+    _lowered = False
+    _waiting_since = None
+
+    def set_deadline(self, seconds, min_rate=0):
+        """Limit the time reads may wait for data, from the next byte received.
+
+        If min_rate is not 0, every byte received extends the limit by
+        1/min_rate seconds. Only time spent waiting in a read counts, not
+        time (spent by the application, say) between reads. Reads which run
+        past the limit raise SlowClientError. Pass seconds=None to remove
+        the limit.
+        """
+        if seconds is None:
+            if self._limit is not None:
+                # Undo any lowering by _apply_deadline.
+                self._sock.settimeout(self._timeout)
+        elif self._limit is None:
+            self._timeout = self._sock.gettimeout()
+        self._limit = seconds
+        self._min_rate = min_rate
+        self._lowered = False
+        self.allowance = None
+
+    def _apply_deadline(self):
+        """Lower the socket timeout to the allowance left, and start its clock."""
+        allowance = self.allowance
+        if allowance is None:
+            # The clock starts with the first byte.
+            return
+        if allowance <= 0:
+            self._expire()
+        self._lowered = self._timeout is None or allowance < self._timeout
+        if self._lowered:
+            self._sock.settimeout(allowance)
+        else:
+            self._sock.settimeout(self._timeout)
+        self._waiting_since = time.time()
+
+    def _received(self, n):
+        if self.allowance is not None:
+            self.allowance -= time.time() - self._waiting_since
+        if n:
+            if self.allowance is None:
+                self.allowance = self._limit
+            if self._min_rate:
+                self.allowance += float(n) / self._min_rate
+
+    def _expire(self):
+        # Spent, so that any later read fails the same way.
+        self.allowance = 0
+        self.expired = True
+        raise SlowClientError("timed out")
+
+    def readinto(self, b):
+        if self._limit is None:
+            n = socket.SocketIO.readinto(self, b)
+        else:
+            self._apply_deadline()
+            try:
+                n = socket.SocketIO.readinto(self, b)
+            except socket.timeout:
+                if self._lowered:
+                    self._expire()
+                raise
+            self._received(n)
+        if n:
+            self.bytes_read += n
+        return n
+
+    def write(self, b):
+        n = socket.SocketIO.write(self, b)
+        if n:
+            self.bytes_written += n
+        return n
+
+
 def CP_makefile(sock, mode='r', bufsize=DEFAULT_BUFFER_SIZE):
     if 'r' in mode:
-        return io.BufferedReader(socket.SocketIO(sock, mode), bufsize)
+        return CP_BufferedReader(CP_SocketIO(sock, mode), bufsize)
     else:
-        return CP_BufferedWriter(socket.SocketIO(sock, mode), bufsize)
+        return CP_BufferedWriter(CP_SocketIO(sock, mode), bufsize)
 
 class HTTPConnection(object):
     """An HTTP connection (active socket).
@@ -999,6 +1304,11 @@ class HTTPConnection(object):
     remote_addr = None
     remote_port = None
     ssl_env = None
+    ssl_pending = False
+    queued_at = None
+    accepted_at = None
+    environ_template = None
+    dequeued_at = None
     rbufsize = DEFAULT_BUFFER_SIZE
     wbufsize = DEFAULT_BUFFER_SIZE
     RequestHandlerClass = HTTPRequest
@@ -1006,19 +1316,37 @@ class HTTPConnection(object):
     def __init__(self, server, sock, makefile=CP_makefile):
         self.server = server
         self.socket = sock
+        # The address and SSL adapter of the listener which accepted us;
+        # HTTPServer.tick replaces these for its extra listeners.
+        self.bind_addr = server.bind_addr
+        self.ssl_adapter = server.ssl_adapter
         self.rfile = makefile(sock, "rb", self.rbufsize)
         self.wfile = makefile(sock, "wb", self.wbufsize)
         self.requests_seen = 0
+        self.requests_served = 0
 
     def communicate(self):
-        """Read each request and respond appropriately."""
+        """Read each request and respond appropriately.
+
+        Returns True if the connection is idle but should be kept open, in
+        which case the caller should park it with the server's poller rather
+        than closing it.
+        """
         request_seen = False
+        req = None
         try:
+            if self.ssl_pending and not self._handshake():
+                return
             while True:
                 # (re)set req to None so that if something goes wrong in
                 # the RequestHandlerClass constructor, the error doesn't
                 # get written to the previous request.
                 req = None
+                keepalive_timeout = self.server.keepalive_timeout
+                if (request_seen and keepalive_timeout is not None and
+                    not self._await_request(keepalive_timeout)):
+                    self._count('Keep-Alive Timeouts')
+                    return
                 req = self.RequestHandlerClass(self.server, self)
 
                 # This order of operations should guarantee correct pipelining.
@@ -1032,9 +1360,31 @@ class HTTPConnection(object):
                     return
 
                 request_seen = True
+                self.requests_served += 1
+                self._limit_keepalive(req)
                 req.respond()
+                if req.timed and req.started_at is not None:
+                    self.server.record_timing(req, time.time())
+                if self._deadline_expired():
+                    # The application swallowed the SlowClientError.
+                    self._count('Slow Clients')
+                    return
                 if req.close_connection:
                     return
+                if (self.server.poller is not None and
+                    not self._has_buffered_input()):
+                    # Hand the idle connection back to the poller instead
+                    # of blocking this worker until the next request.
+                    return True
+        except SlowClientError:
+            self._count('Slow Clients')
+            if req and not req.sent_headers:
+                try:
+                    req.simple_response("408 Request Timeout")
+                except FatalSSLAlert:
+                    # Close the connection.
+                    return
+            return
         except socket.error:
             e = sys.exc_info()[1]
             errnum = e.args[0]
@@ -1053,6 +1403,8 @@ class HTTPConnection(object):
                         except FatalSSLAlert:
                             # Close the connection.
                             return
+                else:
+                    self._count('Keep-Alive Timeouts')
             elif errnum not in socket_errors_to_ignore:
                 self.server.error_log("socket.error %s" % repr(errnum),
                                       level=logging.WARNING, traceback=True)
@@ -1086,6 +1438,101 @@ class HTTPConnection(object):
                     # Close the connection.
                     return
 
+    def set_read_deadline(self, seconds, min_rate=0):
+        """Limit the time left for reading the request (or remove the limit).
+
+        See CP_SocketIO.set_deadline. Does nothing if our rfile can't do it.
+        """
+        reader = getattr(self.rfile, 'raw', self.rfile)
+        set_deadline = getattr(reader, 'set_deadline', None)
+        if set_deadline is not None:
+            set_deadline(seconds, min_rate)
+
+    def _deadline_expired(self):
+        reader = getattr(self.rfile, 'raw', self.rfile)
+        return getattr(reader, 'expired', False)
+
+    def _count(self, stat):
+        if self.server.stats['Enabled']:
+            self.server.stats[stat] += 1
+
+    def _await_request(self, timeout):
+        """Return True if the client starts a request within timeout seconds."""
+        if self._has_buffered_input():
+            return True
+        try:
+            return bool(select.select([self.socket], [], [], timeout)[0])
+        except (select.error, socket.error, ValueError):
+            # EINTR, or a descriptor select can't handle; fall back to
+            # reading the request line under the usual timeout.
+            return True
+
+    def _limit_keepalive(self, req):
+        """Set req.close_connection if this connection should not persist."""
+        if req.close_connection:
+            return
+        server = self.server
+        limit = server.keepalive_requests
+        if limit and self.requests_served >= limit:
+            stat = 'Keep-Alive Limits Reached'
+        elif (server.keepalive_saturation_close and server.poller is None
+              and server._saturated()):
+            # Waiting for this client's next request would keep queued
+            # connections from a worker thread.
+            stat = 'Keep-Alive Saturation Closes'
+        else:
+            return
+        req.close_connection = True
+        self._count(stat)
+
+    def _handshake(self):
+        """Wrap our socket with the server's ssl_adapter.
+
+        Returns True if the connection is ready to read requests.
+        """
+        self.ssl_pending = False
+        server = self.server
+        try:
+            s, ssl_env = self.ssl_adapter.wrap(self.socket)
+        except NoSSLError:
+            msg = ("The client sent a plain HTTP request, but "
+                   "this server only speaks HTTPS on this port.")
+            buf = ["%s 400 Bad Request\r\n" % server.protocol,
+                   "Content-Length: %s\r\n" % len(msg),
+                   "Content-Type: text/plain\r\n\r\n",
+                   msg]
+            try:
+                self.wfile.write("".join(buf).encode('ISO-8859-1'))
+            except socket.error:
+                x = sys.exc_info()[1]
+                if x.args[0] not in socket_errors_to_ignore:
+                    raise
+            return False
+        if not s:
+            return False
+
+        # Re-apply our timeout since we may have a new socket object
+        if hasattr(s, 'settimeout'):
+            s.settimeout(server.timeout)
+        makefile = self.ssl_adapter.makefile
+        self.socket = s
+        self.ssl_env = ssl_env
+        self.rfile = makefile(s, "rb", self.rbufsize)
+        self.wfile = makefile(s, "wb", self.wbufsize)
+        return True
+
+    def _has_buffered_input(self):
+        """Return True if the next request may already be buffered."""
+        rfile = self.rfile
+        if not hasattr(rfile, '_read_buf'):
+            # Not a buffer we know how to inspect; assume the worst.
+            return True
+        if len(rfile._read_buf) > rfile._read_pos:
+            return True
+        # SSL sockets may hold decrypted bytes which select can't see.
+        pending = getattr(self.socket, 'pending', None)
+        return bool(pending and pending())
+
     linger = False
 
     def close(self):
@@ -1093,6 +1540,17 @@ class HTTPConnection(object):
         self.rfile.close()
 
         if not self.linger:
+            if self.ssl_env and hasattr(self.socket, 'unwrap'):
+                # Send our close_notify (without waiting for the client's);
+                # OpenSSL won't let a client resume a session which wasn't
+                # shut down cleanly.
+                try:
+                    self.socket.setblocking(False)
+                    self.socket.unwrap()
+                except (socket.error, ValueError):
+                    # ValueError: the SSL layer was already torn down,
+                    # e.g. after the client dropped the connection.
+                    pass
             # Python's socket module does NOT call close on the kernel socket
             # when you call socket.close(). We do so manually here because we
             # want this server to send a FIN TCP segment immediately. Note this
@@ -1174,17 +1632,35 @@ class WorkerThread(threading.Thread):
                 self.conn = conn
                 if self.server.stats['Enabled']:
                     self.start_time = time.time()
+                    if conn.queued_at is not None:
+                        self.server.latency['Queue Wait'].record(
+                            self.start_time - conn.queued_at)
+                if self.server.timing_hook is not None:
+                    conn.dequeued_at = time.time()
+                keep_conn_open = False
                 try:
-                    conn.communicate()
+                    keep_conn_open = conn.communicate()
                 finally:
-                    conn.close()
-                    if self.server.stats['Enabled']:
+                    # Check start_time, not stats['Enabled'], which may have
+                    # been toggled while we were busy.
+                    if self.start_time is not None:
                         self.requests_seen += self.conn.requests_seen
                         self.bytes_read += self.conn.rfile.bytes_read
                         self.bytes_written += self.conn.wfile.bytes_written
                         self.work_time += time.time() - self.start_time
                         self.start_time = None
+                        if keep_conn_open:
+                            # The conn may be picked up by another worker
+                            # next time; don't count its traffic twice.
+                            conn.requests_seen = 0
+                            conn.rfile.bytes_read = 0
+                            conn.wfile.bytes_written = 0
                     self.conn = None
+                    poller = self.server.poller
+                    if keep_conn_open and poller is not None:
+                        poller.put(conn)
+                    else:
+                        conn.close()
         except (KeyboardInterrupt, SystemExit):
             exc = sys.exc_info()[1]
             self.server.interrupt = exc
@@ -1204,6 +1680,9 @@ class ThreadPool(object):
         self._threads = []
         self._queue = queue.Queue()
         self.get = self._queue.get
+        # Workers which shrink has asked to exit, but which we haven't
+        # culled from self._threads yet.
+        self.pending_shutdowns = 0
 
     def start(self):
         """Start the pool of threads."""
@@ -1222,6 +1701,9 @@ class ThreadPool(object):
     idle = property(_get_idle, doc=_get_idle.__doc__)
 
     def put(self, obj):
+        if obj is not _SHUTDOWNREQUEST:
+            # See HTTPServer.accepted_queue_timeout.
+            obj.queued_at = time.time()
         self._queue.put(obj)
         if obj is _SHUTDOWNREQUEST:
             return
@@ -1248,25 +1730,33 @@ class ThreadPool(object):
         return worker
 
     def shrink(self, amount):
-        """Kill off worker threads (not below self.min)."""
+        """Kill off worker threads (not below self.min).
+
+        Returns the number of shutdown requests put on the queue.
+        """
         # Grow/shrink the pool if necessary.
         # Remove any dead threads from our list
-        for t in self._threads:
+        for t in self._threads[:]:
             if not t.isAlive():
                 self._threads.remove(t)
                 amount -= 1
+                if self.pending_shutdowns:
+                    self.pending_shutdowns -= 1
 
-        # calculate the number of threads above the minimum
-        n_extra = max(len(self._threads) - self.min, 0)
+        # calculate the number of threads above the minimum, not counting
+        # those which are already on their way out
+        n_extra = max(len(self._threads) - self.pending_shutdowns - self.min, 0)
 
         # don't remove more than amount
-        n_to_remove = min(amount, n_extra)
+        n_to_remove = max(min(amount, n_extra), 0)
 
         # put shutdown requests on the queue equal to the number of threads
         # to remove. As each request is processed by a worker, that worker
         # will terminate and be culled from the list.
         for n in range(n_to_remove):
             self._queue.put(_SHUTDOWNREQUEST)
+        self.pending_shutdowns += n_to_remove
+        return n_to_remove
 
     def stop(self, timeout=5):
         # Must shut down threads here so the code that calls
@@ -1309,6 +1799,329 @@ class ThreadPool(object):
         return self._queue.qsize()
     qsize = property(_get_qsize)
 
+    def _get_wait(self):
+        """Seconds the oldest queued connection has been waiting. Read-only."""
+        q = self._queue
+        q.mutex.acquire()
+        try:
+            for obj in q.queue:
+                if obj is not _SHUTDOWNREQUEST:
+                    return time.time() - obj.queued_at
+        finally:
+            q.mutex.release()
+        return 0
+    wait = property(_get_wait, doc=_get_wait.__doc__)
+
+
+
+class KeepAlivePoller(threading.Thread):
+    """Thread which parks idle keep-alive connections until they are readable.
+
+    When HTTPServer.keepalive_polling is True, a WorkerThread which has
+    answered a request on a persistent connection hands that connection to
+    this poller instead of blocking on the next request line. As soon as the
+    client sends more bytes, the connection is put back on the server's
+    request Queue, so worker threads are only tied up while a request is
+    actually being read and answered. Connections which stay idle for longer
+    than server.keepalive_timeout (or server.timeout) are closed.
+
+    The poller uses epoll or poll where the platform has them, and falls
+    back to select otherwise.
+    """
+
+    interval = 1
+    """The maximum number of seconds to wait in a single poll call."""
+
+    def __init__(self, server):
+        self.server = server
+        self.ready = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._pending = []
+        self._parked = {}
+        self._poller = None
+        self._next_expiry = 0
+        self._wakeup = None
+        if hasattr(socket, 'socketpair'):
+            self._wakeup = socket.socketpair()
+            for s in self._wakeup:
+                s.setblocking(False)
+        else:
+            # Without a wakeup pipe, newly parked connections are only
+            # noticed on the next poll; keep that latency small.
+            self.interval = 0.05
+        threading.Thread.__init__(self)
+        self.setName("CP Server KeepAlivePoller")
+        self.setDaemon(True)
+
+    def _get_parked(self):
+        """The number of connections currently parked. Read-only."""
+        return len(self._parked) + len(self._pending)
+    parked = property(_get_parked, doc=_get_parked.__doc__)
+
+    def put(self, conn):
+        """Park the given connection until the client sends more data."""
+        self._lock.acquire()
+        try:
+            closed = self._closed
+            if not closed:
+                self._pending.append((conn, time.time()))
+        finally:
+            self._lock.release()
+        if closed:
+            self._close(conn)
+        else:
+            self._wake()
+
+    def _wake(self):
+        if self._wakeup is not None:
+            try:
+                self._wakeup[1].send(ntob('x'))
+            except socket.error:
+                # The pipe is full (so the poller will wake anyway)
+                # or already closed.
+                pass
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup[0].recv(4096):
+                pass
+        except socket.error:
+            pass
+
+    def _open(self):
+        if hasattr(select, 'epoll'):
+            self._poller = select.epoll()
+            self._readmask = select.EPOLLIN | select.EPOLLPRI
+            self._ms = False
+        elif hasattr(select, 'poll'):
+            self._poller = select.poll()
+            self._readmask = select.POLLIN | select.POLLPRI
+            self._ms = True
+        if self._wakeup is not None:
+            self._register(self._wakeup[0].fileno())
+
+    def _register(self, fd):
+        if self._poller is not None:
+            self._poller.register(fd, self._readmask)
+
+    def _unregister(self, fd):
+        if self._poller is not None:
+            try:
+                self._poller.unregister(fd)
+            except (KeyError, ValueError, IOError, OSError):
+                pass
+
+    def _poll(self, timeout):
+        """Return the list of file descriptors which are readable."""
+        if self._poller is None:
+            fds = list(self._parked.keys())
+            if self._wakeup is not None:
+                fds.append(self._wakeup[0].fileno())
+            if not fds:
+                time.sleep(timeout)
+                return []
+            return select.select(fds, [], [], timeout)[0]
+
+        if self._ms:
+            timeout = int(timeout * 1000)
+        return [fd for fd, event in self._poller.poll(timeout)]
+
+    def _register_pending(self):
+        self._lock.acquire()
+        try:
+            pending, self._pending = self._pending, []
+        finally:
+            self._lock.release()
+
+        for conn, parked_at in pending:
+            try:
+                fd = conn.socket.fileno()
+                self._register(fd)
+            except (socket.error, IOError, OSError, ValueError):
+                self._close(conn)
+                continue
+            self._parked[fd] = (conn, parked_at)
+
+    def _expire(self):
+        """Close connections which have been idle for too long."""
+        now = time.time()
+        if now < self._next_expiry:
+            return
+        self._next_expiry = now + self.interval
+
+        server = self.server
+        timeout = server.keepalive_timeout
+        if timeout is None:
+            timeout = server.timeout
+        if not timeout:
+            return
+        cutoff = now - timeout
+        for fd, (conn, parked_at) in list(self._parked.items()):
+            if parked_at < cutoff:
+                del self._parked[fd]
+                self._unregister(fd)
+                self._close(conn)
+                if server.stats['Enabled']:
+                    server.stats['Keep-Alive Timeouts'] += 1
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except:
+            pass
+
+    def run(self):
+        self._open()
+        self.ready = True
+        try:
+            while self.ready:
+                self._register_pending()
+                try:
+                    fds = self._poll(self.interval)
+                except (select.error, socket.error, IOError, OSError):
+                    x = sys.exc_info()[1]
+                    if x.args[0] in socket_error_eintr:
+                        continue
+                    raise
+
+                for fd in fds:
+                    if self._wakeup is not None and fd == self._wakeup[0].fileno():
+                        self._drain_wakeup()
+                        continue
+                    item = self._parked.pop(fd, None)
+                    if item is None:
+                        continue
+                    self._unregister(fd)
+                    # The client sent (the start of) its next request.
+                    self.server.requests.put(item[0])
+
+                self._expire()
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        self._lock.acquire()
+        try:
+            self._closed = True
+            pending, self._pending = self._pending, []
+        finally:
+            self._lock.release()
+
+        for conn, parked_at in pending:
+            self._close(conn)
+        for conn, parked_at in self._parked.values():
+            self._close(conn)
+        self._parked.clear()
+
+        if self._poller is not None and hasattr(self._poller, 'close'):
+            self._poller.close()
+        if self._wakeup is not None:
+            for s in self._wakeup:
+                s.close()
+
+    def stop(self, timeout=5):
+        """Stop polling and close all parked connections."""
+        self.ready = False
+        self._wake()
+        if self.isAlive() and self is not threading.currentThread():
+            self.join(timeout)
+
+
+
+class ThreadPoolScaler(threading.Thread):
+    """Thread which grows and shrinks a server's ThreadPool with demand.
+
+    Every `interval` seconds the scaler samples the request queue depth and
+    the number of idle workers. If connections are waiting and there are
+    not enough idle workers to take them, the pool grows (up to its max) by
+    the shortfall. If more than half of the workers have stayed idle for
+    `cooldown` seconds, the pool gives back half of its idle workers (not
+    below its min). The gap between those two conditions keeps the pool
+    from thrashing when load hovers around a threshold.
+
+    Each decision is counted in server.stats.
+    """
+
+    interval = 1
+    """The number of seconds between samples."""
+
+    cooldown = 30
+    """The number of seconds the pool must be over-provisioned before it shrinks."""
+
+    def __init__(self, server, interval=1, cooldown=30):
+        self.server = server
+        self.interval = interval
+        self.cooldown = cooldown
+        self.ready = False
+        self._stopped = threading.Event()
+        self._surplus_since = None
+        threading.Thread.__init__(self)
+        self.setName("CP Server ThreadPoolScaler")
+        self.setDaemon(True)
+
+    def run(self):
+        self.ready = True
+        while not self._stopped.isSet():
+            self._stopped.wait(self.interval)
+            if self._stopped.isSet():
+                break
+            try:
+                self.tick()
+            except (KeyboardInterrupt, SystemExit):
+                raise
+            except:
+                self.server.error_log("Error in ThreadPoolScaler.tick",
+                                      level=logging.ERROR, traceback=True)
+
+    def tick(self, now=None):
+        """Sample the pool and grow or shrink it if necessary."""
+        if now is None:
+            now = time.time()
+        pool = self.server.requests
+        # Drop dead threads (from earlier shrinks) so they don't count as idle.
+        pool.shrink(0)
+        # Neither the shutdown requests still queued, nor the workers which
+        # will take them, are demand or capacity.
+        pending = pool.pending_shutdowns
+        threads = len(pool._threads) - pending
+        qsize = max(pool.qsize - pending, 0)
+        idle = pool.idle
+
+        if qsize > idle:
+            self._surplus_since = None
+            if pool.max <= 0 or threads < pool.max:
+                pool.grow(qsize - idle)
+                self._record('Grow', len(pool._threads) - threads,
+                             qsize, idle, now)
+        elif idle > threads // 2 and threads > pool.min:
+            if self._surplus_since is None:
+                self._surplus_since = now
+            elif now - self._surplus_since >= self.cooldown:
+                amount = pool.shrink(min(idle // 2, threads - pool.min))
+                self._record('Shrink', amount, qsize, idle, now)
+                # Wait another full cooldown before shrinking again.
+                self._surplus_since = now
+        else:
+            self._surplus_since = None
+
+    def _record(self, action, amount, qsize, idle, now):
+        stats = self.server.stats
+        stats['Pool %ss' % action] += 1
+        stats['Pool Last Scaled'] = (
+            "%s by %d at %s (queue %d, idle %d)" %
+            (action.lower(), amount,
+             time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+             qsize, idle))
+
+    def stop(self, timeout=5):
+        """Stop sampling the pool."""
+        self._stopped.set()
+        if self.isAlive() and self is not threading.currentThread():
+            self.join(timeout)
+
 
 
 try:
@@ -1350,6 +2163,22 @@ class SSLAdapter(object):
         * ``makefile(sock, mode='r', bufsize=DEFAULT_BUFFER_SIZE) -> socket file object``
     """
 
+    session_cache = True
+    """If True (the default), let clients resume TLS sessions from a cache
+    shared by all connections, instead of doing a full handshake each time."""
+
+    session_timeout = None
+    """The number of seconds a cached session may be resumed for. If None,
+    the SSL library's default (usually 300) is used."""
+
+    session_tickets = True
+    """If True (the default), also offer stateless session tickets (RFC 5077)."""
+
+    ticket_key_lifetime = None
+    """If not None, the number of seconds after which the session ticket key
+    is replaced by a fresh one. Tickets (and cached sessions) issued under
+    the old key can no longer be resumed."""
+
     def __init__(self, certificate, private_key, certificate_chain=None):
         self.certificate = certificate
         self.private_key = private_key
@@ -1361,6 +2190,99 @@ class SSLAdapter(object):
     def makefile(self, sock, mode='r', bufsize=DEFAULT_BUFFER_SIZE):
         raise NotImplemented
 
+    def session_stats(self):
+        """Return a dict of 'full' and 'resumed' handshake counts, if known."""
+        return {}
+
+
+class Listener(object):
+    """An extra address (with its own SSL adapter) for an HTTPServer.
+
+    Connections accepted on every listener are served by the server's
+    single ThreadPool. See HTTPServer.listeners.
+    """
+
+    socket = None
+    """The listening socket, while the server is running."""
+
+    def __init__(self, bind_addr, ssl_adapter=None):
+        self.bind_addr = bind_addr
+        self.ssl_adapter = ssl_adapter
+
+    def __repr__(self):
+        return "%s.%s(%r)" % (self.__module__, self.__class__.__name__,
+                              self.bind_addr)
+
+
+class LatencyHistogram(object):
+    """A constant-memory histogram of durations, in seconds.
+
+    Samples are counted in fixed buckets from 0.1ms to 60s (plus one for
+    anything slower), so percentiles are estimates: the upper bound of the
+    bucket they fall in, but never more than the slowest sample. So a
+    percentile which falls in the last bucket (over 60s) is just the max.
+
+    Worker threads record into the same histogram, so it has a lock.
+    """
+
+    bounds = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+              0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    """The upper bounds of the buckets."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+        finally:
+            self.lock.release()
+
+    def record(self, seconds):
+        i = bisect.bisect_left(self.bounds, seconds)
+        self.lock.acquire()
+        try:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+        finally:
+            self.lock.release()
+
+    def percentile(self, p):
+        """Return (an estimate of) the duration p percent of samples are under."""
+        self.lock.acquire()
+        try:
+            counts, count, slowest = self.counts[:], self.count, self.max
+        finally:
+            self.lock.release()
+        rank = count * p / 100.0
+        seen = 0
+        for i, n in enumerate(counts[:-1]):
+            seen += n
+            if n and seen >= rank:
+                return min(self.bounds[i], slowest)
+        # The overflow bucket has no upper bound.
+        return slowest
+
+    def stats(self):
+        """Return a statistics record (see cherrypy.lib.cpstats) for self."""
+        ms = lambda seconds: round(seconds * 1000, 3)
+        return {
+            'Count': lambda s: self.count,
+            'Mean (ms)': lambda s: ms(self.total / (self.count or 1)),
+            'p50 (ms)': lambda s: ms(self.percentile(50)),
+            'p90 (ms)': lambda s: ms(self.percentile(90)),
+            'p99 (ms)': lambda s: ms(self.percentile(99)),
+            'Max (ms)': lambda s: ms(self.max),
+            }
+
 
 class HTTPServer(object):
     """An HTTP server."""
@@ -1377,9 +2299,6 @@ class HTTPServer(object):
     maxthreads = None
     """The maximum number of worker threads to create (default -1 = no limit)."""
 
-    server_name = None
-    """The name of the server; defaults to socket.gethostname()."""
-
     protocol = "HTTP/1.1"
     """The version string to write in the Status-Line of all HTTP responses.
 
@@ -1412,9 +2331,30 @@ class HTTPServer(object):
     max_request_body_size = 0
     """The maximum size, in bytes, for request bodies, or 0 for no limit."""
 
+    accepted_queue_size = -1
+    """The maximum number of accepted connections which may wait for a
+    worker thread (default -1 = no limit). While the queue is this long,
+    new connections are answered with a 503 and closed."""
+
+    accepted_queue_timeout = None
+    """The maximum number of seconds a queued connection may wait for a
+    worker thread (default None = no limit). While the oldest queued
+    connection has waited longer, new connections are answered with a 503
+    and closed."""
+
+    overload_retry_after = 5
+    """The Retry-After value, in seconds, of 503 responses sent when the
+    accepted connection queue is full."""
+
     nodelay = True
     """If True (the default since 3.1), sets the TCP_NODELAY socket option."""
 
+    reuse_port = False
+    """If True, sets the SO_REUSEPORT socket option (TCP sockets only).
+
+    This allows several processes (see process.plugins.Prefork) to listen
+    on the same address, and lets the kernel spread connections over them."""
+
     ConnectionClass = HTTPConnection
     """The class to use for handling HTTP connections."""
 
@@ -1423,6 +2363,94 @@ class HTTPServer(object):
 
     You must have the corresponding SSL driver library installed."""
 
+    keepalive_polling = False
+    """If True, park idle keep-alive connections in a poller between requests.
+
+    Worker threads are then only occupied while a request is being read and
+    answered, instead of for the whole lifetime of a persistent connection,
+    so a few hundred idle clients cannot exhaust the thread pool."""
+
+    poller = None
+    """The KeepAlivePoller for idle connections, or None."""
+
+    keepalive_timeout = None
+    """The number of seconds a persistent connection may stay idle between
+    requests (default None = use timeout). Set it lower than timeout to free
+    worker threads (or poller slots) from idle clients sooner, without
+    shortening the time allowed for a stalled read within a request."""
+
+    keepalive_requests = 0
+    """The maximum number of requests to serve on one connection (default
+    0 = no limit). The last response carries "Connection: close", so that
+    behind a load balancer, clients regularly reconnect and spread out over
+    the backends (or the processes of a Prefork)."""
+
+    keepalive_saturation_close = True
+    """If True (the default), close persistent connections after the current
+    response while connections are queued waiting for a worker thread.
+    This has no effect when keepalive_polling is on, since idle
+    connections don't hold a worker then."""
+
+    autoscale = False
+    """If True, grow and shrink the worker pool (between minthreads and
+    maxthreads) according to the request queue depth and idle workers."""
+
+    autoscale_interval = 1
+    """The number of seconds between ThreadPoolScaler samples."""
+
+    autoscale_cooldown = 30
+    """The number of seconds the pool must stay over-provisioned before
+    the ThreadPoolScaler shrinks it."""
+
+    scaler = None
+    """The ThreadPoolScaler which resizes the worker pool, or None."""
+
+    environ_template = None
+    """The environ entries common to every request, built by the gateway on
+    first use (see WSGIGateway_10.server_environ). start() resets it."""
+
+    listeners = ()
+    """Listener instances to accept connections on besides bind_addr.
+
+    Each may be a TCP or UNIX address and have its own ssl_adapter (the
+    server's ssl_adapter only applies to bind_addr). All of them feed the
+    one worker pool; the accept loop waits on them together with select."""
+
+    accept_batch_size = 1
+    """The maximum number of connections to accept per tick (default 1).
+
+    If greater than 1, the listening sockets are made non-blocking, and
+    each one which select reports as ready is drained with repeated
+    accept() calls until its backlog is empty or this many connections
+    have been taken."""
+
+    accept_threads = 1
+    """The number of threads accepting connections (default 1), including
+    the one which calls start()."""
+
+    timing_hook = None
+    """If not None, a callable to pass the timestamps of each request to.
+
+    It is called in the worker thread when the response is complete, with
+    a dict of time.time() values: 'accepted', 'queued' and 'dequeued' (for
+    the connection, which may carry several requests), 'started' (the
+    request line was read), 'headers' (the headers were parsed),
+    'first_byte' (the response started) and 'completed'. Any of these but
+    'started' and 'completed' may be None. Keep it quick: the worker can't
+    serve anything else meanwhile."""
+
+    header_timeout = None
+    """The maximum number of seconds to receive a request line and headers
+    in, counted from their first byte (default None = no limit). Unlike
+    timeout, which limits each read, this stops clients which trickle in a
+    byte at a time from holding a worker thread indefinitely."""
+
+    min_body_rate = 0
+    """The minimum average rate, in bytes per second, at which a request
+    body must arrive once it has started (default 0 = no limit). Only the
+    time spent waiting for the client counts against it, not the time the
+    application spends between reads of wsgi.input."""
+
     def __init__(self, bind_addr, gateway, minthreads=10, maxthreads=-1,
                  server_name=None):
         self.bind_addr = bind_addr
@@ -1447,7 +2475,18 @@ class HTTPServer(object):
             'Queue': lambda s: getattr(self.requests, "qsize", None),
             'Threads': lambda s: len(getattr(self.requests, "_threads", [])),
             'Threads Idle': lambda s: getattr(self.requests, "idle", None),
+            'Parked Connections': lambda s: self.poller and self.poller.parked or 0,
+            'Pool Grows': 0,
+            'Pool Shrinks': 0,
+            'Pool Last Scaled': None,
             'Socket Errors': 0,
+            'Connections Shed': 0,
+            'Slow Clients': 0,
+            'Keep-Alive Timeouts': 0,
+            'Keep-Alive Limits Reached': 0,
+            'Keep-Alive Saturation Closes': 0,
+            'SSL Full Handshakes': lambda s: self._ssl_stat('full'),
+            'SSL Resumed Handshakes': lambda s: self._ssl_stat('resumed'),
             'Requests': lambda s: (not s['Enabled']) and -1 or sum([w['Requests'](w) for w
                                        in s['Worker Threads'].values()], 0),
             'Bytes Read': lambda s: (not s['Enabled']) and -1 or sum([w['Bytes Read'](w) for w
@@ -1464,8 +2503,52 @@ class HTTPServer(object):
                  for w in s['Worker Threads'].values()], 0),
             'Worker Threads': {},
             }
+        # Queue Wait is per dequeued connection; the others are per request,
+        # measured from the end of the request line.
+        self.latency = {
+            'Queue Wait': LatencyHistogram(),
+            'Headers': LatencyHistogram(),
+            'First Byte': LatencyHistogram(),
+            'Response': LatencyHistogram(),
+            }
+        self.stats['Latency'] = dict([(k, h.stats())
+                                      for k, h in self.latency.items()])
         logging.statistics["CherryPy HTTPServer %d" % id(self)] = self.stats
 
+    def record_timing(self, req, completed):
+        """Record the timestamps of the given (completed) request."""
+        started = req.started_at
+        if self.stats['Enabled']:
+            latency = self.latency
+            if req.headers_at is not None:
+                latency['Headers'].record(req.headers_at - started)
+            if req.first_byte_at is not None:
+                latency['First Byte'].record(req.first_byte_at - started)
+            latency['Response'].record(completed - started)
+
+        hook = self.timing_hook
+        if hook is not None:
+            conn = req.conn
+            try:
+                hook({'accepted': conn.accepted_at,
+                      'queued': conn.queued_at,
+                      'dequeued': conn.dequeued_at,
+                      'started': started,
+                      'headers': req.headers_at,
+                      'first_byte': req.first_byte_at,
+                      'completed': completed,
+                      })
+            except:
+                self.error_log("Error in HTTPServer.timing_hook",
+                               level=logging.ERROR, traceback=True)
+
+    def _ssl_stat(self, key):
+        adapters = [self.ssl_adapter] + [l.ssl_adapter for l in self.listeners]
+        adapters = [a for a in adapters if a is not None]
+        if not adapters:
+            return None
+        return sum([a.session_stats().get(key, 0) for a in adapters])
+
     def runtime(self):
         if self._start_time is None:
             return self._run_time
@@ -1476,6 +2559,21 @@ class HTTPServer(object):
         return "%s.%s(%r)" % (self.__module__, self.__class__.__name__,
                               self.bind_addr)
 
+    _server_name = None
+    _server_name_bytes = None
+
+    def _get_server_name(self):
+        return self._server_name
+    def _set_server_name(self, value):
+        self._server_name = value
+        # Encoded once here rather than for every response.
+        if value is None:
+            self._server_name_bytes = None
+        else:
+            self._server_name_bytes = value.encode('ISO-8859-1')
+    server_name = property(_get_server_name, _set_server_name,
+        doc="The name of the server; defaults to socket.gethostname().")
+
     def _get_bind_addr(self):
         return self._bind_addr
     def _set_bind_addr(self, value):
@@ -1516,35 +2614,18 @@ class HTTPServer(object):
 
         if self.software is None:
             self.software = "%s Server" % self.version
-
-        # Select the appropriate socket
-        if isinstance(self.bind_addr, basestring):
-            # AF_UNIX socket
-
-            # So we can reuse the socket...
-            try: os.unlink(self.bind_addr)
-            except: pass
-
-            # So everyone can access the socket...
-            try: os.chmod(self.bind_addr, 511) # 0777
-            except: pass
-
-            info = [(socket.AF_UNIX, socket.SOCK_STREAM, 0, "", self.bind_addr)]
-        else:
-            # AF_INET or AF_INET6 socket
-            # Get the correct address family for our host (allows IPv6 addresses)
-            host, port = self.bind_addr
-            try:
-                info = socket.getaddrinfo(host, port, socket.AF_UNSPEC,
-                                          socket.SOCK_STREAM, 0, socket.AI_PASSIVE)
-            except socket.gaierror:
-                if ':' in self.bind_addr[0]:
-                    info = [(socket.AF_INET6, socket.SOCK_STREAM,
-                             0, "", self.bind_addr + (0, 0))]
-                else:
-                    info = [(socket.AF_INET, socket.SOCK_STREAM,
-                             0, "", self.bind_addr)]
-
+        self.environ_template = None
+
+        msg = "The server is temporarily overloaded; please retry later."
+        self._overload_response = ntob("".join([
+            "%s 503 Service Unavailable\r\n" % self.protocol,
+            "Content-Length: %s\r\n" % len(msg),
+            "Content-Type: text/plain\r\n",
+            "Retry-After: %s\r\n" % self.overload_retry_after,
+            "Connection: close\r\n\r\n",
+            msg]))
+
+        info = self._address_info(self.bind_addr)
         self.socket = None
         msg = "No socket could be created"
         for res in info:
@@ -1565,11 +2646,42 @@ class HTTPServer(object):
         self.socket.settimeout(1)
         self.socket.listen(self.request_queue_size)
 
+        self._listening = [(self.socket, self.bind_addr, self.ssl_adapter)]
+        for listener in self.listeners:
+            listener.socket = self._bind_listener(listener)
+            listener.socket.settimeout(1)
+            listener.socket.listen(self.request_queue_size)
+            self._listening.append(
+                (listener.socket, listener.bind_addr, listener.ssl_adapter))
+
+        if self.accept_batch_size > 1:
+            # tick() selects before accepting, and drains without blocking.
+            for entry in self._listening:
+                entry[0].settimeout(0)
+
         # Create worker threads
         self.requests.start()
 
+        if self.keepalive_polling:
+            self.poller = KeepAlivePoller(self)
+            self.poller.start()
+
+        if self.autoscale:
+            self.scaler = ThreadPoolScaler(self, self.autoscale_interval,
+                                           self.autoscale_cooldown)
+            self.scaler.start()
+
         self.ready = True
         self._start_time = time.time()
+
+        self._acceptors = []
+        for i in range(self.accept_threads - 1):
+            t = threading.Thread(target=self._run_acceptor,
+                                 name="CP Server Acceptor %d" % (i + 1))
+            t.setDaemon(True)
+            t.start()
+            self._acceptors.append(t)
+
         while self.ready:
             try:
                 self.tick()
@@ -1585,6 +2697,16 @@ class HTTPServer(object):
                 if self.interrupt:
                     raise self.interrupt
 
+    def _run_acceptor(self):
+        """Run tick() until the server stops (see accept_threads)."""
+        while self.ready:
+            try:
+                self.tick()
+            except:
+                if self.ready:
+                    self.error_log("Error in HTTPServer.tick",
+                                   level=logging.ERROR, traceback=True)
+
     def error_log(self, msg="", level=20, traceback=False):
         # Override this in subclasses as desired
         sys.stderr.write(msg + '\n')
@@ -1594,75 +2716,171 @@ class HTTPServer(object):
             sys.stderr.write(tblines)
             sys.stderr.flush()
 
+    def _address_info(self, bind_addr):
+        """Return getaddrinfo-style entries to try binding bind_addr with."""
+        if isinstance(bind_addr, basestring):
+            # AF_UNIX socket
+
+            # So we can reuse the socket...
+            try: os.unlink(bind_addr)
+            except: pass
+
+            # So everyone can access the socket...
+            try: os.chmod(bind_addr, 511) # 0777
+            except: pass
+
+            info = [(socket.AF_UNIX, socket.SOCK_STREAM, 0, "", bind_addr)]
+        else:
+            # AF_INET or AF_INET6 socket
+            # Get the correct address family for our host (allows IPv6 addresses)
+            host, port = bind_addr
+            try:
+                info = socket.getaddrinfo(host, port, socket.AF_UNSPEC,
+                                          socket.SOCK_STREAM, 0, socket.AI_PASSIVE)
+            except socket.gaierror:
+                if ':' in bind_addr[0]:
+                    info = [(socket.AF_INET6, socket.SOCK_STREAM,
+                             0, "", bind_addr + (0, 0))]
+                else:
+                    info = [(socket.AF_INET, socket.SOCK_STREAM,
+                             0, "", bind_addr)]
+        return info
+
     def bind(self, family, type, proto=0):
         """Create (or recreate) the actual socket object."""
         self.socket = socket.socket(family, type, proto)
-        prevent_socket_inheritance(self.socket)
-        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        if self.nodelay and not isinstance(self.bind_addr, str):
-            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-
+        self._prepare_socket(self.socket, family, self.bind_addr)
         if self.ssl_adapter is not None:
             self.socket = self.ssl_adapter.bind(self.socket)
+        self.socket.bind(self.bind_addr)
+
+    def _prepare_socket(self, sock, family, bind_addr):
+        """Set the socket options for a listening socket on bind_addr."""
+        prevent_socket_inheritance(sock)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port and not isinstance(bind_addr, basestring):
+            if SO_REUSEPORT is None:
+                raise socket.error("SO_REUSEPORT is not available on "
+                                   "this platform.")
+            sock.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+        if self.nodelay and not isinstance(bind_addr, basestring):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         # If listening on the IPV6 any address ('::' = IN6ADDR_ANY),
         # activate dual-stack. See https://bitbucket.org/cherrypy/cherrypy/issue/871.
         if (hasattr(socket, 'AF_INET6') and family == socket.AF_INET6
-            and self.bind_addr[0] in ('::', '::0', '::0.0.0.0')):
+            and bind_addr[0] in ('::', '::0', '::0.0.0.0')):
             try:
-                self.socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+                sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
             except (AttributeError, socket.error):
                 # Apparently, the socket option is not available in
                 # this machine's TCP stack
                 pass
 
-        self.socket.bind(self.bind_addr)
+    def _bind_listener(self, listener):
+        """Return a new socket bound to the given Listener's address."""
+        msg = "No socket could be created for %r" % (listener.bind_addr,)
+        for af, socktype, proto, canonname, sa in self._address_info(
+                listener.bind_addr):
+            sock = None
+            try:
+                sock = socket.socket(af, socktype, proto)
+                self._prepare_socket(sock, af, listener.bind_addr)
+                if listener.ssl_adapter is not None:
+                    sock = listener.ssl_adapter.bind(sock)
+                sock.bind(listener.bind_addr)
+                return sock
+            except socket.error as serr:
+                msg = "%s -- (%s: %s)" % (msg, sa, serr)
+                if sock is not None:
+                    sock.close()
+        raise socket.error(msg)
+
+    def _overloaded(self):
+        """Return True if new connections should be shed."""
+        if self.accepted_queue_size >= 0:
+            qsize = getattr(self.requests, "qsize", None)
+            if qsize is not None and qsize >= self.accepted_queue_size:
+                return True
+        if self.accepted_queue_timeout:
+            wait = getattr(self.requests, "wait", None)
+            if wait is not None and wait > self.accepted_queue_timeout:
+                return True
+        return False
+
+    def _saturated(self):
+        """Return True if connections are waiting for a worker thread."""
+        qsize = getattr(self.requests, "qsize", None)
+        if not qsize:
+            return False
+        idle = getattr(self.requests, "idle", None)
+        return idle is None or qsize > idle
+
+    def _shed(self, sock, ssl_adapter=None):
+        """Answer the given socket with a canned 503 and close it."""
+        if self.stats['Enabled']:
+            self.stats['Connections Shed'] += 1
+        try:
+            if ssl_adapter is None:
+                # There's no cheap way to answer a TLS client; just close.
+                sock.sendall(self._overload_response)
+                # Discard the request we've received so far, so that close()
+                # doesn't reset the conn before the client reads the 503.
+                sock.setblocking(False)
+                sock.recv(65536)
+        except socket.error:
+            pass
+        sock.close()
 
     def tick(self):
-        """Accept a new connection and put it on the Queue."""
+        """Accept new connections and put them on the Queue."""
+        batch = self.accept_batch_size
+        if not self.listeners and batch <= 1:
+            self._accept(self.socket, self.bind_addr, self.ssl_adapter)
+            return
+
+        # Wait for any listening socket to be ready.
+        listening = self._listening
+        try:
+            r, w, x = select.select([l[0] for l in listening], [], [], 1)
+        except (select.error, socket.error, ValueError):
+            # Interrupted, or a socket was closed by stop().
+            return
+        for entry in listening:
+            if entry[0] in r:
+                # With batch > 1 the socket is non-blocking, so _accept
+                # returns False as soon as the backlog is empty.
+                for i in range(batch):
+                    if not self._accept(*entry):
+                        break
+
+    def _accept(self, sock, bind_addr, ssl_adapter):
+        """Accept a connection on the given socket and put it on the Queue.
+
+        Return True if a connection was taken from the socket's backlog.
+        """
         try:
-            s, addr = self.socket.accept()
+            s, addr = sock.accept()
             if self.stats['Enabled']:
                 self.stats['Accepts'] += 1
             if not self.ready:
-                return
+                return False
 
             prevent_socket_inheritance(s)
             if hasattr(s, 'settimeout'):
                 s.settimeout(self.timeout)
 
-            makefile = CP_makefile
-            ssl_env = {}
-            # if ssl cert and key are set, we try to be a secure HTTP server
-            if self.ssl_adapter is not None:
-                try:
-                    s, ssl_env = self.ssl_adapter.wrap(s)
-                except NoSSLError:
-                    msg = ("The client sent a plain HTTP request, but "
-                           "this server only speaks HTTPS on this port.")
-                    buf = ["%s 400 Bad Request\r\n" % self.protocol,
-                           "Content-Length: %s\r\n" % len(msg),
-                           "Content-Type: text/plain\r\n\r\n",
-                           msg]
-
-                    wfile = makefile(s, "wb", DEFAULT_BUFFER_SIZE)
-                    try:
-                        wfile.write("".join(buf).encode('ISO-8859-1'))
-                    except socket.error:
-                        x = sys.exc_info()[1]
-                        if x.args[0] not in socket_errors_to_ignore:
-                            raise
-                    return
-                if not s:
-                    return
-                makefile = self.ssl_adapter.makefile
-                # Re-apply our timeout since we may have a new socket object
-                if hasattr(s, 'settimeout'):
-                    s.settimeout(self.timeout)
+            if self._overloaded():
+                self._shed(s, ssl_adapter)
+                return True
 
-            conn = self.ConnectionClass(self, s, makefile)
+            conn = self.ConnectionClass(self, s, CP_makefile)
+            conn.bind_addr = bind_addr
+            conn.ssl_adapter = ssl_adapter
+            if self.stats['Enabled'] or self.timing_hook is not None:
+                conn.accepted_at = time.time()
 
-            if not isinstance(self.bind_addr, basestring):
+            if not isinstance(bind_addr, basestring):
                 # optional values
                 # Until we do DNS lookups, omit REMOTE_HOST
                 if addr is None: # sometimes this can happen
@@ -1676,16 +2894,26 @@ class HTTPServer(object):
                 conn.remote_addr = addr[0]
                 conn.remote_port = addr[1]
 
-            conn.ssl_env = ssl_env
+            if ssl_adapter is not None:
+                # Leave the handshake to the worker thread so a slow
+                # client can't hold up every other accept.
+                conn.ssl_pending = True
+            else:
+                conn.ssl_env = {}
 
             self.requests.put(conn)
+            return True
         except socket.timeout:
             # The only reason for the timeout in start() is so we can
             # notice keyboard interrupts on Win32, which don't interrupt
             # accept() by default
-            return
+            return False
         except socket.error:
             x = sys.exc_info()[1]
+            if x.args[0] in socket_errors_nonblocking:
+                # Just try again. See https://bitbucket.org/cherrypy/cherrypy/issue/479.
+                # This is also how a drained non-blocking socket ends a batch.
+                return False
             if self.stats['Enabled']:
                 self.stats['Socket Errors'] += 1
             if x.args[0] in socket_error_eintr:
@@ -1694,14 +2922,11 @@ class HTTPServer(object):
                 # the call, and I *think* I'm reading it right that Python
                 # will then go ahead and poll for and handle the signal
                 # elsewhere. See https://bitbucket.org/cherrypy/cherrypy/issue/707.
-                return
-            if x.args[0] in socket_errors_nonblocking:
-                # Just try again. See https://bitbucket.org/cherrypy/cherrypy/issue/479.
-                return
+                return False
             if x.args[0] in socket_errors_to_ignore:
                 # Our socket was closed.
                 # See https://bitbucket.org/cherrypy/cherrypy/issue/686.
-                return
+                return False
             raise
 
     def _get_interrupt(self):
@@ -1756,6 +2981,28 @@ class HTTPServer(object):
                 sock.close()
             self.socket = None
 
+        for listener in self.listeners:
+            if listener.socket is not None:
+                # If bound to a UNIX socket, the file stays for the next start.
+                listener.socket.close()
+                listener.socket = None
+
+        # The other acceptors notice within a second (see tick).
+        for t in getattr(self, "_acceptors", ()):
+            if t is not threading.currentThread():
+                t.join(self.shutdown_timeout)
+        self._acceptors = []
+
+        scaler = self.scaler
+        if scaler is not None:
+            self.scaler = None
+            scaler.stop(self.shutdown_timeout)
+
+        poller = self.poller
+        if poller is not None:
+            self.poller = None
+            poller.stop(self.shutdown_timeout)
+
         self.requests.stop(self.shutdown_timeout)
 
 
@@ -1810,6 +3057,22 @@ class CherryPyWSGIServer(HTTPServer):
     wsgi_version = (1, 0)
     """The version of WSGI to produce."""
 
+    min_chunk_size = 0
+    """Body chunks smaller than this many bytes, yielded by an application
+    which sets no Content-Length, are gathered and sent together in one
+    (chunked transfer-coding) chunk (default 0 = send each as it comes).
+
+    The gathered chunks are sent when they reach chunk_flush_size, when
+    the application yields a chunk at least min_chunk_size long, when it
+    yields an empty string (so long-polling responses can push out what
+    they have), or when the iterable is exhausted. Note this delays small
+    chunks, which PEP 333 asks servers not to do; leave it off for apps
+    which stream slowly without yielding an empty string after each
+    event. The write() callable is never delayed."""
+
+    chunk_flush_size = 8192
+    """The number of gathered bytes at which they are sent (see min_chunk_size)."""
+
     def __init__(self, bind_addr, wsgi_app, numthreads=10, server_name=None,
                  max=-1, request_queue_size=5, timeout=10, shutdown_timeout=5):
         self.requests = ThreadPool(self, min=numthreads or 1, max=max)
@@ -1841,6 +3104,8 @@ class WSGIGateway(Gateway):
         self.started_response = False
         self.env = self.get_environ()
         self.remaining_bytes_out = None
+        self.pending = []
+        self.pending_len = 0
 
     def get_environ(self):
         """Return a new environ dict targeting the given wsgi.version"""
@@ -1849,6 +3114,16 @@ class WSGIGateway(Gateway):
     def respond(self):
         """Process the current request."""
         response = self.req.server.wsgi_app(self.env, self.start_response)
+        if (isinstance(response, FileWrapper)
+            and self.sendfile(response.filelike, response.count)):
+            response.close()
+        else:
+            self.write_response(response)
+
+    def write_response(self, response):
+        """Write out each chunk of the given response iterable, then close it."""
+        server = self.req.server
+        min_chunk_size = server.min_chunk_size
         try:
             for chunk in response:
                 # "The start_response callable must not actually transmit
@@ -1860,7 +3135,19 @@ class WSGIGateway(Gateway):
                 if chunk:
                     if isinstance(chunk, unicodestr):
                         chunk = chunk.encode('ISO-8859-1')
-                    self.write(chunk)
+                    if (min_chunk_size and self.remaining_bytes_out is None
+                        and (self.pending or len(chunk) < min_chunk_size)):
+                        self.pending.append(chunk)
+                        self.pending_len += len(chunk)
+                        if (len(chunk) >= min_chunk_size
+                            or self.pending_len >= server.chunk_flush_size):
+                            self.flush()
+                    else:
+                        self.write(chunk)
+                elif self.pending:
+                    # An empty string asks us to send what we've gathered.
+                    self.flush()
+            self.flush()
         finally:
             if hasattr(response, "close"):
                 response.close()
@@ -1902,6 +3189,14 @@ class WSGIGateway(Gateway):
 
         return self.write
 
+    def flush(self):
+        """Write any body chunks gathered by respond (see min_chunk_size)."""
+        if self.pending:
+            chunk = EMPTY.join(self.pending)
+            self.pending = []
+            self.pending_len = 0
+            self.write(chunk)
+
     def write(self, chunk):
         """WSGI callable to write unbuffered data to the client.
 
@@ -1910,6 +3205,8 @@ class WSGIGateway(Gateway):
         """
         if not self.started_response:
             raise AssertionError("WSGI write called before start_response.")
+        if self.pending:
+            self.flush()
 
         chunklen = len(chunk)
         rbo = self.remaining_bytes_out
@@ -1926,9 +3223,9 @@ class WSGIGateway(Gateway):
 
         if not self.req.sent_headers:
             self.req.sent_headers = True
-            self.req.send_headers()
-
-        self.req.write(chunk)
+            self.req.send_headers(chunk)
+        else:
+            self.req.write(chunk)
 
         if rbo is not None:
             rbo -= chunklen
@@ -1936,6 +3233,82 @@ class WSGIGateway(Gateway):
                 raise ValueError(
                     "Response body exceeds the declared Content-Length.")
 
+    def file_wrapper(self, filelike, blksize=8192):
+        """Return a FileWrapper for the given file (wsgi.file_wrapper)."""
+        return FileWrapper(filelike, blksize)
+
+    def sendfile(self, filelike, count=None):
+        """Send the rest of the response from filelike with socket.sendfile.
+
+        Returns False, having sent nothing, if that isn't possible: the
+        response must have a Content-Length (which count, if given, must
+        match) and go over a plain socket, and filelike must be a regular
+        file opened in binary mode.
+        """
+        req = self.req
+        sock = req.conn.socket
+        if (not self.started_response or req.sent_headers
+            or self.remaining_bytes_out is None or req.method == b'HEAD'
+            or (count is not None and count != self.remaining_bytes_out)
+            or req.conn.ssl_env or not hasattr(sock, 'sendfile')
+            or 'b' not in getattr(filelike, 'mode', 'b')):
+            return False
+        try:
+            if not stat.S_ISREG(os.fstat(filelike.fileno()).st_mode):
+                return False
+        except (AttributeError, ValueError, EnvironmentError):
+            return False
+
+        req.sent_headers = True
+        req.send_headers()
+        count = self.remaining_bytes_out
+        if count:
+            sent = sock.sendfile(filelike, filelike.tell(), count)
+            req.conn.wfile.bytes_written += sent
+            if sent < count:
+                # The file was shorter than its Content-Length; the client
+                # would otherwise wait forever for the rest.
+                req.close_connection = True
+        return True
+
+
+class FileWrapper(object):
+    """The wsgi.file_wrapper (PEP 333) of a WSGIGateway.
+
+    If the application returns one of these as it is, WSGIGateway.respond
+    tries to send the file with sendfile. Otherwise (for example, when
+    middleware wraps it) it is an ordinary iterable over blksize chunks.
+    """
+
+    count = None
+    """If not None, the number of bytes to send from the file's current
+    position, rather than the rest of the file. Not part of PEP 333; the
+    application may set it on a wrapper it got from wsgi.file_wrapper."""
+
+    def __init__(self, filelike, blksize=8192):
+        self.filelike = filelike
+        self.blksize = blksize
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        size = self.blksize
+        if self.count is not None:
+            if self.count <= 0:
+                raise StopIteration
+            size = min(size, self.count)
+        chunk = self.filelike.read(size)
+        if not chunk:
+            raise StopIteration
+        if self.count is not None:
+            self.count -= len(chunk)
+        return chunk
+
+    def close(self):
+        if hasattr(self.filelike, 'close'):
+            self.filelike.close()
+
 
 class WSGIGateway_10(WSGIGateway):
     """A Gateway class to interface HTTPServer with WSGI 1.0.x."""
@@ -1943,41 +3316,26 @@ class WSGIGateway_10(WSGIGateway):
     def get_environ(self):
         """Return a new environ dict targeting the given wsgi.version"""
         req = self.req
-        env = {
-            # set a non-standard environ entry so the WSGI app can know what
-            # the *real* server protocol is (and what features to support).
-            # See http://www.faqs.org/rfcs/rfc2145.html.
-            'ACTUAL_SERVER_PROTOCOL': req.server.protocol,
-            'PATH_INFO': req.path.decode('ISO-8859-1'),
-            'QUERY_STRING': req.qs.decode('ISO-8859-1'),
-            'REMOTE_ADDR': req.conn.remote_addr or '',
-            'REMOTE_PORT': str(req.conn.remote_port or ''),
-            'REQUEST_METHOD': req.method.decode('ISO-8859-1'),
-            'REQUEST_URI': req.uri.decode('ISO-8859-1'),
-            'SCRIPT_NAME': '',
-            'SERVER_NAME': req.server.server_name,
-            # Bah. "SERVER_PROTOCOL" is actually the REQUEST protocol.
-            'SERVER_PROTOCOL': req.request_protocol.decode('ISO-8859-1'),
-            'SERVER_SOFTWARE': req.server.software,
-            'wsgi.errors': sys.stderr,
-            'wsgi.input': req.rfile,
-            'wsgi.multiprocess': False,
-            'wsgi.multithread': True,
-            'wsgi.run_once': False,
-            'wsgi.url_scheme': req.scheme.decode('ISO-8859-1'),
-            'wsgi.version': (1, 0),
-            }
-        if isinstance(req.server.bind_addr, basestring):
-            # AF_UNIX. This isn't really allowed by WSGI, which doesn't
-            # address unix domain sockets. But it's better than nothing.
-            env["SERVER_PORT"] = ""
-        else:
-            env["SERVER_PORT"] = str(req.server.bind_addr[1])
+        env = req.conn.environ_template
+        if env is None:
+            env = req.conn.environ_template = self.connection_environ()
+        env = env.copy()
+        env['PATH_INFO'] = req.path.decode('ISO-8859-1')
+        env['QUERY_STRING'] = req.qs.decode('ISO-8859-1')
+        env['REQUEST_METHOD'] = req.method.decode('ISO-8859-1')
+        env['REQUEST_URI'] = req.uri.decode('ISO-8859-1')
+        # Bah. "SERVER_PROTOCOL" is actually the REQUEST protocol.
+        env['SERVER_PROTOCOL'] = req.request_protocol.decode('ISO-8859-1')
+        env['wsgi.file_wrapper'] = self.file_wrapper
+        env['wsgi.input'] = req.rfile
 
         # Request headers
         for k, v in req.inheaders.items():
-            k = k.decode('ISO-8859-1').upper().replace("-", "_")
-            env["HTTP_" + k] = v.decode('ISO-8859-1')
+            envname = header_environ_keys.get(k)
+            if envname is None:
+                k = k.decode('ISO-8859-1').upper().replace("-", "_")
+                envname = "HTTP_" + k
+            env[envname] = v.decode('ISO-8859-1')
 
         # CONTENT_TYPE/CONTENT_LENGTH
         ct = env.pop("HTTP_CONTENT_TYPE", None)
@@ -1987,9 +3345,51 @@ class WSGIGateway_10(WSGIGateway):
         if cl is not None:
             env["CONTENT_LENGTH"] = cl
 
-        if req.conn.ssl_env:
-            env.update(req.conn.ssl_env)
+        return env
 
+    def server_environ(self):
+        """Return the environ entries which are the same for every request.
+
+        The dict is built once and kept as server.environ_template; don't
+        modify it.
+        """
+        server = self.req.server
+        env = server.environ_template
+        if env is None:
+            env = server.environ_template = {
+                # set a non-standard environ entry so the WSGI app can know what
+                # the *real* server protocol is (and what features to support).
+                # See http://www.faqs.org/rfcs/rfc2145.html.
+                'ACTUAL_SERVER_PROTOCOL': server.protocol,
+                'SCRIPT_NAME': '',
+                'SERVER_NAME': server.server_name,
+                'SERVER_SOFTWARE': server.software,
+                'wsgi.errors': sys.stderr,
+                'wsgi.multiprocess': False,
+                'wsgi.multithread': True,
+                'wsgi.run_once': False,
+                'wsgi.version': (1, 0),
+                }
+        return env
+
+    def connection_environ(self):
+        """Return a new dict of the environ entries which are the same for
+        every request on our connection, including its SSL environ."""
+        req = self.req
+        conn = req.conn
+        env = self.server_environ().copy()
+        env['REMOTE_ADDR'] = conn.remote_addr or ''
+        env['REMOTE_PORT'] = str(conn.remote_port or '')
+        env['wsgi.url_scheme'] = req.scheme.decode('ISO-8859-1')
+        if isinstance(conn.bind_addr, basestring):
+            # AF_UNIX. This isn't really allowed by WSGI, which doesn't
+            # address unix domain sockets. But it's better than nothing.
+            env["SERVER_PORT"] = ""
+        else:
+            env["SERVER_PORT"] = str(conn.bind_addr[1])
+
+        if conn.ssl_env:
+            env.update(conn.ssl_env)
         return env
 
 
@@ -2026,13 +3426,21 @@ wsgi_gateways = {
     ('u', 0): WSGIGateway_u0,
 }
 
+from .lrucache import LRUCache
+
+
 class WSGIPathInfoDispatcher(object):
     """A WSGI dispatcher for dispatch based on the PATH_INFO.
 
     apps: a dict or list of (path_prefix, app) pairs.
+
+    The path prefixes are kept in a trie, keyed by path segment, so finding
+    the app for a request costs one dict access per segment of its path
+    rather than one comparison per app; the results for the most recent
+    cache_size paths are memoized.
     """
 
-    def __init__(self, apps):
+    def __init__(self, apps, cache_size=1000):
         try:
             apps = list(apps.items())
         except AttributeError:
@@ -2046,15 +3454,40 @@ class WSGIPathInfoDispatcher(object):
         # Use "" instead of "/".
         self.apps = [(p.rstrip("/"), a) for p, a in apps]
 
+        # Each node is a dict of {segment: node}; the (path_prefix, app)
+        # mounted at a node (if any) is stored under the None key. As with
+        # the sorted list, the first of two equal prefixes wins.
+        self.trie = {}
+        for p, app in self.apps:
+            node = self.trie
+            for segment in p.split("/"):
+                node = node.setdefault(segment, {})
+            node.setdefault(None, (p, app))
+        self.cache = LRUCache(cache_size)
+
+    def _find(self, path):
+        """Return the (path_prefix, app) pair for the given path, or None."""
+        found = self.cache.get(path, False)
+        if found is False:
+            found = None
+            node = self.trie
+            for segment in path.split("/"):
+                node = node.get(segment)
+                if node is None:
+                    break
+                found = node.get(None, found)
+            self.cache[path] = found
+        return found
+
     def __call__(self, environ, start_response):
         path = environ["PATH_INFO"] or "/"
-        for p, app in self.apps:
-            # The apps list should be sorted by length, descending.
-            if path.startswith(p + "/") or path == p:
-                environ = environ.copy()
-                environ["SCRIPT_NAME"] = environ["SCRIPT_NAME"] + p
-                environ["PATH_INFO"] = path[len(p):]
-                return app(environ, start_response)
+        found = self._find(path)
+        if found is not None:
+            p, app = found
+            environ = environ.copy()
+            environ["SCRIPT_NAME"] = environ["SCRIPT_NAME"] + p
+            environ["PATH_INFO"] = path[len(p):]
+            return app(environ, start_response)
 
         start_response('404 Not Found', [('Content-Type', 'text/plain'),
                                          ('Content-Length', '0')])
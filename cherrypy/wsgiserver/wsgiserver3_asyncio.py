@@ -0,0 +1,606 @@
+"""An HTTP server which runs on an asyncio event loop (Python 3.5+).
+
+AsyncioHTTPServer is a drop-in alternative to HTTPServer (and
+AsyncioWSGIServer to CherryPyWSGIServer) for sites with many slow or idle
+clients. Instead of a worker thread per connection, one event loop accepts
+connections, reads request heads and waits on idle keep-alive connections;
+each of those costs a coroutine rather than an OS thread::
+
+    from cherrypy.wsgiserver.wsgiserver3_asyncio import AsyncioWSGIServer
+
+    server = AsyncioWSGIServer(('0.0.0.0', 8070), my_crazy_app)
+    server.start()
+
+Request heads are parsed by the usual HTTPRequest, and Gateway and
+WSGIGateway are used unchanged: only the call to the gateway (which runs
+the application, reads the request body and writes the response) is sent
+to a bounded pool of threads. Those threads read and write through the
+blocking StreamRFile and StreamWFile, which hand each operation to the
+event loop and wait for it. The thread pool has as many threads as the
+larger of minthreads and maxthreads; the 'Queue Wait' latency statistic
+is the wait for one of them, per request.
+
+Options which only make sense for a threaded accept loop are ignored:
+keepalive_polling, accept_batch_size, accept_threads, autoscale and the
+accepted_queue_* shedding limits. SSL needs an adapter whose get_context
+method returns an ssl.SSLContext, such as ssl_builtin.BuiltinSSLAdapter;
+the context is fixed when the server starts.
+"""
+
+__all__ = ['StreamRFile', 'StreamWFile', 'AsyncioConnection',
+           'AsyncioHTTPServer', 'AsyncioWSGIServer']
+
+import asyncio
+import errno
+import logging
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from cherrypy.wsgiserver.wsgiserver3 import (
+    CRLF, EMPTY, LF, CherryPyWSGIServer, HTTPConnection, HTTPServer,
+    Listener, SlowClientError, socket_errors_to_ignore)
+
+
+class StreamRFile(object):
+    """A blocking, read-only file over an asyncio StreamReader.
+
+    The event loop waits for each request head with read_head, which fills
+    our buffer; request bodies are read from a pool thread, which waits for
+    the loop to fetch the data. Reads in the loop's own thread never wait:
+    once the buffer is empty they return EOF.
+
+    Like CP_SocketIO, reads can be held to a deadline (see set_deadline).
+    """
+
+    bytes_read = 0
+
+    allowance = None
+    """The seconds which reads may yet spend waiting for data, counted once
+    the first byte has arrived (None until then)."""
+
+    expired = False
+    """Set to True when a read runs past its allowance."""
+
+    _limit = None
+    _min_rate = 0
+    _lowered = False
+    _waiting_since = None
+
+    def __init__(self, reader, loop, timeout):
+        self.reader = reader
+        self.loop = loop
+        self.timeout = timeout
+        self._loop_thread = threading.current_thread()
+        self._buf = EMPTY
+
+    def set_deadline(self, seconds, min_rate=0):
+        """Limit the time reads may wait for data, from the next byte received.
+
+        As CP_SocketIO.set_deadline: only time spent waiting counts.
+        """
+        self._limit = seconds
+        self._min_rate = min_rate
+        self._lowered = False
+        self.allowance = None
+
+    def _read_timeout(self):
+        """Return the timeout for the next read, lowered to the allowance."""
+        timeout = self.timeout
+        self._lowered = False
+        allowance = self.allowance
+        if allowance is not None:
+            if allowance <= 0:
+                self._expire()
+            if timeout is None or allowance < timeout:
+                timeout = allowance
+                self._lowered = True
+            self._waiting_since = time.time()
+        return timeout
+
+    def _received(self, n):
+        self.bytes_read += n
+        if self._limit is not None:
+            if self.allowance is None:
+                self.allowance = self._limit
+            else:
+                self.allowance -= time.time() - self._waiting_since
+            if self._min_rate:
+                self.allowance += float(n) / self._min_rate
+
+    def _expire(self):
+        # Spent, so that any later read fails the same way.
+        self.allowance = 0
+        self.expired = True
+        raise SlowClientError("timed out")
+
+    def _fetch(self, size):
+        """Return up to size bytes from the stream, waiting for the loop."""
+        if threading.current_thread() is self._loop_thread:
+            # Never block the event loop.
+            return EMPTY
+        read = asyncio.wait_for(self.reader.read(size), self._read_timeout())
+        try:
+            data = asyncio.run_coroutine_threadsafe(read, self.loop).result()
+        except asyncio.TimeoutError:
+            if self._lowered:
+                self._expire()
+            raise socket.timeout("timed out")
+        if data:
+            self._received(len(data))
+        return data
+
+    def _take(self, size):
+        data = self._buf[:size]
+        self._buf = self._buf[size:]
+        return data
+
+    def peek(self):
+        """Return (without consuming) the data in our buffer."""
+        return self._buf
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = [self._take(len(self._buf))]
+            while True:
+                data = self._fetch(65536)
+                if not data:
+                    return EMPTY.join(chunks)
+                chunks.append(data)
+        if self._buf:
+            return self._take(size)
+        if not size:
+            return EMPTY
+        return self._fetch(size)
+
+    def readline(self, size=-1):
+        if size is None:
+            size = -1
+        while True:
+            buf = self._buf
+            nl = buf.find(LF)
+            if nl != -1 and (size < 0 or nl < size):
+                return self._take(nl + 1)
+            if 0 <= size <= len(buf):
+                return self._take(size)
+            data = self._fetch(65536)
+            if not data:
+                return self._take(len(buf))
+            self._buf = buf + data
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+    def close(self):
+        pass
+
+    async def read_head(self, idle_timeout, timeout, header_timeout=None,
+                        limit=0):
+        """Wait (in the event loop) for a whole request head to be buffered.
+
+        Return False if the client closed the connection without sending
+        anything. The first byte may take idle_timeout seconds; after that,
+        each read may take timeout seconds, and the whole head
+        header_timeout (if set). Past any of these, socket.timeout (or
+        SlowClientError, for header_timeout) is raised. Returns True early
+        at EOF, or once more than limit bytes (if limit) are buffered,
+        leaving it to the parser to reject the request.
+        """
+        pos = 0
+        lines = 0
+        deadline = None
+        if self._buf and header_timeout:
+            deadline = time.time() + header_timeout
+        while True:
+            buf = self._buf
+            while True:
+                nl = buf.find(LF, pos)
+                if nl == -1:
+                    break
+                line = buf[pos:nl + 1]
+                pos = nl + 1
+                if line == CRLF or line == LF:
+                    if lines:
+                        return True
+                    # One leading empty line may be ignored (RFC 2616 sec 4.1),
+                    # so it doesn't end the head; the next empty line does.
+                lines += 1
+            if limit and len(buf) > limit:
+                return True
+
+            t, lowered = timeout, False
+            if not buf:
+                t = idle_timeout
+            elif deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise SlowClientError("timed out")
+                if t is None or remaining < t:
+                    t, lowered = remaining, True
+            try:
+                data = await asyncio.wait_for(self.reader.read(65536), t)
+            except asyncio.TimeoutError:
+                if lowered:
+                    raise SlowClientError("timed out")
+                raise socket.timeout("timed out")
+            if not data:
+                return bool(buf)
+            self.bytes_read += len(data)
+            if deadline is None and header_timeout:
+                deadline = time.time() + header_timeout
+            self._buf = buf + data
+
+
+class StreamWFile(object):
+    """A blocking, write-only file over an asyncio StreamWriter.
+
+    Writes from the event loop's own thread (error responses made while
+    parsing a request head) go straight to the transport. Writes from a
+    pool thread are handed to the loop, and return once the transport's
+    buffer has drained below its high-water mark, so that a slow client
+    holds back the application rather than filling memory.
+    """
+
+    bytes_written = 0
+
+    def __init__(self, writer, loop, timeout):
+        self.writer = writer
+        self.loop = loop
+        self.timeout = timeout
+        self._loop_thread = threading.current_thread()
+
+    async def _write(self, data):
+        self.writer.write(data)
+        await asyncio.wait_for(self.writer.drain(), self.timeout)
+
+    def write(self, data):
+        if not data:
+            return
+        if self.writer.transport.is_closing():
+            raise socket.error(errno.EPIPE, "Broken pipe")
+        data = bytes(data)
+        self.bytes_written += len(data)
+        if threading.current_thread() is self._loop_thread:
+            self.writer.write(data)
+            return
+        future = asyncio.run_coroutine_threadsafe(self._write(data), self.loop)
+        try:
+            future.result()
+        except asyncio.TimeoutError:
+            raise socket.timeout("timed out")
+        except ConnectionError:
+            raise socket.error(errno.ECONNRESET, "Connection reset by peer")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncioConnection(HTTPConnection):
+    """An HTTP connection served by a coroutine (see AsyncioHTTPServer).
+
+    rfile and wfile are a StreamRFile and StreamWFile, and socket is None.
+    """
+
+    socket = None
+
+    busy = None
+    """The future of the request being answered in a pool thread, if any."""
+
+    def __init__(self, server, reader, writer, bind_addr, ssl_adapter):
+        self.server = server
+        self.writer = writer
+        self.bind_addr = bind_addr
+        self.ssl_adapter = ssl_adapter
+        self.rfile = StreamRFile(reader, server.loop, server.timeout)
+        self.wfile = StreamWFile(writer, server.loop, server.timeout)
+        self.requests_seen = 0
+        self.requests_served = 0
+
+        peer = writer.get_extra_info('peername')
+        if isinstance(peer, tuple):
+            self.remote_addr, self.remote_port = peer[:2]
+        ssl_object = writer.get_extra_info('ssl_object')
+        if ssl_object is not None:
+            self.ssl_env = ssl_adapter.get_environ(ssl_object)
+        else:
+            self.ssl_env = {}
+
+    async def communicate(self):
+        """Read each request and respond appropriately (a coroutine).
+
+        The request head is read and parsed in the event loop; the
+        response is left to respond(), in one of the server's threads.
+        """
+        server = self.server
+        request_seen = False
+        while server.ready:
+            idle_timeout = server.timeout
+            if request_seen and server.keepalive_timeout is not None:
+                idle_timeout = server.keepalive_timeout
+            req = None
+            try:
+                if not await self.rfile.read_head(
+                        idle_timeout, server.timeout, server.header_timeout,
+                        server.max_request_header_size):
+                    return
+                req = self.RequestHandlerClass(server, self)
+                req.parse_request()
+            except socket.timeout as e:
+                if isinstance(e, SlowClientError):
+                    self._count('Slow Clients')
+                elif request_seen and LF not in self.rfile.peek():
+                    # Like HTTPConnection, don't send a 408 between
+                    # requests; only if no request has been made yet, or
+                    # the client stalled after sending its request line.
+                    self._count('Keep-Alive Timeouts')
+                    return
+                req = self.RequestHandlerClass(server, self)
+                req.simple_response("408 Request Timeout")
+                return
+            except socket.error:
+                # The client went away.
+                return
+            if server.stats['Enabled']:
+                self.requests_seen += 1
+                server.requests_seen += 1
+            if not req.ready:
+                # Something went wrong in the parsing (and the server has
+                # probably already made a simple_response).
+                return
+
+            request_seen = True
+            self.requests_served += 1
+            self._limit_keepalive(req)
+            self.busy = server.loop.run_in_executor(
+                server.executor, self.respond, req, time.time())
+            try:
+                keep_open = await self.busy
+            finally:
+                self.busy = None
+            if not keep_open:
+                return
+
+    def respond(self, req, queued_at):
+        """Answer the parsed request (in a pool thread).
+
+        Return True if the connection should be kept open for another
+        request.
+        """
+        if self.server.stats['Enabled']:
+            # The wait for a thread, per request rather than per connection.
+            self.server.latency['Queue Wait'].record(time.time() - queued_at)
+        try:
+            req.respond()
+            if req.timed and req.started_at is not None:
+                self.server.record_timing(req, time.time())
+            if self._deadline_expired():
+                # The application swallowed the SlowClientError.
+                self._count('Slow Clients')
+                return False
+            return not req.close_connection
+        except socket.error as e:
+            if isinstance(e, socket.timeout):
+                if isinstance(e, SlowClientError):
+                    self._count('Slow Clients')
+                if not req.sent_headers:
+                    self._simple_response(req, "408 Request Timeout")
+            elif e.args[0] not in socket_errors_to_ignore:
+                self.server.error_log("socket.error %s" % repr(e.args[0]),
+                                      level=logging.WARNING, traceback=True)
+                if not req.sent_headers:
+                    self._simple_response(req, "500 Internal Server Error")
+        except (KeyboardInterrupt, SystemExit) as e:
+            self.server.interrupt = e
+        except Exception as e:
+            self.server.error_log(repr(e), level=logging.ERROR,
+                                  traceback=True)
+            if not req.sent_headers:
+                self._simple_response(req, "500 Internal Server Error")
+        return False
+
+    def _simple_response(self, req, status):
+        try:
+            req.simple_response(status)
+        except socket.error:
+            pass
+
+    def close(self):
+        """Close the transport underlying this connection."""
+        self.writer.close()
+
+
+class AsyncioHTTPServer(HTTPServer):
+    """An HTTPServer which serves its connections on an asyncio event loop.
+
+    start() runs the event loop in the calling thread until stop() is
+    called (from another thread). See the module docstring.
+    """
+
+    ConnectionClass = AsyncioConnection
+
+    loop = None
+    """The event loop, while the server is running."""
+
+    executor = None
+    """The ThreadPoolExecutor which answers requests, while running."""
+
+    requests_seen = 0
+
+    def clear_stats(self):
+        HTTPServer.clear_stats(self)
+        # There are no WorkerThreads to add up.
+        self.requests_seen = 0
+        self.stats['Requests'] = lambda s: (
+            (not s['Enabled']) and -1 or self.requests_seen)
+
+    def _saturated(self):
+        # Idle connections don't hold a thread; no need to close them.
+        return False
+
+    def start(self):
+        """Run the server forever."""
+        self._interrupt = None
+        if self.software is None:
+            self.software = "%s Server" % self.version
+        self.environ_template = None
+
+        self._loop_thread = threading.current_thread()
+        self._stopped = threading.Event()
+        self._servers = []
+        self._connections = set()
+        self._tasks = set()
+        pool = self.requests
+        self.executor = ThreadPoolExecutor(max(pool.min, pool.max, 1))
+        loop = self.loop = asyncio.new_event_loop()
+        loop.set_exception_handler(self._loop_error)
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._listen())
+            self.ready = True
+            self._start_time = time.time()
+            loop.run_forever()
+        finally:
+            self.ready = False
+            try:
+                loop.run_until_complete(self._shutdown())
+            finally:
+                asyncio.set_event_loop(None)
+                loop.close()
+                self.loop = None
+                self.executor.shutdown(wait=False)
+                self.executor = None
+                self._stopped.set()
+
+        if self.interrupt:
+            while self.interrupt is True:
+                # Wait for self.stop() to complete. See _set_interrupt.
+                time.sleep(0.1)
+            if self.interrupt:
+                raise self.interrupt
+
+    def _ssl_context(self, ssl_adapter):
+        """Return the ssl.SSLContext to serve ssl_adapter's listener with."""
+        if ssl_adapter is None:
+            return None
+        get_context = getattr(ssl_adapter, 'get_context', None)
+        if get_context is None:
+            raise ValueError("%r can't be used with an asyncio server."
+                             % ssl_adapter)
+        context = get_context()
+        if context is None:
+            # The adapter doesn't share a context (its session cache is
+            # off); make one of our own.
+            import ssl
+            context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+            context.load_cert_chain(ssl_adapter.certificate,
+                                    ssl_adapter.private_key)
+        return context
+
+    async def _listen(self):
+        """Bind our listening sockets and serve connections on them."""
+        listeners = [Listener(self.bind_addr, self.ssl_adapter)]
+        listeners.extend(self.listeners)
+        for listener in listeners:
+            sock = self._bind_listener(listener)
+            server = await asyncio.start_server(
+                self._connected(listener.bind_addr, listener.ssl_adapter),
+                sock=sock, backlog=self.request_queue_size,
+                ssl=self._ssl_context(listener.ssl_adapter))
+            self._servers.append(server)
+
+    def _connected(self, bind_addr, ssl_adapter):
+        """Return a callback which serves the connections of a listener."""
+        def connected(reader, writer):
+            task = self.loop.create_task(
+                self._serve(reader, writer, bind_addr, ssl_adapter))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return connected
+
+    async def _serve(self, reader, writer, bind_addr, ssl_adapter):
+        if self.stats['Enabled']:
+            self.stats['Accepts'] += 1
+        conn = self.ConnectionClass(self, reader, writer, bind_addr,
+                                    ssl_adapter)
+        if self.stats['Enabled'] or self.timing_hook is not None:
+            # Connections are served as soon as they are accepted.
+            conn.accepted_at = conn.queued_at = conn.dequeued_at = time.time()
+        self._connections.add(conn)
+        try:
+            await conn.communicate()
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.error_log("Error in %s.communicate" % type(conn).__name__,
+                           level=logging.ERROR, traceback=True)
+        finally:
+            self._connections.discard(conn)
+            conn.close()
+
+    def _loop_error(self, loop, context):
+        exc = context.get('exception')
+        if isinstance(exc, socket.error):
+            # Clients which went away, or never finished a TLS handshake
+            # (ssl.SSLError is a socket.error too).
+            return
+        msg = context.get('message', 'Error in the event loop')
+        if exc is not None:
+            msg += "\n" + "".join(traceback.format_exception(
+                type(exc), exc, exc.__traceback__))
+        self.error_log(msg, level=logging.ERROR)
+
+    async def _shutdown(self):
+        """Stop listening, then close every connection (a coroutine).
+
+        Requests being answered get up to shutdown_timeout seconds to finish.
+        """
+        for server in self._servers:
+            server.close()
+        busy = [conn.busy for conn in self._connections
+                if conn.busy is not None]
+        if busy:
+            await asyncio.wait(busy, timeout=self.shutdown_timeout)
+        for conn in list(self._connections):
+            conn.close()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+
+    def stop(self):
+        """Gracefully shutdown a server that is serving forever."""
+        self.ready = False
+        if self._start_time is not None:
+            self._run_time += (time.time() - self._start_time)
+        self._start_time = None
+
+        loop = self.loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(loop.stop)
+        except RuntimeError:
+            # The loop has already been closed.
+            return
+        if threading.current_thread() is not self._loop_thread:
+            # _shutdown waits up to shutdown_timeout for busy requests.
+            self._stopped.wait(self.shutdown_timeout + 1)
+
+
+class AsyncioWSGIServer(AsyncioHTTPServer, CherryPyWSGIServer):
+    """A CherryPyWSGIServer which runs on an asyncio event loop."""
@@ -21,10 +21,13 @@ class cherrypy_build_py(build_py):
     def build_module(self, module, module_file, package):
         python3 = sys.version_info >= (3,)
         if python3:
-            exclude_pattern = re.compile('wsgiserver2|ssl_pyopenssl|'
-                '_cpcompat_subprocess')
+            exclude = 'wsgiserver2|ssl_pyopenssl|_cpcompat_subprocess'
+            if sys.version_info < (3, 5):
+                # These use async/await, new in Python 3.5.
+                exclude += '|wsgiserver3_asyncio|_cpasyncio_server'
+            exclude_pattern = re.compile(exclude)
         else:
-            exclude_pattern = re.compile('wsgiserver3')
+            exclude_pattern = re.compile('wsgiserver3|_cpasyncio_server')
         if exclude_pattern.match(module):
             return # skip it
         return build_py.build_module(self, module, module_file, package)